@@ -0,0 +1,186 @@
+# attachments.py
+#
+# Description:
+# Shrinks the photos attached to alert emails so they fit a byte
+# budget. Upload time on a slow uplink dominates the alert latency,
+# and a full 800x600 capture at quality 90 is several times larger
+# than it needs to be to recognise someone.
+# AttachmentOptimizer.optimize() keeps a photo that already fits.
+# Otherwise, for each width in `widths` (largest first), it binary
+# searches the JPEG quality between `min_quality` and `max_quality`
+# for the best one that fits, and stops at the first width where
+# one does. Only cv2.imencode runs in the loop: the photo is
+# decoded once and resized once per width.
+# The budget is either `target_bytes` or the bytes the uplink moves
+# in `budget_seconds` (`uplink_bps` is in bits per second), shared
+# between all the photos of one email.
+# Re-encoded variants are cached in `cache_dir`/<budget>/ under the
+# photo's own file name, which is also the attachment name, with the
+# photo's mtime copied onto them; a variant is reused while the
+# mtimes still match, so a photo is only re-encoded once per budget.
+# On Raspberry Pi OS /tmp is on the SD card and outside the photo
+# store quota, so the cache is capped at `max_cache_bytes`: the least
+# recently used variants are deleted first (an evicted variant is
+# just encoded again if it is needed).
+#
+# Usage:
+#   optimizer = AttachmentOptimizer(uplink_bps=256_000, budget_seconds=2.0)
+#   files = optimizer.optimize_many(photo_file_names)
+#   print(optimizer.describe())
+#
+# j3 @ Oct, 2026
+
+import collections
+import os
+import threading
+import time
+import cv2
+
+DEFAULT_WIDTHS = (None, 1024, 800, 640, 480, 320)  # None: keep the original size
+
+
+class AttachmentOptimizer:
+    def __init__(self, target_bytes=None, uplink_bps=None, budget_seconds=None,
+                 widths=DEFAULT_WIDTHS, min_quality=40, max_quality=90,
+                 cache_dir="/tmp/attachments", max_cache_bytes=32 * 1024 ** 2):
+        if target_bytes is None:
+            if uplink_bps is None or budget_seconds is None:
+                raise ValueError("Set target_bytes, or both uplink_bps and budget_seconds")
+            target_bytes = int(uplink_bps / 8 * budget_seconds)
+        self.target_bytes = target_bytes
+        self.widths = widths
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Cached variant -> size, least recently used first. The mtimes
+        # are the photos', so earlier runs' variants go in creation order.
+        self._cache = collections.OrderedDict()
+        self.cache_bytes = 0
+        found = []
+        for root, _, names in os.walk(cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                found.append((st.st_ctime_ns, path, st.st_size))
+        for _, path, size in sorted(found):
+            self._cache[path] = size
+            self.cache_bytes += size
+        self.evicted = 0
+        self._evict()
+        # Totals, for describe()
+        self.photos = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.encode_seconds = 0.0
+        self.encodes = 0
+
+    def describe(self):
+        saved = self.bytes_in - self.bytes_out
+        ratio = saved / self.bytes_in * 100 if self.bytes_in else 0.0
+        return (f"{self.photos} photos ({self.cache_hits} cached): "
+                f"{self.bytes_in / 1024:.0f} kB -> {self.bytes_out / 1024:.0f} kB "
+                f"({saved / 1024:.0f} kB, {ratio:.0f}% saved), "
+                f"{self.encodes} encodes in {self.encode_seconds * 1000:.0f} ms, "
+                f"cache {self.cache_bytes / 1024 ** 2:.1f} MB ({self.evicted} evicted)")
+
+    def _cached(self, cache_name, st):
+        try:
+            return os.stat(cache_name).st_mtime_ns == st.st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _evict(self):
+        # Called with the lock held; the newest variant always stays
+        while self.cache_bytes > self.max_cache_bytes and len(self._cache) > 1:
+            path, size = self._cache.popitem(last=False)
+            self.cache_bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _search(self, img, target_bytes):
+        # (jpeg bytes, width, quality) of the largest width and best
+        # quality that fit, or the smallest, lowest-quality try
+        encodes = 0
+        smallest = None
+        height, width = img.shape[:2]
+        # Never upscale; the original width is the last resort when no
+        # smaller width is configured
+        widths = [w for w in self.widths if w is None or w < width] or [None]
+        for w in widths:
+            scaled = img if w is None else cv2.resize(
+                img, (w, max(1, round(height * w / width))), interpolation=cv2.INTER_AREA)
+            low, high = self.min_quality, self.max_quality
+            best = None
+            while low <= high:
+                quality = (low + high) // 2
+                ok, data = cv2.imencode(".jpg", scaled, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                encodes += 1
+                if len(data) <= target_bytes:
+                    best = (data, scaled.shape[1], quality)
+                    low = quality + 1
+                else:
+                    high = quality - 1
+                    if quality == self.min_quality:
+                        smallest = (data, scaled.shape[1], quality)
+            if best is not None:
+                return best, encodes
+        return smallest, encodes
+
+    def optimize(self, file_name, target_bytes=None):
+        # File to attach instead of file_name
+        target_bytes = self.target_bytes if target_bytes is None else target_bytes
+        st = os.stat(file_name)
+        size = st.st_size
+        cache_name = os.path.join(self.cache_dir, str(target_bytes), os.path.basename(file_name))
+        with self._lock:
+            self.photos += 1
+            self.bytes_in += size
+        if size <= target_bytes:
+            with self._lock:
+                self.bytes_out += size
+            return file_name
+        if self._cached(cache_name, st):
+            with self._lock:
+                self.cache_hits += 1
+                self.bytes_out += os.path.getsize(cache_name)
+                if cache_name in self._cache:
+                    self._cache.move_to_end(cache_name)
+            return cache_name
+
+        start = time.perf_counter()
+        img = cv2.imread(file_name)
+        if img is None:
+            raise IOError(f"Could not read {file_name}")
+        (data, width, quality), encodes = self._search(img, target_bytes)
+        # Write then rename, so a half-written variant is never picked up
+        os.makedirs(os.path.dirname(cache_name), exist_ok=True)
+        tmp = cache_name + ".tmp"
+        data.tofile(tmp)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, cache_name)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.bytes_out += len(data)
+            self.encode_seconds += elapsed
+            self.encodes += encodes
+            self.cache_bytes += len(data) - self._cache.pop(cache_name, 0)
+            self._cache[cache_name] = len(data)
+            self._evict()
+        print(f"Attachment {os.path.basename(file_name)}: {size / 1024:.0f} kB -> "
+              f"{len(data) / 1024:.0f} kB (width {width}, quality {quality}) "
+              f"in {elapsed * 1000:.0f} ms")
+        return cache_name
+
+    def optimize_many(self, file_names):
+        # The budget is shared equally between the photos of one email
+        if isinstance(file_names, str):
+            file_names = [file_names]
+        share = self.target_bytes // max(1, len(file_names))
+        return [self.optimize(f, share) for f in file_names]
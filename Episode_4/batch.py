@@ -0,0 +1,160 @@
+# batch.py
+#
+# Description:
+# Reprocesses the photo archive (/home/pi/Camera/img_<epoch>.jpg)
+# in parallel. The archive is walked recursively, and every photo
+# is handed to a pool of worker processes, one per CPU core by
+# default, that run one of:
+# - sketch:   the pencil-sketch filter from sketch.py
+# - resize:   shrink to --width pixels wide
+# - annotate: stamp the capture time (from the file name) on it
+# Results are written to the same relative path under the output
+# directory as soon as each photo is done. A manifest.json in the
+# output directory remembers the size and mtime of every processed
+# source, so a rerun only processes new or changed photos.
+# At the end it prints the throughput (images/sec) and the peak
+# memory (RSS) of the main process and of the workers.
+#
+# Usage:
+#   python3 batch.py sketch /home/pi/Camera /home/pi/Camera_sketch
+#   python3 batch.py resize /home/pi/Camera /tmp/small --width 320
+#
+# j3 @ Oct, 2026
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import resource
+import time
+import cv2
+from sketch import SketchFilter
+from overlay import Overlay, TextItem
+
+MANIFEST_NAME = "manifest.json"
+
+_sketch_filter = None  # One per worker process
+
+
+def find_photos(src, pattern):
+    # Yields (relative path, size, mtime_ns) without building a full list
+    stack = [src]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                    st = entry.stat()
+                    yield os.path.relpath(entry.path, src), st.st_size, st.st_mtime_ns
+
+
+def capture_time_text(file_name):
+    # img_1724238000.123.jpg -> "21082024 10:00"
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    try:
+        return time.strftime("%d%m%Y %H:%M", time.localtime(float(stem.split("_", 1)[1])))
+    except (IndexError, ValueError):
+        return stem
+
+
+def process_photo(task):
+    # Runs in a worker process
+    global _sketch_filter
+    op, src_path, dst_path, width = task
+    img = cv2.imread(src_path)
+    if img is None:
+        return src_path, False, "unreadable"
+    if op == "sketch":
+        if _sketch_filter is None:
+            _sketch_filter = SketchFilter()
+        result = _sketch_filter.process(img)
+    elif op == "resize":
+        height = max(1, round(img.shape[0] * width / img.shape[1]))
+        result = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    else:
+        text = capture_time_text(src_path)
+        Overlay((img.shape[1], img.shape[0]), [TextItem(lambda: text, refresh=None)]).draw(img)
+        result = img
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    if not cv2.imwrite(dst_path, result):
+        return src_path, False, "write failed"
+    return src_path, True, None
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    # Write to a temporary file first so a crash never leaves half a manifest
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocess the photo archive in parallel")
+    parser.add_argument("op", choices=["sketch", "resize", "annotate"])
+    parser.add_argument("src", help="archive directory, e.g. /home/pi/Camera")
+    parser.add_argument("dst", help="output directory")
+    parser.add_argument("--pattern", default="img_*.jpg")
+    parser.add_argument("--width", type=int, default=640, help="width for resize")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    src = os.path.abspath(args.src)
+    dst = os.path.abspath(args.dst)
+    os.makedirs(dst, exist_ok=True)
+    manifest_path = os.path.join(dst, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    def tasks(skipped):
+        for rel, size, mtime_ns in find_photos(src, args.pattern):
+            if os.path.join(src, rel).startswith(dst + os.sep):
+                continue  # Output tree inside the archive
+            key = [args.op, size, mtime_ns, args.width]
+            if manifest.get(rel) == key:
+                skipped[0] += 1
+                continue
+            pending[os.path.join(src, rel)] = (rel, key)
+            yield args.op, os.path.join(src, rel), os.path.join(dst, rel), args.width
+
+    pending = {}
+    skipped = [0]
+    done = failed = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        for src_path, ok, error in pool.imap_unordered(process_photo, tasks(skipped), chunksize=4):
+            rel, key = pending.pop(src_path)
+            if ok:
+                manifest[rel] = key
+                done += 1
+            else:
+                failed += 1
+                print(f"{rel}: {error}")
+            if (done + failed) % 100 == 0:
+                save_manifest(manifest_path, manifest)
+    save_manifest(manifest_path, manifest)
+    elapsed = time.perf_counter() - start
+
+    print(f"{done} processed, {skipped[0]} unchanged, {failed} failed "
+          f"in {elapsed:.1f}s with {args.workers} workers "
+          f"({done / elapsed if elapsed else 0:.1f} images/sec)")
+    print(f"Peak RSS: main {peak_rss_mb(resource.RUSAGE_SELF):.1f} MB, "
+          f"largest worker {peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
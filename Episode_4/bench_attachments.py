@@ -0,0 +1,64 @@
+# bench_attachments.py
+#
+# Description:
+# Measures what AttachmentOptimizer (attachments.py) saves on a set
+# of photos: bytes before and after, encode time per photo, and the
+# upload time at the given uplink speed before and after. Uses the
+# photos of a directory (e.g. /home/pi/Camera) or, by default,
+# synthetic 800x600 frames from the fake camera's scene generator
+# saved at quality 90, as take_photo does. A second pass shows the
+# cost of a cache hit.
+#
+# Usage: python3 bench_attachments.py [photo_dir] [--uplink 128000] [--budget 1.0]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+import cv2
+from attachments import AttachmentOptimizer
+from fake_picamera2 import SyntheticSource
+
+
+def synthetic_photos(directory, count=10):
+    source = SyntheticSource((800, 600))
+    names = []
+    for i in range(count):
+        name = os.path.join(directory, f"img_{1760000000 + i * 60}.jpg")
+        cv2.imwrite(name, source.frame(i * 45, i * 1.5), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        names.append(name)
+    return names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the attachment optimizer")
+    parser.add_argument("photo_dir", nargs="?", help="directory of JPEG photos (default: synthetic)")
+    parser.add_argument("--uplink", type=int, default=128_000, help="uplink speed, bits per second")
+    parser.add_argument("--budget", type=float, default=1.0, help="upload time per email, seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.photo_dir:
+            photos = sorted(glob.glob(os.path.join(args.photo_dir, "**", "*.jpg"), recursive=True))
+        else:
+            photos = synthetic_photos(work_dir)
+        optimizer = AttachmentOptimizer(uplink_bps=args.uplink, budget_seconds=args.budget,
+                                        cache_dir=os.path.join(work_dir, "cache"))
+        print(f"Budget: {optimizer.target_bytes / 1024:.0f} kB per email "
+              f"({args.budget:.1f} s at {args.uplink / 1000:.0f} kbit/s)")
+
+        for label in ("first pass", "cached"):
+            start = time.perf_counter()
+            for photo in photos:
+                optimizer.optimize_many(photo)
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {len(photos)} photos in {elapsed * 1000:.0f} ms "
+                  f"({elapsed / len(photos) * 1000:.1f} ms per photo)")
+        print(optimizer.describe())
+
+        bytes_in = optimizer.bytes_in / optimizer.photos
+        bytes_out = optimizer.bytes_out / optimizer.photos
+        print(f"Upload per photo: {bytes_in * 8 / args.uplink:.1f} s -> {bytes_out * 8 / args.uplink:.1f} s")
@@ -0,0 +1,119 @@
+# bench_burst.py
+#
+# Description:
+# Benchmarks the sharpest-frame selection in burst.py, to pick the
+# burst size and scoring size that fit a latency budget.
+# 1. Selection: bursts of synthetic 800x600 frames where every frame
+#    but one is motion-blurred by a random amount; counts how often
+#    the sharp one is picked.
+# 2. Scoring cost: time to score a whole burst for several burst
+#    and scoring sizes, against a loop calling cv2.Laplacian and
+#    .var() per frame at full resolution.
+# 3. Budget: a full burst (grab + score) from the fake camera at
+#    30 fps, so grabbing costs ~33 ms per frame as on the Pi, and
+#    the largest burst that fits the budget.
+#
+# Usage: python3 bench_burst.py [--budget 0.4]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+# Use the fake picamera2 module for the budget part
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes"))
+
+from burst import BurstCapture
+from live_capture import LiveCapture
+
+resolution = (800, 600)
+
+
+def scene(rng):
+    # Textured frame: noise blobs plus some hard edges
+    img = rng.integers(0, 255, (resolution[1] // 8, resolution[0] // 8, 3), dtype=np.uint8)
+    img = cv2.resize(img, resolution, interpolation=cv2.INTER_CUBIC)
+    for _ in range(20):
+        x, y = rng.integers(0, resolution[0] - 80), rng.integers(0, resolution[1] - 80)
+        cv2.rectangle(img, (int(x), int(y)), (int(x) + 80, int(y) + 60), (255, 255, 255), 2)
+    return img
+
+
+def motion_blur(img, length):
+    kernel = np.zeros((length, length), np.float32)
+    kernel[length // 2, :] = 1.0 / length
+    return cv2.filter2D(img, -1, kernel)
+
+
+def bench_selection(bursts=50, count=5):
+    print("== Selection")
+    rng = np.random.default_rng(1)
+    burst = BurstCapture(None, (resolution[1], resolution[0], 3), count=count)
+    hits = 0
+    for _ in range(bursts):
+        img = scene(rng)
+        sharp = int(rng.integers(0, count))
+        for i in range(count):
+            burst.frames[i] = img if i == sharp else motion_blur(img, int(rng.integers(3, 15)))
+        hits += burst.best()[0] == sharp
+    print(f"Sharp frame picked in {hits}/{bursts} bursts of {count}")
+
+
+def bench_scoring(repeat=20):
+    print("== Scoring cost per burst")
+    rng = np.random.default_rng(2)
+    img = scene(rng)
+    for count in (3, 5, 8):
+        frames = np.stack([img] * count)
+        t = time.perf_counter()
+        for _ in range(repeat):
+            [cv2.Laplacian(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var() for f in frames]
+        full = (time.perf_counter() - t) / repeat
+        line = f"{count} frames: per-frame full-res {full * 1000:6.1f} ms"
+        for factor in (4, 2):
+            burst = BurstCapture(None, frames.shape[1:], count=count, factor=factor)
+            burst.frames[:] = frames
+            burst.score()
+            t = time.perf_counter()
+            for _ in range(repeat):
+                burst.score()
+            width, height = burst.score_size
+            line += f" | {width}x{height} {(time.perf_counter() - t) / repeat * 1000:6.1f} ms"
+        print(line)
+
+
+def bench_budget(budget):
+    print(f"== Full burst within a {budget * 1000:.0f} ms budget (fake camera, 30 fps)")
+    from picamera2 import Picamera2
+    picam2 = Picamera2()
+    picam2.configure(picam2.create_preview_configuration({"size": resolution, "format": "RGB888"}))
+    picam2.start()
+    live = LiveCapture(picam2)
+    fits = 0
+    for count in (1, 3, 5, 8, 12):
+        burst = BurstCapture(live, (resolution[1], resolution[0], 3), count=count, budget=budget)
+        t = time.perf_counter()
+        n = burst.grab()
+        burst.best(n)
+        total = time.perf_counter() - t
+        burst.close()
+        print(f"count {count:2}: grabbed {n:2}  grab {burst.grab_seconds * 1000:6.1f} ms  "
+              f"score {burst.score_seconds * 1000:5.1f} ms  total {total * 1000:6.1f} ms")
+        if n == count and total <= budget:
+            fits = count
+    live.close()
+    picam2.close()
+    print(f"Largest burst that fits: {fits} frames")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark burst capture frame selection")
+    parser.add_argument("--budget", type=float, default=0.4, help="seconds, trigger to best frame")
+    args = parser.parse_args()
+    bench_selection()
+    bench_scoring()
+    bench_budget(args.budget)
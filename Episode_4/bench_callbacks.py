@@ -0,0 +1,79 @@
+# bench_callbacks.py
+#
+# Description:
+# CallbackGuard (callback_budget.py) on the fake camera at 30 fps.
+# The pre_callback is an apply_text overlay that becomes slow
+# (SLOW_MS extra per frame, as when the CPU is busy with something
+# else) during the middle third of the run; its fallback is the
+# cached Overlay from overlay.py. Two runs:
+# - measure only: the guard times and counts but never degrades
+#   (budget = infinity), i.e. what cam28.py does without knowing it
+# - guarded:      budget = 50% of the frame interval
+# For each run: frames delivered, frames dropped as counted from the
+# SensorTimestamp gaps vs the frames the camera should have made,
+# degradations/restorations, and the cost distribution per hook.
+# The fake camera restarts its frame clock after a late frame, so
+# its gaps are not whole frame intervals and the dropped count runs
+# a little high; a real sensor's timestamps stay on a fixed grid.
+#
+# Usage: python3 bench_callbacks.py [--seconds 9] [--slow-ms 45]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import os
+import sys
+import time
+
+# Use the fake picamera2 and libcamera modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes"))
+
+import cv2
+from picamera2 import Picamera2, MappedArray
+from callback_budget import CallbackGuard
+from overlay import Overlay, timestamp_item
+
+resolution = (800, 600)
+FPS = 30
+
+
+def run(label, budget, seconds, slow_ms):
+    picam2 = Picamera2(fps=FPS)
+    picam2.configure(picam2.create_preview_configuration({"size": resolution, "format": "RGB888"}))
+    start = time.monotonic()
+
+    def apply_text(request):
+        # The overlay from cam11.py-cam18.py, slow in the middle third
+        text = time.strftime("%d%m%Y %H:%M")
+        text_size, _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1, 1)
+        origin = (resolution[0] - text_size[0] - 10, resolution[1] - 10)
+        with MappedArray(request, "main") as m:
+            cv2.putText(m.array, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 1)
+        if seconds / 3 <= time.monotonic() - start < 2 * seconds / 3:
+            time.sleep(slow_ms / 1000)
+
+    def motion(request):
+        with MappedArray(request, "main") as m:
+            m.array[::8, ::8].mean()
+
+    guard = CallbackGuard(picam2, budget=budget, recover_after=FPS)
+    guard.add_pre("overlay", apply_text, fallback=Overlay(resolution, [timestamp_item()]).apply)
+    guard.add_post("motion", motion, essential=True)
+    guard.install()
+    picam2.start()
+    start = time.monotonic()
+    time.sleep(seconds)
+    picam2.stop()
+    expected = int(seconds * FPS)
+    print(f"--- {label}: {guard.frames} frames delivered, {expected} expected, "
+          f"{expected - guard.frames} missing")
+    print(guard.describe())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the camera callback guard")
+    parser.add_argument("--seconds", type=float, default=9.0)
+    parser.add_argument("--slow-ms", type=float, default=45.0)
+    args = parser.parse_args()
+    run("measure only", float("inf"), args.seconds, args.slow_ms)
+    run("guarded", 0.5, args.seconds, args.slow_ms)
@@ -0,0 +1,64 @@
+# bench_capture.py
+#
+# Description:
+# Measures trigger-to-JPEG-on-disk latency on the Pi for:
+# - switch: picam2.switch_mode_and_capture_file(), as in cam11.py-cam17.py
+# - live:   LiveCapture from the running stream (live_capture.py)
+# Both use the same 800x600 resolution and the apply_text overlay.
+# Off the Pi it runs on the simulator (PYTHONPATH=fakes): the switch
+# figures are then the stop/configure/start/exposure costs modelled
+# in fake_picamera2.TIMINGS, and only the live path's encode and
+# write are really measured.
+#
+# Usage: python3 bench_capture.py [captures]
+#        PYTHONPATH=fakes python3 bench_capture.py [captures]
+#
+# j3 @ Oct, 2026
+
+import sys
+import time, cv2
+from picamera2 import Picamera2, MappedArray
+from libcamera import Transform
+from live_capture import LiveCapture, measure
+
+resolution = (800, 600)
+
+
+def apply_text(request):
+    text = time.strftime("%d%m%Y %H:%M")
+    text_size, _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1, 1)
+    origin = (resolution[0] - text_size[0] - 10, resolution[1] - 10)
+    with MappedArray(request, "main") as m:
+        cv2.putText(m.array, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 1)
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    mean = sum(latencies) / len(latencies)
+    print(f"{name:>7}: mean {mean * 1000:7.1f} ms  "
+          f"min {latencies[0] * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms")
+
+
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+transform = Transform(hflip=True, vflip=True)
+
+picam2 = Picamera2()
+capture_config = picam2.create_still_configuration({"size": resolution}, transform=transform)
+preview_config = picam2.create_preview_configuration({"size": resolution}, transform=transform)
+picam2.configure(preview_config)
+picam2.pre_callback = apply_text
+picam2.start()
+time.sleep(2)
+report("switch", measure(lambda f: picam2.switch_mode_and_capture_file(capture_config, f), count))
+picam2.stop()
+
+# Live path: the running stream is already at capture resolution
+live_config = picam2.create_video_configuration({"size": resolution, "format": "RGB888"},
+                                                transform=transform)
+picam2.configure(live_config)
+picam2.start()
+time.sleep(2)
+live = LiveCapture(picam2)
+report("live", measure(lambda f: live.capture_file(f).result(), count))
+live.close()
+picam2.close()
@@ -0,0 +1,121 @@
+# bench_classify.py
+#
+# Description:
+# Inference latency of the classification gate (classify.py) and
+# what an alert pays for it. Run it on the Pi; elsewhere, pin it to
+# one core (taskset -c 0) for a rough Pi-class figure, the workers
+# already run OpenCV on a single thread.
+# 1) Inference: ROUNDS photos straight through the detector in this
+#    process (imread + detect), p50 / p99 / max
+# 2) Gate, cold: one alert of two photos through the process pool,
+#    photos not seen before
+# 3) Gate, cached: the same alert again (file hash + LRU lookup)
+# 4) Budget: a gate with a budget below the inference time; the
+#    alert must be sent anyway (fail open), and the verdict must
+#    still land in the cache for the next alert
+# The photos are the ones given on the command line (e.g. a few
+# from /home/pi/Camera), or synthetic 800x600 frames otherwise;
+# those have nobody in them, so any detection there is a false one.
+#
+# Usage: python3 bench_classify.py [--backend hog] [--model m --config c] [photo.jpg ...]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from classify import ClassificationGate, HogPersonDetector, SsdDetector, HOG, DNN, TIMEOUT
+
+ROUNDS = 50
+SIZE = (800, 600)  # cam31.py capture resolution
+
+
+def make_photos(directory, count=8, seed=1):
+    # Garden-like frames: smooth gradients, noise and a few blobs
+    rng = np.random.default_rng(seed)
+    file_names = []
+    for i in range(count):
+        y, x = np.mgrid[0:SIZE[1], 0:SIZE[0]]
+        image = np.dstack([(x * 0.2 + y * 0.1) % 255, (y * 0.3) % 255, (x * 0.1) % 255]).astype(np.float32)
+        image += rng.normal(0, 12, image.shape)
+        for _ in range(6):
+            center = (int(rng.integers(0, SIZE[0])), int(rng.integers(0, SIZE[1])))
+            cv2.circle(image, center, int(rng.integers(20, 120)), [float(v) for v in rng.integers(0, 255, 3)], -1)
+        file_name = os.path.join(directory, f"img_{i}.jpg")
+        cv2.imwrite(file_name, np.clip(image, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        file_names.append(file_name)
+    return file_names
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def ms(seconds):
+    return f"{seconds * 1000:7.1f} ms"
+
+
+def inference(args, options, photos):
+    cv2.setNumThreads(1)
+    detector = HogPersonDetector(**options) if args.backend == HOG else SsdDetector(**options)
+    seconds, found = [], 0
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        detections = detector.detect(cv2.imread(photos[i % len(photos)]))
+        seconds.append(time.perf_counter() - start)
+        found += bool(detections)
+    print(f"Inference ({args.backend}, {ROUNDS} photos, 1 thread): p50 {ms(percentile(seconds, 50))}, "
+          f"p99 {ms(percentile(seconds, 99))}, max {ms(max(seconds))}, {found} with detections")
+    return percentile(seconds, 50)
+
+
+def gate(args, options, photos, p50):
+    classes = {"person"} if args.backend == HOG else set(args.classes.split(","))
+    start = time.perf_counter()
+    gate = ClassificationGate(classes, args.backend, budget=args.budget, **options).start()
+    gate.warm_up()
+    print(f"Workers up and model loaded in {ms(time.perf_counter() - start)}")
+
+    alert = photos[:2]
+    cold = gate.check(alert)
+    print(f"Alert, cold:   {ms(cold.seconds)} -> {cold.reason}, {len(cold.detections)} detections")
+    rounds = 1000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cached = gate.check(alert)
+    print(f"Alert, cached: {ms((time.perf_counter() - start) / rounds)} -> {cached.reason}")
+    gate.close()
+
+    # A budget at a tenth of the inference time: always over
+    tight = ClassificationGate(classes, args.backend, budget=p50 / 10, **options).start()
+    tight.warm_up()
+    late = tight.check(photos[2:4])
+    time.sleep(p50 * 4)  # The workers finish anyway
+    after = tight.check(photos[2:4])
+    print(f"Budget {ms(tight.budget)}: {ms(late.seconds)} -> {late.reason}, "
+          f"{'sent' if late.send else 'NOT SENT'}; next alert {ms(after.seconds)} -> {after.reason}")
+    assert late.reason == TIMEOUT and late.send, "An alert over budget must be sent"
+    assert after.reason != TIMEOUT, "The late verdict should have been cached"
+    print(tight.describe())
+    tight.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the classification gate")
+    parser.add_argument("--backend", choices=[HOG, DNN], default=HOG)
+    parser.add_argument("--model")
+    parser.add_argument("--config")
+    parser.add_argument("--classes", default="person")
+    parser.add_argument("--budget", type=float, default=1.5)
+    parser.add_argument("photos", nargs="*")
+    args = parser.parse_args()
+    options = {"model": args.model, "config": args.config} if args.backend == DNN else {}
+    with tempfile.TemporaryDirectory() as tmp:
+        photos = [os.path.abspath(p) for p in args.photos]
+        photos = photos if len(photos) >= 4 else photos + make_photos(tmp, 8 - len(photos))
+        p50 = inference(args, options, photos)
+        gate(args, options, photos, p50)
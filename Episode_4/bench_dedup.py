@@ -0,0 +1,164 @@
+# bench_dedup.py
+#
+# Description:
+# Throughput and false-merge rates of the perceptual-hash dedup
+# (dedup.py) on a synthetic test set of 800x600 JPEG captures.
+# - Scenes: doorsteps/gardens (gradients, texture, a few
+#   rectangles and discs) with a person-sized figure somewhere.
+# - Same pairs, which should be merged: the scene again with new
+#   sensor noise, +-8% exposure drift, a 0-2 px camera shake and
+#   the figure swaying by up to 12 px, as a lingering visitor.
+# - Different pairs, which must not be merged: the figure gone, or
+#   moved by 150 px or more, or another figure arriving, on the same
+#   background (the cases where a new alert is wanted).
+# For dhash and phash, 8x8 and 16x16, and a range of thresholds it
+# prints the share of same pairs merged and of different pairs
+# merged (false merges), then the cost of hashing a decoded frame,
+# of hashing a JPEG file (1/4 scale decode + hash) and of one index
+# lookup.
+#
+# Usage: python3 bench_dedup.py [scenes]
+#
+# j3 @ Oct, 2026
+
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from dedup import DedupIndex, HASHES, read_grey, hamming
+
+SIZE = (800, 600)
+THRESHOLDS = {8: (0, 1, 2, 4, 6, 8), 16: (2, 4, 6, 8, 12, 16, 24)}  # By hash size
+FIGURE = (110, 300)  # Width and height of a standing person at a few metres
+
+
+def make_background(rng):
+    w, h = SIZE
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    a, b = rng.uniform(-0.2, 0.2, 2)
+    image = np.dstack([60 + a * x + b * y + c for c in rng.uniform(0, 80, 3)])
+    texture = cv2.resize(rng.uniform(-30, 30, (h // 8, w // 8, 3)).astype(np.float32), SIZE)
+    image += texture
+    for _ in range(rng.integers(3, 7)):
+        x0, y0 = int(rng.integers(0, w - 100)), int(rng.integers(0, h - 100))
+        cv2.rectangle(image, (x0, y0), (x0 + int(rng.integers(40, 250)), y0 + int(rng.integers(40, 250))),
+                      [float(v) for v in rng.uniform(0, 255, 3)], -1)
+    for _ in range(rng.integers(2, 6)):
+        center = (int(rng.integers(0, w)), int(rng.integers(0, h)))
+        cv2.circle(image, center, int(rng.integers(15, 80)), [float(v) for v in rng.uniform(0, 255, 3)], -1)
+    return image
+
+
+def draw_figure(image, x, y, colour):
+    fw, fh = FIGURE
+    cv2.ellipse(image, (x + fw // 2, y + fh // 8), (fw // 5, fh // 9), 0, 0, 360, colour, -1)
+    cv2.rectangle(image, (x + fw // 6, y + fh // 4), (x + fw - fw // 6, y + fh * 2 // 3), colour, -1)
+    cv2.rectangle(image, (x + fw // 4, y + fh * 2 // 3), (x + fw - fw // 4, y + fh), colour, -1)
+
+
+def render(background, figures, rng, shake=0, gain=1.0):
+    image = background.copy()
+    for x, y, colour in figures:
+        draw_figure(image, x, y, colour)
+    if shake:
+        dx, dy = rng.integers(-shake, shake + 1, 2)
+        image = cv2.warpAffine(image, np.float32([[1, 0, dx], [0, 1, dy]]), SIZE, borderMode=cv2.BORDER_REFLECT)
+    image = image * gain + rng.normal(0, 6, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def make_test_set(directory, scenes, seed=1):
+    # Lists of (file, file) pairs: same, different
+    rng = np.random.default_rng(seed)
+    w, h = SIZE
+    same, different = [], []
+
+    def save(image, name):
+        file_name = os.path.join(directory, name)
+        cv2.imwrite(file_name, image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        return file_name
+
+    for i in range(scenes):
+        background = make_background(rng)
+        colour = [float(v) for v in rng.uniform(0, 255, 3)]
+        x, y = int(rng.integers(0, w - FIGURE[0] - 200)), int(rng.integers(0, h - FIGURE[1]))
+        base = save(render(background, [(x, y, colour)], rng), f"s{i}_base.jpg")
+        for j in range(3):
+            sway = rng.integers(-12, 13, 2)
+            image = render(background, [(x + int(sway[0]), min(h - FIGURE[1], max(0, y + int(sway[1]))), colour)],
+                           rng, shake=2, gain=rng.uniform(0.92, 1.08))
+            same.append((base, save(image, f"s{i}_same{j}.jpg")))
+        moved = x + int(rng.integers(150, 200))
+        other = ([float(v) for v in rng.uniform(0, 255, 3)],
+                 int(rng.integers(0, w - FIGURE[0])), int(rng.integers(0, h - FIGURE[1])))
+        for j, figures in enumerate([[], [(moved, y, colour)],
+                                     [(x, y, colour), (other[1], other[2], other[0])]]):
+            different.append((base, save(render(background, figures, rng, shake=2), f"s{i}_diff{j}.jpg")))
+    return same, different
+
+
+def rates(same, different, method, size):
+    hash_ = HASHES[method]
+    cache = {}
+
+    def value(file_name):
+        if file_name not in cache:
+            cache[file_name] = hash_(read_grey(file_name), size)
+        return cache[file_name]
+
+    d_same = np.array([hamming(value(a), value(b)) for a, b in same])
+    d_diff = np.array([hamming(value(a), value(b)) for a, b in different])
+    print(f"{method} {size}x{size}: same pairs median {np.median(d_same):.0f} bits (max {d_same.max()}), "
+          f"different pairs median {np.median(d_diff):.0f} bits (min {d_diff.min()})")
+    print(f"  {'threshold':>9} {'merged':>7} {'false merges':>12}   (figure gone / moved / added)")
+    kinds = d_diff.reshape(-1, 3)
+    for threshold in THRESHOLDS[size]:
+        by_kind = " / ".join(f"{rate:.0%}" for rate in np.mean(kinds <= threshold, axis=0))
+        print(f"  {threshold:>9} {np.mean(d_same <= threshold):>7.1%} {np.mean(d_diff <= threshold):>12.1%}"
+              f"   ({by_kind})")
+
+
+def throughput(files, method, size):
+    hash_ = HASHES[method]
+    greys = [read_grey(f) for f in files]
+    rounds = 2000
+    start = time.perf_counter()
+    for i in range(rounds):
+        hash_(greys[i % len(greys)], size)
+    per_hash = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for f in files:
+        hash_(read_grey(f), size)
+    per_file = (time.perf_counter() - start) / len(files)
+    line = (f"{method} {size}x{size}: {per_hash * 1e6:4.0f} us per decoded frame, "
+            f"{per_file * 1000:4.1f} ms per JPEG file")
+    for capacity in (64, 1024):
+        index = DedupIndex(capacity=capacity, threshold=0, window=1e9, method=method, size=size)
+        values = np.random.default_rng(2).integers(0, 256, (capacity + rounds, size * size // 8), dtype=np.uint8)
+        for i in range(capacity):
+            index.check(values[i], i, now=float(i))
+        start = time.perf_counter()
+        for i in range(capacity, capacity + rounds):
+            index.check(values[i], i, now=float(i))
+        line += f", lookup in {capacity}: {(time.perf_counter() - start) / rounds * 1e6:.0f} us"
+    print(line)
+
+
+if __name__ == "__main__":
+    scenes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cv2.setNumThreads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        same, different = make_test_set(tmp, scenes)
+        print(f"{len(same)} same pairs, {len(different)} different pairs "
+              f"(made in {time.perf_counter() - start:.0f} s)")
+        for size in THRESHOLDS:
+            for method in HASHES:
+                rates(same, different, method, size)
+        files = sorted({f for pair in same + different for f in pair})[:200]
+        print(f"Throughput (1 thread, {SIZE[0]}x{SIZE[1]} JPEGs):")
+        for size in THRESHOLDS:
+            for method in HASHES:
+                throughput(files, method, size)
@@ -0,0 +1,147 @@
+# bench_metrics.py
+#
+# Description:
+# Cost of the instrumentation in metrics.py.
+# 1) Micro-benchmark: time per Counter.inc(), labelled inc(),
+#    Histogram.observe(), `with histogram.time()` and per
+#    Registry.render() / HTTP scrape of a registry shaped like
+#    cam28.py's.
+# 2) The 10 ms loop from cam13.py run against fake_gpio twice,
+#    bare and instrumented (loop jitter histogram on every
+#    iteration, edge counter on every edge), while a driver thread
+#    replays the same PIR trace; reports process CPU, the time
+#    spent per iteration and the loop jitter both runs saw.
+# Warm, a call costs around a microsecond; in the loop, where the
+# caches are cold after every 10 ms sleep, it measured 10-20 us per
+# iteration on a desktop, i.e. about 0.1-0.2% of the period.
+#
+# Usage: python3 bench_metrics.py [seconds]
+#
+# j3 @ Oct, 2026
+
+import sys
+import threading
+import time
+import urllib.request
+import fake_gpio as GPIO
+from bench_pir import make_trace, replay, PIR_PIN, LED_PIN
+from metrics import Registry, MetricsServer, JITTER_BUCKETS
+
+LOOP_INTERVAL = 0.01
+
+
+def per_call(func, n=200_000):
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n
+
+
+def make_registry():
+    # Same metrics as cam28.py
+    registry = Registry()
+    registry.counter("pir_edges", "PIR edges", ["edge"])
+    registry.histogram("loop_jitter_seconds", "Loop lateness", buckets=JITTER_BUCKETS)
+    registry.histogram("trigger_to_capture_seconds", "Trigger to photo on disk")
+    registry.histogram("capture_seconds", "Burst grab and scoring")
+    registry.histogram("encode_seconds", "JPEG encode and write")
+    registry.histogram("email_send_seconds", "SMTP send")
+    registry.counter("email_failures", "Failed emails")
+    depth = registry.gauge("queue_depth", "Pipeline queue depth", ["stage"])
+    for stage in ("capture", "persist", "shrink", "notify"):
+        depth.labels(stage=stage).set_function(lambda: 0)
+    return registry
+
+
+def micro():
+    registry = make_registry()
+    edges = registry.metrics["pir_edges"]
+    rising = edges.labels(edge="rising")
+    histogram = registry.metrics["loop_jitter_seconds"]
+    for _ in range(1000):
+        histogram.observe(0.0004)
+        registry.metrics["email_send_seconds"].observe(1.3)
+
+    def timed():
+        with histogram.time():
+            pass
+
+    print("Per call:")
+    print(f"  Counter.inc()              {per_call(rising.inc) * 1e9:7.0f} ns")
+    print(f"  labels(...).inc()          {per_call(lambda: edges.labels(edge='rising').inc()) * 1e9:7.0f} ns")
+    print(f"  Histogram.observe()        {per_call(lambda: histogram.observe(0.0004)) * 1e9:7.0f} ns")
+    print(f"  with Histogram.time()      {per_call(timed) * 1e9:7.0f} ns")
+    print(f"  Registry.render()          {per_call(registry.render, 2000) * 1e6:7.1f} us "
+          f"({len(registry.render())} bytes)")
+
+    server = MetricsServer(registry, port=0).start()
+    url = f"http://127.0.0.1:{server.httpd.server_address[1]}/metrics"
+    scrape = per_call(lambda: urllib.request.urlopen(url).read(), 200)
+    server.close()
+    print(f"  HTTP scrape of /metrics    {scrape * 1e3:7.2f} ms")
+
+
+def polling_loop(stop, registry):
+    # The loop from cam13.py; registry=None runs it bare
+    if registry is not None:
+        jitter = registry.metrics["loop_jitter_seconds"]
+        rising = registry.metrics["pir_edges"].labels(edge="rising")
+        falling = registry.metrics["pir_edges"].labels(edge="falling")
+    last_pir_state = GPIO.input(PIR_PIN)
+    iterations = 0
+    busy = 0.0
+    lateness = []  # Kept by both runs, to compare with the histogram
+    next_time = time.monotonic() + LOOP_INTERVAL
+    while not stop.is_set():
+        time.sleep(max(0.0, next_time - time.monotonic()))
+        woke = time.monotonic()
+        late = woke - next_time
+        next_time = woke + LOOP_INTERVAL
+        lateness.append(late)
+        start = time.perf_counter()
+        pir_state = GPIO.input(PIR_PIN)
+        GPIO.output(LED_PIN, GPIO.HIGH if pir_state == GPIO.HIGH else GPIO.LOW)
+        if registry is not None:
+            jitter.observe(late)
+            if pir_state != last_pir_state:
+                (rising if pir_state == GPIO.HIGH else falling).inc()
+        last_pir_state = pir_state
+        busy += time.perf_counter() - start
+        iterations += 1
+    return iterations, busy, lateness
+
+
+def run(label, seconds, trace, registry):
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(PIR_PIN, GPIO.IN)
+    GPIO.setup(LED_PIN, GPIO.OUT)
+    stop = threading.Event()
+    driver = threading.Thread(target=replay, args=(trace, time.monotonic(), []), daemon=True)
+    cpu = time.process_time()
+    driver.start()
+    threading.Timer(seconds, stop.set).start()
+    iterations, busy, lateness = polling_loop(stop, registry)
+    cpu = time.process_time() - cpu
+    lateness.sort()
+    p50 = lateness[len(lateness) // 2]
+    p99 = lateness[int(len(lateness) * 0.99)]
+    print(f"{label:<13} CPU {cpu / seconds * 100:5.2f}%  {iterations} iterations  "
+          f"{busy / iterations * 1e6:6.1f} us/iteration  jitter p50 {p50 * 1000:.3f} ms  p99 {p99 * 1000:.3f} ms")
+    return busy / iterations
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    micro()
+    print(f"\n10 ms loop, {seconds:.0f} s:")
+    trace = make_trace(seconds)
+    bare = run("bare", seconds, trace, None)
+    registry = make_registry()
+    instrumented = run("instrumented", seconds, trace, registry)
+    jitter = registry.metrics["loop_jitter_seconds"]
+    print(f"Overhead: {(instrumented - bare) * 1e6:.1f} us per iteration "
+          f"({(instrumented - bare) / LOOP_INTERVAL * 100:.3f}% of the 10 ms period)")
+    print(f"Histogram: {jitter.count} observations, p50 <= {jitter.quantile(0.5) * 1000:.1f} ms, "
+          f"p99 <= {jitter.quantile(0.99) * 1000:.1f} ms, "
+          f"edges {registry.metrics['pir_edges'].snapshot()}")
@@ -0,0 +1,123 @@
+# bench_mjpeg.py
+#
+# Description:
+# Load test for mjpeg_server.py. The server runs in its own process
+# on the fake camera (fakes/), and this script opens more and more
+# local clients on /stream.mjpg. For each client count it reports:
+# - the server CPU per client (from the server's /stats), to check
+#   that the single shared encode keeps the per-client cost small
+# - frames per second received by each client
+# - frame latency: capture time (the X-Timestamp part header) to
+#   the frame fully received by the client, median and p99
+# One extra "slow" client reads at a trickle: once its socket buffers
+# are full it falls behind ("slow behind" frames, all skipped) while
+# the server's memory stays flat.
+#
+# Usage: python3 bench_mjpeg.py [--clients 1,10,50] [--seconds 5]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def get_stats(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /stats HTTP/1.0\r\n\r\n")
+    data = await reader.read()
+    writer.close()
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+
+async def client(port, latencies, counts, index, stop, slow=False):
+    if slow:
+        # Small buffers on our side too, so the server sees the backlog
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 32 * 1024)
+        sock.connect(("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=64 * 1024)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1024 * 1024)
+    writer.write(b"GET /stream.mjpg HTTP/1.0\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")  # Response headers
+    try:
+        while not stop.is_set():
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = timestamp = 0
+            for line in headers.split(b"\r\n"):
+                if line.startswith(b"Content-Length:"):
+                    length = int(line.split(b":")[1])
+                elif line.startswith(b"X-Timestamp:"):
+                    timestamp = float(line.split(b":")[1])
+            if slow:
+                # ~20 kB/s: far slower than the stream
+                for _ in range(0, length + 2, 2048):
+                    await reader.readexactly(min(2048, length + 2))
+                    await asyncio.sleep(0.1)
+                    length -= 2048
+                continue
+            await reader.readexactly(length + 2)
+            latencies.append(time.time() - timestamp)
+            counts[index] += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+async def run(port, client_counts, seconds):
+    print(f"{'clients':>7} {'fps/client':>10} {'CPU/client':>10} {'server CPU':>10} "
+          f"{'lat p50':>8} {'lat p99':>8} {'slow behind':>11} {'RSS MB':>7}")
+    for n in client_counts:
+        stop = asyncio.Event()
+        latencies, counts = [], [0] * n
+        tasks = [asyncio.create_task(client(port, latencies, counts, i, stop)) for i in range(n)]
+        tasks.append(asyncio.create_task(client(port, [], [0], 0, stop, slow=True)))
+        await asyncio.sleep(1.0)  # Warm up
+        latencies.clear()
+        counts[:] = [0] * n
+        before = await get_stats(port)
+        await asyncio.sleep(seconds)
+        after = await get_stats(port)
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        cpu = (after["cpu_seconds"] - before["cpu_seconds"]) / seconds * 100
+        print(f"{n:>7} {sum(counts) / n / seconds:>10.1f} {cpu / n:>9.2f}% {cpu:>9.1f}% "
+              f"{percentile(latencies, 0.5) * 1000:>6.1f}ms {percentile(latencies, 0.99) * 1000:>6.1f}ms "
+              f"{after['frames_behind']:>11} {after['max_rss_kb'] / 1024:>7.1f}")
+        await asyncio.sleep(0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the MJPEG live view")
+    parser.add_argument("--clients", default="1,10,50")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fps", type=float, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.path.join(HERE, "fakes"))
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, "mjpeg_server.py"),
+                               "--host", "127.0.0.1", "--port", str(args.port), "--fps", str(args.fps)],
+                              env=env, stdout=subprocess.DEVNULL)
+    try:
+        time.sleep(2.0)  # Camera start
+        asyncio.run(run(args.port, [int(n) for n in args.clients.split(",")], args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
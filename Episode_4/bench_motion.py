@@ -0,0 +1,84 @@
+# bench_motion.py
+#
+# Description:
+# Measures how many frames per second BlockMotionDetector
+# (motion.py) processes on this machine, using either a recorded
+# video (only its brightness is used) or a synthetic 320x240
+# sequence: a noisy background with a square walking back and
+# forth across it for the middle third of the frames. For the
+# synthetic sequence it also reports how many frames with and
+# without the square were flagged as motion (the frames just
+# after the square leaves count as "without").
+#
+# Usage: python3 bench_motion.py [video_file] [--size WxH]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import time
+import cv2
+import numpy as np
+from motion import BlockMotionDetector, roi_from_rects
+
+
+def synthetic_frames(size, count, seed=1):
+    # Yields (y_plane, has_motion)
+    width, height = size
+    rng = np.random.default_rng(seed)
+    background = rng.integers(40, 200, (height, width), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+    for i in range(count):
+        frame = background.copy()
+        noise = rng.integers(-4, 5, frame.shape, dtype=np.int16)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        has_motion = count // 3 <= i < 2 * count // 3
+        if has_motion:
+            # Walks across the frame in 3 s at 30 fps, back and forth
+            phase = (i - count // 3) % 180
+            x = int(min(phase, 180 - phase) / 90 * (width - 60))
+            frame[height // 2 - 30:height // 2 + 30, x:x + 60] = 230
+        yield frame, has_motion
+
+
+def video_frames(file_name, size):
+    cap = cv2.VideoCapture(file_name)
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        y = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        yield cv2.resize(y, size), None
+    cap.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the block motion detector")
+    parser.add_argument("video", nargs="?", help="recorded video (default: synthetic frames)")
+    parser.add_argument("--size", default="320x240", help="Y plane size, e.g. 320x240")
+    parser.add_argument("--frames", type=int, default=900, help="synthetic frame count")
+    args = parser.parse_args()
+    size = tuple(int(n) for n in args.size.split("x"))
+
+    if args.video:
+        frames = list(video_frames(args.video, size))
+    else:
+        frames = list(synthetic_frames(size, args.frames))
+
+    # Ignore the top 10% of the frame (e.g. a clock on the wall)
+    grid = (size[1] // 16, size[0] // 16)
+    detector = BlockMotionDetector((size[1], size[0]), roi=roi_from_rects(grid, [(0, 0.1, 1, 1)]))
+
+    flags = []
+    t = time.perf_counter()
+    for y, _ in frames:
+        flags.append(detector.update(y))
+    elapsed = time.perf_counter() - t
+    print(f"{len(frames)} frames of {size[0]}x{size[1]}: "
+          f"{len(frames) / elapsed:.0f} frames/s ({elapsed / len(frames) * 1e6:.0f} us/frame)")
+
+    truth = [m for _, m in frames]
+    if truth[0] is not None:
+        moving = [f for f, m in zip(flags, truth) if m]
+        still = [f for f, m in zip(flags, truth) if not m]
+        print(f"Flagged {sum(moving)}/{len(moving)} frames with motion, "
+              f"{sum(still)}/{len(still)} frames without")
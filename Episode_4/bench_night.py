@@ -0,0 +1,124 @@
+# bench_night.py
+#
+# Description:
+# Quality and cost of the night stack (night.py) on synthetic
+# low-light 800x600 frames: a textured scene at ~1/8 of its daylight
+# brightness, with heavy sensor noise (high analogue gain) and a
+# camera that sways by up to SWAY pixels between frames.
+# 1) PSNR against the clean scene and JPEG size (quality 90) of a
+#    single frame, of a plain average of N frames, and of an average
+#    of N aligned frames
+# 2) Cost per frame of add() (plain and aligned) and of result(),
+#    and how many frames fit the latency budget at typical night
+#    frame rates
+# 3) Memory allocated by NumPy while stacking (tracemalloc): the
+#    frame sized buffers are all made up front
+#
+# Usage: python3 bench_night.py [frames] [budget seconds]
+#
+# j3 @ Oct, 2026
+
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from night import NightStack
+
+SIZE = (800, 600)
+SWAY = 3.0  # Pixels
+DARKNESS = 0.125
+NOISE = 9.0  # Standard deviation, in grey levels
+BORDER = 16  # Left out of the PSNR (the shifted-in edges)
+
+
+def make_scene(rng):
+    w, h = SIZE
+    y, x = np.mgrid[0:h, 0:w].astype(np.float32)
+    image = np.dstack([80 + 0.1 * x + c for c in (0, 20, 40)]).astype(np.uint8)
+    for _ in range(30):
+        x0, y0 = int(rng.integers(0, w - 60)), int(rng.integers(0, h - 60))
+        cv2.rectangle(image, (x0, y0), (x0 + int(rng.integers(10, 120)), y0 + int(rng.integers(10, 120))),
+                      [float(v) for v in rng.uniform(0, 255, 3)], -1)
+    cv2.putText(image, "1234 AB", (250, 320), cv2.FONT_HERSHEY_SIMPLEX, 3, (250, 250, 250), 6)
+    return image.astype(np.float32) * DARKNESS
+
+
+def make_frames(scene, n, rng):
+    # The first frame is not moved, so it is also the reference
+    frames = []
+    for i in range(n):
+        dx, dy = (0.0, 0.0) if i == 0 else rng.uniform(-SWAY, SWAY, 2)
+        moved = cv2.warpAffine(scene, np.float32([[1, 0, dx], [0, 1, dy]]), SIZE, borderMode=cv2.BORDER_REFLECT)
+        frames.append(np.clip(moved + rng.normal(0, NOISE, moved.shape), 0, 255).astype(np.uint8))
+    return frames
+
+
+def psnr(image, reference):
+    crop = (slice(BORDER, -BORDER), slice(BORDER, -BORDER))
+    error = image[crop].astype(np.float32) - reference[crop]
+    return 10 * np.log10(255 ** 2 / np.mean(error ** 2))
+
+
+def jpeg_kb(image):
+    return len(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1]) / 1024
+
+
+def stack(frames, align):
+    night = NightStack(None, frames[0].shape, count=len(frames), align=align)
+    night.reset()
+    for frame in frames:
+        night.add(frame)
+    return night.result().copy(), night
+
+
+def per_call(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    cv2.setNumThreads(1)
+    rng = np.random.default_rng(1)
+    scene = make_scene(rng)
+    reference = np.clip(scene, 0, 255).astype(np.uint8)
+    frames = make_frames(scene, n, rng)
+
+    print(f"{n} frames at {SIZE[0]}x{SIZE[1]}, noise {NOISE:.0f} levels, sway up to {SWAY:.0f} px:")
+    plain, _ = stack(frames, align=False)
+    aligned, night = stack(frames, align=True)
+    for name, image in (("single frame", frames[0]), ("plain average", plain), ("aligned average", aligned)):
+        print(f"  {name:<16} PSNR {psnr(image, reference):5.1f} dB, JPEG {jpeg_kb(image):5.0f} kB")
+    print(f"  {night.rejected} frames rejected by the alignment")
+
+    print("Cost per call (1 thread):")
+    rounds = 50
+    costs = {}
+    for align in (False, True):
+        night = NightStack(None, frames[0].shape, count=257, align=align)
+        night.reset()
+        night.add(frames[0])
+        costs[align] = per_call(lambda: night.add(frames[1 + rng.integers(0, n - 1)]), rounds)
+        print(f"  add(), {'aligned' if align else 'plain':<7} {costs[align] * 1000:6.2f} ms")
+    print(f"  result()        {per_call(night.result, rounds) * 1000:6.2f} ms")
+    for fps in (30, 15, 10, 5):
+        # grab() stops once the next frame would pass 3/4 of the budget
+        per_frame = max(1 / fps, costs[True])
+        fits = min(n, max(1, int(budget * 0.75 / per_frame)))
+        print(f"  at {fps:>2} fps: {fits} aligned frames in {budget * 0.75:.2f} s of a {budget:.1f} s budget")
+
+    night = NightStack(None, frames[0].shape, count=257, align=True)
+    night.reset()
+    night.add(frames[0])
+    tracemalloc.start()
+    for i in range(100):
+        night.add(frames[1 + i % (n - 1)])
+    night.result()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"NumPy memory allocated while stacking 100 frames: peak {peak / 1024:.1f} kB "
+          f"(one frame is {frames[0].nbytes / 1024:.0f} kB, {night.nbytes() / 1024 ** 2:.1f} MB preallocated)")
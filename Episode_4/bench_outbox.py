@@ -0,0 +1,173 @@
+# bench_outbox.py
+#
+# Description:
+# Outage test for the durable outbox (outbox.py) against a local
+# aiosmtpd server (pip install aiosmtpd). Each connection to the
+# server costs LOGIN_DELAY seconds, standing in for the TCP + TLS
+# + login round trips to Gmail.
+# 1) The server is down while ALERTS alerts are queued over
+#    OUTAGE seconds, then comes back. Compared:
+#    - one by one: a sender thread that sends the alerts in order,
+#      each on a fresh connection and retried every second until it
+#      goes through, what a retry loop around yag.send would do
+#    - outbox:     Outbox with 2 workers and batches of 10
+#    For each: seconds from the server coming back to the backlog
+#    being delivered, and the number of logins.
+# 2) Restart: alerts queued during an outage, the outbox closed and
+#    opened again (as after a reboot), then the server comes back;
+#    every alert must arrive exactly once.
+#
+# Usage: python3 bench_outbox.py [alerts] [outage seconds]
+#
+# j3 @ Oct, 2026
+
+import asyncio
+import os
+import queue
+import smtplib
+import sys
+import tempfile
+import threading
+import time
+from aiosmtpd.controller import Controller
+from outbox import Outbox
+from smtp_pool import SmtpPool, build_alert
+
+HOST = "127.0.0.1"
+PORT = 8025
+LOGIN_DELAY = 0.3
+PHOTO_SIZE = 60 * 1024  # A shrunk attachment
+
+
+class SlowLoginHandler:
+    def __init__(self):
+        self.received = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(LOGIN_DELAY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(envelope.content)
+        return "250 Message accepted for delivery"
+
+
+class Server:
+    # The local SMTP server, which can be taken down and brought back
+    def __init__(self):
+        self.handler = SlowLoginHandler()
+        self.controller = None
+
+    def up(self):
+        self.controller = Controller(self.handler, hostname=HOST, port=PORT)
+        self.controller.start()
+
+    def down(self):
+        if self.controller is not None:
+            self.controller.stop()
+            self.controller = None
+
+
+def build():
+    return lambda files, meta: build_alert("pi@example.com", "me@example.com", files,
+                                           subject=f"Movement detected! #{meta['n']}")
+
+
+def wait_received(server, count, timeout=60):
+    deadline = time.monotonic() + timeout
+    while len(server.handler.received) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(server.handler.received)
+
+
+def one_by_one(server, photo, alerts, outage):
+    server.handler.received.clear()
+    todo = queue.Queue()
+    logins = 0
+
+    def sender():
+        nonlocal logins
+        for _ in range(alerts):
+            msg = build()([photo], {"n": todo.get()})
+            while True:
+                try:
+                    with smtplib.SMTP(HOST, PORT, timeout=10) as smtp:
+                        logins += 1
+                        smtp.send_message(msg)
+                    break
+                except OSError:
+                    time.sleep(1.0)
+
+    thread = threading.Thread(target=sender, daemon=True)
+    thread.start()
+    for n in range(alerts):
+        todo.put(n)
+        time.sleep(outage / alerts)
+    server.up()
+    back = time.monotonic()
+    thread.join()
+    elapsed = time.monotonic() - back
+    server.down()
+    print(f"  one by one: drained in {elapsed:5.2f} s, {logins:>3} logins, "
+          f"{len(server.handler.received)}/{alerts} received")
+
+
+def with_outbox(server, photo, alerts, outage, db):
+    server.handler.received.clear()
+    pool = SmtpPool("pi@example.com", None, host=HOST, port=PORT, size=2, starttls=False, timeout=10)
+    outbox = Outbox(db, pool, build(), workers=2, batch_size=10, base_delay=1.0, max_delay=1.0).start()
+    for n in range(alerts):
+        outbox.put([photo], n=n)
+        time.sleep(outage / alerts)
+    server.up()
+    back = time.monotonic()
+    received = wait_received(server, alerts)
+    elapsed = time.monotonic() - back
+    outbox.close()
+    pool.close()
+    server.down()
+    print(f"  outbox:     drained in {elapsed:5.2f} s, {pool.connects:>3} logins, "
+          f"{received}/{alerts} received ({outbox.batches} batches)")
+
+
+def restart(server, photo, alerts, db):
+    server.handler.received.clear()
+    pool = SmtpPool("pi@example.com", None, host=HOST, port=PORT, size=2, starttls=False, timeout=10)
+    outbox = Outbox(db, pool, build(), base_delay=0.5, max_delay=0.5).start()
+    for n in range(alerts):
+        outbox.put([photo], n=n)
+    time.sleep(1.0)
+    outbox.close(timeout=0)
+    pool.close()
+    print(f"  closed with {alerts} alerts queued during the outage")
+
+    pool = SmtpPool("pi@example.com", None, host=HOST, port=PORT, size=2, starttls=False, timeout=10)
+    outbox = Outbox(db, pool, build(), base_delay=0.5, max_delay=0.5)
+    print(f"  reopened: {outbox.pending()} waiting")
+    server.up()
+    outbox.start()
+    wait_received(server, alerts)
+    time.sleep(1.0)  # Would catch any duplicate
+    waiting = outbox.pending()
+    outbox.close()
+    pool.close()
+    server.down()
+    subjects = [content.split(b"Subject: ", 1)[1].split(b"\r\n", 1)[0] for content in server.handler.received]
+    print(f"  after restart: {len(subjects)} received, {len(set(subjects))} distinct, "
+          f"{waiting} still waiting")
+
+
+if __name__ == "__main__":
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    outage = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    server = Server()
+    with tempfile.TemporaryDirectory() as tmp:
+        photo = os.path.join(tmp, "photo.jpg")
+        with open(photo, "wb") as f:
+            f.write(os.urandom(PHOTO_SIZE))
+        print(f"{alerts} alerts during a {outage:.0f} s outage, {LOGIN_DELAY * 1000:.0f} ms per login:")
+        one_by_one(server, photo, alerts, outage)
+        with_outbox(server, photo, alerts, outage, os.path.join(tmp, "outbox.db"))
+        print("Restart during an outage:")
+        restart(server, photo, 20, os.path.join(tmp, "restart.db"))
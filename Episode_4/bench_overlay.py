@@ -0,0 +1,67 @@
+# bench_overlay.py
+#
+# Description:
+# Microbenchmark of the per-frame cost of the timestamp overlay:
+# - apply_text: the function from cam11.py-cam18.py (strftime,
+#               getTextSize and putText on every frame)
+# - overlay:    the cached Overlay from overlay.py
+# - overlay x3: the cached Overlay with three text items
+# - overlay_binary: the cached Overlay with a hard 0/1 glyph mask,
+#                   the path taken with the OpenCV 4.x of Raspberry
+#                   Pi OS, whose putText is not anti-aliased
+# It runs on plain NumPy frames, so no camera is needed, and
+# checks that both versions draw the same pixels.
+#
+# Usage: python3 bench_overlay.py [frames]
+#
+# j3 @ Oct, 2026
+
+import sys
+import time, cv2
+import numpy as np
+from overlay import Overlay, TextItem, timestamp_item, TOP_LEFT, TOP_RIGHT
+
+resolution = (800, 600)
+
+
+def apply_text(array):
+    colour = (255, 255, 255)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    scale = 1
+    thickness = 1
+    text = time.strftime("%d%m%Y %H:%M")
+    text_size, _ = cv2.getTextSize(text, font, scale, thickness)
+    x = resolution[0] - text_size[0] - 10
+    y = resolution[1] - 10
+    cv2.putText(array, text, (x, y), font, scale, colour, thickness)
+
+
+def bench(name, draw, frames):
+    frame = np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+    draw(frame)  # Warm up (first render of the cached masks)
+    t = time.perf_counter()
+    for _ in range(frames):
+        draw(frame)
+    per_frame = (time.perf_counter() - t) / frames
+    print(f"{name:>17}: {per_frame * 1e6:8.1f} us/frame  "
+          f"({per_frame * 30 * 100:.3f}% of a 30 fps frame budget)")
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    a = np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+    b = a.copy()
+    apply_text(a)
+    Overlay(resolution, [timestamp_item()]).draw(b)
+    diff = np.abs(a.astype(int) - b.astype(int))
+    print(f"Pixels differing from apply_text: {np.count_nonzero(diff)} (max difference {diff.max()})")
+
+    bench("apply_text", apply_text, frames)
+    bench("overlay", Overlay(resolution, [timestamp_item()]).draw, frames)
+    bench("overlay_binary", Overlay(resolution, [timestamp_item(binary=True)]).draw, frames)
+    bench("overlay x3", Overlay(resolution, [
+        timestamp_item(),
+        TextItem(lambda: "Front door", anchor=TOP_LEFT, refresh=None),
+        TextItem(lambda: "PIR armed", anchor=TOP_RIGHT, refresh=1.0, scale=0.6),
+    ]).draw, frames)
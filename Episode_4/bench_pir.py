@@ -0,0 +1,125 @@
+# bench_pir.py
+#
+# Description:
+# Compares the 10 ms polling loop from cam13.py with the
+# interrupt-driven PirEdgeDetector from pir_events.py.
+# Both run against fake_gpio while a driver thread replays
+# the same synthetic PIR trace. For each mode it reports:
+# - CPU time used by the whole process
+# - how many times the LED pin was written
+# - how late the rising-edge timestamp was (mean/max)
+# - how many photos would have been taken
+#
+# Usage: python3 bench_pir.py [seconds]
+#
+# j3 @ Oct, 2026
+
+import random
+import sys
+import threading
+import time
+import fake_gpio as GPIO
+from pir_events import PirEdgeDetector
+
+PIR_PIN = 4
+LED_PIN = 17
+MOV_DETECT_THRESHOLD = 0.3  # Scaled down so the bench finishes quickly
+MIN_DURATION_BETWEEN_PHOTOS = 1.0
+
+
+def make_trace(duration, seed=1):
+    # List of (offset, level): short blips and a few sustained motions
+    rng = random.Random(seed)
+    trace, t = [], 0.2
+    while t < duration:
+        high = rng.choice([0.05, 0.1, 0.5, 1.5])
+        trace.append((t, GPIO.HIGH))
+        trace.append((t + high, GPIO.LOW))
+        t += high + rng.uniform(0.2, 1.0)
+    return trace
+
+
+def replay(trace, start, actual_rises):
+    for offset, level in trace:
+        delay = start + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if level == GPIO.HIGH:
+            actual_rises.append(time.monotonic())
+        GPIO.set_input(PIR_PIN, level)
+
+
+def polling_loop(stop, rises, photos):
+    # The loop from cam13.py, with time.monotonic() instead of time.time()
+    last_pir_state = GPIO.input(PIR_PIN)
+    movement_timer = time.monotonic()
+    last_time_photo_taken = 0
+    while not stop.is_set():
+        time.sleep(0.01)
+        pir_state = GPIO.input(PIR_PIN)
+        GPIO.output(LED_PIN, GPIO.HIGH if pir_state == GPIO.HIGH else GPIO.LOW)
+        if last_pir_state == GPIO.LOW and pir_state == GPIO.HIGH:
+            movement_timer = time.monotonic()
+            rises.append(movement_timer)
+        if last_pir_state == GPIO.HIGH and pir_state == GPIO.HIGH:
+            if time.monotonic() - movement_timer > MOV_DETECT_THRESHOLD:
+                if time.monotonic() - last_time_photo_taken > MIN_DURATION_BETWEEN_PHOTOS:
+                    photos.append(movement_timer)
+                    last_time_photo_taken = time.monotonic()
+        last_pir_state = pir_state
+
+
+def setup():
+    GPIO.cleanup()
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(PIR_PIN, GPIO.IN)
+    GPIO.setup(LED_PIN, GPIO.OUT)
+
+
+def run(mode, trace, duration):
+    setup()
+    actual_rises, rises, photos = [], [], []
+    writes_before = GPIO.output_writes()
+    stop = threading.Event()
+    cpu_start = time.process_time()
+    start = time.monotonic()
+
+    if mode == "polling":
+        worker = threading.Thread(target=polling_loop, args=(stop, rises, photos))
+        worker.start()
+    else:
+        detector = PirEdgeDetector(GPIO, PIR_PIN, photos.append, led_pin=LED_PIN,
+                                   threshold=MOV_DETECT_THRESHOLD,
+                                   min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+        detector.start()
+
+    replay(trace, start, actual_rises)
+    time.sleep(max(0.0, start + duration - time.monotonic()))
+    stop.set()
+    if mode == "polling":
+        worker.join()
+    else:
+        detector.stop()
+        rises = [e.timestamp for e in detector.edges if e.level == GPIO.HIGH]
+
+    cpu = time.process_time() - cpu_start
+    # Pair every detected rise with the injected one just before it
+    delays = []
+    for detected in rises:
+        before = [a for a in actual_rises if a <= detected]
+        if before:
+            delays.append(detected - before[-1])
+    mean_delay = sum(delays) / len(delays) if delays else 0.0
+    max_delay = max(delays) if delays else 0.0
+    print(f"{mode:>8}: cpu {cpu * 1000:7.1f} ms  "
+          f"led writes {GPIO.output_writes() - writes_before:5d}  "
+          f"edge delay mean {mean_delay * 1000:6.3f} ms max {max_delay * 1000:6.3f} ms  "
+          f"photos {len(photos)}")
+
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    trace = make_trace(duration - 1.0)
+    print(f"Replaying {len(trace)} PIR edges over {duration:.0f}s")
+    run("polling", trace, duration)
+    run("events", trace, duration)
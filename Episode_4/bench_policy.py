@@ -0,0 +1,126 @@
+# bench_policy.py
+#
+# Description:
+# Offline tuning of the trigger policy (trigger_policy.py) on a
+# synthetic week of PIR output, or on recorded trace files:
+# - visits:    ~40 a day, mostly in daytime, 3-60 s of motion in
+#              chunks of 1-8 s with short gaps
+# - long stays: 2 a day of 10-30 min (gardening, a delivery van...)
+#              with sparse motion
+# - noise:     ~150 blips a day of 0.05-1.5 s, day and night
+# It sweeps a 20 x 20 grid of thresholds x cooldowns with sweep()
+# and with TriggerPolicy.replay() run once per setting, checks that
+# both give the same triggers everywhere, and prints the timings and
+# the results for a few settings, including the cam13.py values
+# (3 s / 60 s) and the 5 s cooldown of the earlier scripts.
+# Then a randomized check: short random traces at odd timestamps and
+# random settings, where replay() and sweep() must give the same
+# trigger count and worst hour every time (float rounding at the end
+# of a cooldown once made replay() loop forever).
+#
+# Usage: python3 bench_policy.py [--days 7] [--random 2000] [trace.csv ...]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import random
+import time
+import numpy as np
+from trigger_policy import TriggerPolicy, sweep, format_sweep, load_traces
+
+THRESHOLDS = np.round(np.linspace(0.5, 10.0, 20), 2)
+COOLDOWNS = np.round(np.geomspace(5, 300, 20))
+
+
+def make_week(days, seed=1):
+    # List of (seconds, level) edges
+    rng = random.Random(seed)
+    highs = []
+    for day in range(days):
+        t0 = day * 86400
+        for _ in range(rng.randint(30, 50)):
+            t = t0 + rng.uniform(6, 22) * 3600
+            end = t + rng.uniform(3, 60)
+            while t < end:
+                high = rng.uniform(1, 8)
+                highs.append((t, t + high))
+                t += high + rng.uniform(0.2, 3)
+        for _ in range(2):
+            t = t0 + rng.uniform(8, 18) * 3600
+            end = t + rng.uniform(600, 1800)
+            while t < end:
+                high = rng.uniform(0.5, 5)
+                highs.append((t, t + high))
+                t += high + rng.uniform(5, 60)
+        for _ in range(rng.randint(120, 180)):
+            t = t0 + rng.uniform(0, 86400)
+            highs.append((t, t + rng.uniform(0.05, 1.5)))
+    # Overlapping highs are one high
+    highs.sort()
+    edges = []
+    for rise, fall in highs:
+        if edges and rise <= edges[-1][0]:
+            edges[-1] = (max(edges[-1][0], fall), 0)
+        else:
+            edges += [(rise, 1), (fall, 0)]
+    return edges
+
+
+def random_check(rounds, seed=2):
+    # Number of (trace, setting) pairs where replay() and sweep() disagree
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(rounds):
+        t = rng.uniform(0, 7200)
+        edges = []
+        for _ in range(rng.randint(1, 40)):
+            t += rng.uniform(0.01, 120)
+            high = rng.choice((rng.uniform(0.01, 10), rng.uniform(10, 5000)))
+            edges += [(t, 1), (t + high, 0)]
+            t += high
+        threshold = rng.choice((0.5, 1.0, 3.0, round(rng.uniform(0.1, 10), 3)))
+        cooldown = rng.choice((5.0, 10.0, 60.0, round(rng.uniform(0.5, 300), 3)))
+        times = TriggerPolicy(threshold, cooldown).replay(edges)
+        result = sweep(edges, [threshold], [cooldown])
+        hours = np.bincount([int((x - edges[0][0]) // 3600) for x in times]) if times else [0]
+        if len(times) != result["triggers"][0, 0] or max(hours) != result["worst_hour"][0, 0]:
+            mismatches += 1
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the trigger policy sweep")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--random", type=int, default=2000)
+    parser.add_argument("traces", nargs="*")
+    args = parser.parse_args()
+    edges = load_traces(args.traces) if args.traces else make_week(args.days)
+    settings = len(THRESHOLDS) * len(COOLDOWNS)
+    print(f"{len(edges)} edges, {settings} settings")
+
+    start = time.perf_counter()
+    result = sweep(edges, THRESHOLDS, COOLDOWNS)
+    vectorized = time.perf_counter() - start
+    print(f"sweep():  {vectorized:6.2f} s ({vectorized / settings * 1000:.2f} ms per setting)")
+
+    start = time.perf_counter()
+    scalar = np.zeros((len(THRESHOLDS), len(COOLDOWNS)), dtype=np.int64)
+    for i, threshold in enumerate(THRESHOLDS):
+        for j, cooldown in enumerate(COOLDOWNS):
+            scalar[i, j] = len(TriggerPolicy(threshold, cooldown).replay(edges))
+    replayed = time.perf_counter() - start
+    print(f"replay(): {replayed:6.2f} s ({replayed / settings * 1000:.2f} ms per setting), "
+          f"{replayed / vectorized:.0f}x slower")
+    mismatches = np.count_nonzero(scalar != result["triggers"])
+    print(f"Settings where the two disagree: {mismatches}")
+
+    # A readable subset of the grid
+    picked = {"thresholds": [0.5, 1.0, 2.0, 3.0, 5.0], "cooldowns": [5, 30, 60, 120]}
+    print()
+    print(format_sweep(sweep(edges, picked["thresholds"], picked["cooldowns"])))
+
+    start = time.perf_counter()
+    mismatches = random_check(args.random)
+    print()
+    print(f"Random traces and settings: {mismatches} of {args.random} disagree "
+          f"({time.perf_counter() - start:.1f} s)")
@@ -0,0 +1,70 @@
+# bench_sketch.py
+#
+# Description:
+# Times the pencil-sketch filter on one image:
+# - cam4:      the steps from Episode_1/cam4.py, including the
+#              toProcess.jpg write and read
+# - exact/box/downscale x2/x4/x8: SketchFilter (sketch.py)
+#              straight from the array
+# and reports how far each result is from cam4's sketch
+# (mean absolute difference in grey levels, 0-255).
+#
+# Usage: python3 bench_sketch.py [image] [--size WxH]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from sketch import SketchFilter, EXACT, BOX, DOWNSCALE
+
+
+def cam4_sketch(frame, work_dir):
+    # Episode_1/cam4.py, with the capture replaced by a JPEG write
+    file_name = os.path.join(work_dir, "toProcess.jpg")
+    cv2.imwrite(file_name, frame)
+    img = cv2.imread(file_name)
+    greyscale = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    inverted = 255 - greyscale
+    blur_inverted = cv2.GaussianBlur(inverted, (125, 125), 0)
+    inverted_blur = 255 - blur_inverted
+    return cv2.divide(greyscale, inverted_blur, scale=256)
+
+
+def timed(func, repeat):
+    func()  # Warm up
+    t = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - t) / repeat, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sketch filter")
+    parser.add_argument("image", nargs="?", help="input image (default: synthetic)")
+    parser.add_argument("--size", default="800x600", help="frame size, e.g. 800x600")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    size = tuple(int(n) for n in args.size.split("x"))
+
+    if args.image:
+        frame = cv2.resize(cv2.imread(args.image), size)
+    else:
+        rng = np.random.default_rng(1)
+        frame = cv2.GaussianBlur(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8), (0, 0), 4)
+        cv2.putText(frame, "raspiSeries", (40, size[1] // 2), cv2.FONT_HERSHEY_SIMPLEX, 3, (20, 20, 20), 6)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        base, reference = timed(lambda: cam4_sketch(frame, work_dir), args.repeat)
+    print(f"{'cam4':>12}: {base * 1000:8.1f} ms")
+
+    filters = [("exact", SketchFilter(mode=EXACT)), ("box", SketchFilter(mode=BOX))]
+    filters += [(f"downscale x{f}", SketchFilter(mode=DOWNSCALE, factor=f)) for f in (2, 4, 8)]
+    for name, sketch_filter in filters:
+        elapsed, result = timed(lambda: sketch_filter.process(frame), args.repeat)
+        error = np.mean(np.abs(result.astype(np.int16) - reference))
+        print(f"{name:>12}: {elapsed * 1000:8.1f} ms  {base / elapsed:6.1f}x faster  "
+              f"error {error:5.2f}  ({1 / elapsed:5.1f} fps)")
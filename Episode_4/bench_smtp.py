@@ -0,0 +1,113 @@
+# bench_smtp.py
+#
+# Description:
+# Benchmarks photo alert delivery against a local aiosmtpd
+# server (pip install aiosmtpd), so no mail leaves the box.
+# Three ways of sending the same alerts are compared:
+# - connect: a new SMTP connection per alert (what happens when
+#            the single yagmail session has timed out)
+# - pool x1: SmtpPool with one reused session
+# - pool xN: SmtpPool with N sessions and N sender threads
+# For each one it reports messages/sec and p50/p99 send latency.
+# The local server has no TLS or login, so against Gmail the
+# gap between 'connect' and the pool is much larger.
+#
+# Usage: python3 bench_smtp.py [messages] [sessions]
+#
+# j3 @ Oct, 2026
+
+import os
+import smtplib
+import sys
+import tempfile
+import threading
+import time
+from aiosmtpd.controller import Controller
+from smtp_pool import SmtpPool, build_alert
+
+HOST = "127.0.0.1"
+PORT = 8025
+PHOTO_SIZE = 120 * 1024  # Roughly an 800x600 JPEG
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 Message accepted for delivery"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def report(name, latencies, elapsed):
+    print(f"{name:>10}: {len(latencies) / elapsed:8.1f} msg/s  "
+          f"p50 {percentile(latencies, 50) * 1000:6.2f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:6.2f} ms")
+
+
+def bench_connect(msgs):
+    latencies = []
+    start = time.perf_counter()
+    for msg in msgs:
+        t = time.perf_counter()
+        with smtplib.SMTP(HOST, PORT) as smtp:
+            smtp.send_message(msg)
+        latencies.append(time.perf_counter() - t)
+    report("connect", latencies, time.perf_counter() - start)
+
+
+def bench_pool(msgs, sessions):
+    pool = SmtpPool("pi@example.com", None, host=HOST, port=PORT,
+                    size=sessions, starttls=False)
+    latencies = []
+    lock = threading.Lock()
+    todo = list(msgs)
+
+    def sender():
+        while True:
+            with lock:
+                if not todo:
+                    return
+                msg = todo.pop()
+            t = time.perf_counter()
+            pool.send(msg)
+            with lock:
+                latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=sender) for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report(f"pool x{sessions}", latencies, time.perf_counter() - start)
+    pool.close()
+    print(f"{'':>10}  {pool.connects} connection(s) opened")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname=HOST, port=PORT)
+    controller.start()
+
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+        f.write(os.urandom(PHOTO_SIZE))
+        photo = f.name
+    try:
+        msgs = [build_alert("pi@example.com", "me@example.com", photo) for _ in range(count)]
+        print(f"Sending {count} alerts with a {PHOTO_SIZE // 1024} KB photo to {HOST}:{PORT}")
+        bench_connect(msgs)
+        bench_pool(msgs, 1)
+        bench_pool(msgs, sessions)
+        print(f"Server received {handler.received} messages")
+    finally:
+        os.remove(photo)
+        controller.stop()
@@ -0,0 +1,142 @@
+# bench_suite.py
+#
+# Description:
+# Off-device benchmark suite built on the fake camera
+# (fake_picamera2.py) and fake GPIO (fake_gpio.py). It measures:
+# 1. Trigger-to-capture latency: a PIR trace is replayed into
+#    PirEdgeDetector and every trigger takes a photo, either with
+#    switch_mode_and_capture_file (cam13.py) or LiveCapture (cam18.py).
+# 2. Loop CPU usage: the 10 ms polling loop vs the edge detector
+#    (same as bench_pir.py).
+# 3. pre_callback cost per frame: apply_text vs the cached Overlay,
+#    timed inside the camera thread while it streams at 30 fps.
+# The camera start/stop/reconfigure costs are modelled by
+# fake_picamera2.TIMINGS, so the latency numbers show the shape of
+# the difference, not the exact figures of a real Pi.
+#
+# Usage: python3 bench_suite.py [latency|cpu|callback ...]
+#
+# j3 @ Oct, 2026
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import cv2
+
+# Use the fake picamera2, libcamera and RPi.GPIO modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes"))
+
+import RPi.GPIO as GPIO
+import bench_pir
+from picamera2 import Picamera2, MappedArray
+from libcamera import Transform
+from pir_events import PirEdgeDetector
+from live_capture import LiveCapture
+from overlay import Overlay, timestamp_item
+
+PIR_PIN = 4
+resolution = (800, 600)
+
+
+def apply_text(request):
+    # apply_text from cam11.py-cam17.py
+    colour = (255, 255, 255)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    text = time.strftime("%d%m%Y %H:%M")
+    text_size, _ = cv2.getTextSize(text, font, 1, 1)
+    origin = (resolution[0] - text_size[0] - 10, resolution[1] - 10)
+    with MappedArray(request, "main") as m:
+        cv2.putText(m.array, text, origin, font, 1, colour, 1)
+
+
+def stats(values):
+    values = sorted(values)
+    mean = sum(values) / len(values)
+    p99 = values[min(len(values) - 1, int(len(values) * 0.99))]
+    return mean, p99, values[-1]
+
+
+def bench_latency(triggers=5):
+    print("== Trigger-to-capture latency")
+    threshold, cooldown = 0.3, 0.5
+    # One sustained motion per trigger, too short for a second one
+    trace = []
+    for i in range(triggers):
+        trace += [(0.2 + i * 1.5, GPIO.HIGH), (0.2 + i * 1.5 + threshold + 0.3, GPIO.LOW)]
+
+    for mode in ("switch", "live"):
+        transform = Transform(hflip=True, vflip=True)
+        picam2 = Picamera2()
+        capture_config = picam2.create_still_configuration({"size": resolution}, transform=transform)
+        picam2.configure(picam2.create_preview_configuration({"size": resolution, "format": "RGB888"},
+                                                             transform=transform))
+        picam2.pre_callback = apply_text
+        picam2.start()
+        live = LiveCapture(picam2)
+
+        latencies = []
+        done = threading.Event()
+        with tempfile.TemporaryDirectory() as work_dir:
+            def on_trigger(movement_timer):
+                t = time.monotonic()
+                file_name = os.path.join(work_dir, f"img_{t}.jpg")
+                if mode == "switch":
+                    picam2.switch_mode_and_capture_file(capture_config, file_name)
+                else:
+                    live.capture_file(file_name).result()
+                latencies.append(time.monotonic() - t)
+                if len(latencies) == triggers:
+                    done.set()
+
+            GPIO.cleanup()
+            GPIO.setmode(GPIO.BCM)
+            detector = PirEdgeDetector(GPIO, PIR_PIN, on_trigger, threshold=threshold,
+                                       min_interval=cooldown)
+            detector.start()
+            GPIO.replay_trace(PIR_PIN, trace)
+            done.wait(triggers * 3)
+            detector.stop()
+        live.close()
+        picam2.close()
+        mean, p99, worst = stats(latencies)
+        print(f"{mode:>8}: {len(latencies)} triggers  mean {mean * 1000:7.1f} ms  "
+              f"max {worst * 1000:7.1f} ms")
+
+
+def bench_cpu(seconds=6.0):
+    print("== PIR loop CPU usage")
+    trace = bench_pir.make_trace(seconds - 1.0)
+    bench_pir.run("polling", trace, seconds)
+    bench_pir.run("events", trace, seconds)
+
+
+def bench_callback(seconds=3.0):
+    print("== pre_callback cost per frame")
+    for name, callback in (("apply_text", apply_text),
+                           ("overlay", Overlay(resolution, [timestamp_item()]).apply)):
+        picam2 = Picamera2()
+        picam2.configure(picam2.create_preview_configuration({"size": resolution}))
+        picam2.pre_callback = callback
+        picam2.start()
+        time.sleep(0.5)
+        picam2.callback_seconds.clear()
+        frames = picam2.frames
+        time.sleep(seconds)
+        frames = picam2.frames - frames
+        costs = list(picam2.callback_seconds)
+        picam2.close()
+        mean, p99, worst = stats(costs)
+        print(f"{name:>10}: {frames / seconds:5.1f} fps  mean {mean * 1e6:7.1f} us  "
+              f"p99 {p99 * 1e6:7.1f} us  max {worst * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or ["latency", "cpu", "callback"]
+    if "latency" in selected:
+        bench_latency()
+    if "cpu" in selected:
+        bench_cpu()
+    if "callback" in selected:
+        bench_callback()
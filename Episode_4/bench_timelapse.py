@@ -0,0 +1,129 @@
+# bench_timelapse.py
+#
+# Description:
+# Long-run and restart test of the time-lapse writer (timelapse.py),
+# with a simulated clock so a month goes by in a couple of minutes.
+# 1) 30 days at one frame every 60 seconds (by default) into daily
+#    segments (frames encoded from a changing synthetic scene, as
+#    TimeLapse.sample() does). Every simulated day it prints the
+#    time per frame (encode + append), the process RSS and the
+#    memory NumPy/Python hold (tracemalloc): all three should stay
+#    flat while the files grow.
+# 2) Crash and resume: a frame is cut short and its index line half
+#    written, as when the power goes mid-write; the writer is
+#    opened again and goes on. Every frame on disk must then decode,
+#    timestamps must be increasing, and the cut frame must be gone.
+# 3) Export: the whole month into an .mkv with ffmpeg (if installed),
+#    without re-encoding.
+#
+# Usage: python3 bench_timelapse.py [days] [interval seconds]
+#
+# j3 @ Oct, 2026
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from timelapse import TimeLapseWriter, read_frames, export, segment_numbers, SEGMENT_PREFIX, SEGMENT_SUFFIX, INDEX_SUFFIX
+
+SIZE = (640, 480)
+QUALITY = 85
+START = 1_790_000_000.0  # Some day in 2026
+
+
+class SimulatedClock:
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def scene(t, base, out):
+    # A daylight cycle over a fixed scene, plus a little noise
+    light = 0.35 + 0.65 * max(0.0, np.sin((t % 86400) / 86400 * 2 * np.pi - np.pi / 2) * 0.5 + 0.5)
+    cv2.convertScaleAbs(base, dst=out, alpha=light, beta=float(np.random.randint(0, 4)))
+    return out
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+def run(directory, days, interval):
+    clock = SimulatedClock(START)
+    writer = TimeLapseWriter(directory, segment_seconds=86400, clock=clock)
+    rng = np.random.default_rng(1)
+    base = cv2.GaussianBlur(rng.integers(0, 255, (SIZE[1], SIZE[0], 3), dtype=np.uint8), (0, 0), 3)
+    frame = np.empty_like(base)
+    per_day = int(86400 // interval)
+    tracemalloc.start()
+    print(f"{days} days, one {SIZE[0]}x{SIZE[1]} frame every {interval:g} s ({per_day} per day):")
+    print(f"  {'day':>3} {'frames':>7} {'us/frame':>8} {'RSS MB':>7} {'traced kB':>9} {'on disk MB':>10}")
+    for day in range(days):
+        start = time.perf_counter()
+        for _ in range(per_day):
+            ok, jpeg = cv2.imencode(".jpg", scene(clock.t, base, frame), [cv2.IMWRITE_JPEG_QUALITY, QUALITY])
+            writer.append(jpeg.data)
+            clock.t += interval
+        seconds = time.perf_counter() - start
+        current, _ = tracemalloc.get_traced_memory()
+        print(f"  {day + 1:>3} {(day + 1) * per_day:>7} {seconds / per_day * 1e6:>8.0f} {rss_mb():>7.1f} "
+              f"{current / 1024:>9.1f} {writer.total_bytes / 1024 ** 2:>10.1f}")
+    tracemalloc.stop()
+    writer.close()
+    return clock
+
+
+def crash_and_resume(directory, clock, interval):
+    path = os.path.join(directory, f"{SEGMENT_PREFIX}{segment_numbers(directory)[-1]:06d}")
+    frames_before = sum(1 for _ in read_frames(directory))
+    # Power cut mid-frame: half a JPEG in the data, half a line in the index
+    ok, jpeg = cv2.imencode(".jpg", np.zeros((SIZE[1], SIZE[0], 3), np.uint8))
+    with open(path + SEGMENT_SUFFIX, "ab") as f:
+        f.write(jpeg.tobytes()[:len(jpeg) // 2])
+    with open(path + INDEX_SUFFIX, "ab") as f:
+        f.write(f"{clock.t!r} {os.path.getsize(path + SEGMENT_SUFFIX)}".encode())
+
+    start = time.perf_counter()
+    writer = TimeLapseWriter(directory, segment_seconds=86400, clock=clock)
+    resumed = time.perf_counter() - start
+    print(f"Crash and resume: segment {writer.number} resumed at frame {writer.frames} "
+          f"in {resumed * 1000:.0f} ms")
+    for _ in range(10):
+        ok, jpeg = cv2.imencode(".jpg", np.full((SIZE[1], SIZE[0], 3), 128, np.uint8))
+        writer.append(jpeg.data)
+        clock.t += interval
+    writer.close()
+
+    count, bad, last, backwards = 0, 0, None, 0
+    for t, data in read_frames(directory):
+        count += 1
+        if cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8) is None:
+            bad += 1
+        if last is not None and t <= last:
+            backwards += 1
+        last = t
+    print(f"  {count} frames on disk ({frames_before} before + 10 after), {bad} not decodable, "
+          f"{backwards} out of order")
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 60.0
+    cv2.setNumThreads(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        clock = run(tmp, days, interval)
+        crash_and_resume(tmp, clock, interval)
+        try:
+            out = os.path.join(tmp, "month.mkv")
+            start = time.perf_counter()
+            exported = export(tmp, out, fps=30)
+            print(f"Export: {exported} frames into {os.path.getsize(out) / 1024 ** 2:.0f} MB "
+                  f"in {time.perf_counter() - start:.1f} s")
+        except RuntimeError as e:
+            print(f"Export skipped: {e}")
@@ -0,0 +1,110 @@
+# bench_zones.py
+#
+# Description:
+# Scaling test for the multi-zone orchestrator (zones.py) on the
+# fake GPIO and fake cameras. For 1, 8, 32 and 128 zones spread
+# over two cameras, one driver thread replays a random PIR trace
+# on every zone's pin, and the run reports:
+# - threads in the process (should not grow with the zones)
+# - process CPU
+# - triggers per zone vs what the trace should give
+# - trigger-to-file latency (median and max)
+# Thresholds and cooldowns are scaled down so a run takes seconds.
+#
+# Usage: python3 bench_zones.py [--zones 1,8,32,128] [--seconds 6]
+#
+# j3 @ Oct, 2026
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Use the fake picamera2, libcamera and RPi.GPIO modules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes"))
+
+import RPi.GPIO as GPIO
+from zones import DEFAULTS, ZONE_DEFAULTS, Orchestrator, open_picamera2
+
+THRESHOLD = 0.3
+COOLDOWN = 1.0
+
+
+def make_traces(pins, duration, seed=1):
+    # One merged, time-ordered list of (offset, pin, level); also the
+    # expected number of triggers per pin
+    rng = random.Random(seed)
+    events, expected = [], {}
+    for pin in pins:
+        t, last_photo, count = rng.uniform(0.1, 0.5), None, 0
+        while t < duration:
+            high = rng.choice([0.1, 0.2, 0.8, 1.5])
+            events += [(t, pin, GPIO.HIGH), (t + high, pin, GPIO.LOW)]
+            # Same rules as Zone, to know what to expect
+            fire = t + THRESHOLD
+            if last_photo is not None:
+                fire = max(fire, last_photo + COOLDOWN)
+            while fire < t + high:
+                last_photo = fire
+                count += 1
+                fire += COOLDOWN
+            t += high + rng.uniform(0.3, 1.5)
+        expected[pin] = count
+    events.sort()
+    return events, expected
+
+
+def drive(events):
+    start = time.monotonic()
+    for offset, pin, level in events:
+        delay = start + offset - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        GPIO.set_input(pin, level)
+
+
+async def run(n, seconds, photo_dir):
+    pins = list(range(100, 100 + n))  # The fake GPIO takes any pin number
+    config = dict(DEFAULTS, photo_dir=photo_dir, resolution=[640, 480])
+    config["zones"] = [dict(ZONE_DEFAULTS, name=f"zone{i}", pir_pin=pin, camera=i % 2,
+                            threshold=THRESHOLD, cooldown=COOLDOWN)
+                       for i, pin in enumerate(pins)]
+    GPIO.cleanup()
+    orchestrator = Orchestrator(config, GPIO, open_picamera2)
+    await orchestrator.start()
+    events, expected = make_traces(pins, seconds)
+
+    cpu = time.process_time()
+    driver = threading.Thread(target=drive, args=(events,), daemon=True)
+    driver.start()
+    await asyncio.sleep(seconds + 2.0)  # The last motions end up to 1.5 s late
+    threads = threading.active_count() - 1  # Without the trace driver
+    await orchestrator.close()
+    cpu = time.process_time() - cpu
+    for live in orchestrator.cameras.values():
+        live.close()
+        live.picam2.close()
+
+    triggers = sum(zone.triggers for zone in orchestrator.zones)
+    photos = sum(zone.photos for zone in orchestrator.zones)
+    dropped = sum(zone.dropped for zone in orchestrator.zones)
+    latencies = sorted(orchestrator.latencies)
+    median = latencies[len(latencies) // 2] if latencies else float("nan")
+    worst = latencies[-1] if latencies else float("nan")
+    print(f"{n:>5} zones: {threads:>3} threads  CPU {cpu / (seconds + 2.0) * 100:5.1f}%  "
+          f"triggers {triggers:>4}/{sum(expected.values()):<4} photos {photos:>4} dropped {dropped:>3}  "
+          f"latency p50 {median * 1000:6.1f} ms  max {worst * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multi-zone orchestrator")
+    parser.add_argument("--zones", default="1,8,32,128")
+    parser.add_argument("--seconds", type=float, default=6.0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as photo_dir:
+        for n in (int(z) for z in args.zones.split(",")):
+            asyncio.run(run(n, args.seconds, photo_dir))
@@ -0,0 +1,140 @@
+# burst.py
+#
+# Description:
+# Burst capture with sharpest-frame selection. A single photo taken
+# the moment MOV_DETECT_THRESHOLD expires is often motion-blurred,
+# so on a trigger BurstCapture:
+# 1. copies the next `count` frames of the running stream into a
+#    preallocated (count, height, width, channels) buffer, stopping
+#    early if the grab part of the latency budget is used up
+# 2. turns each frame to grey and shrinks it by an integer `factor`
+#    (INTER_AREA is several times faster with whole factors), again
+#    into preallocated buffers
+# 3. scores all of them at once with the variance of the Laplacian,
+#    computed with NumPy slices over the whole (n, h, w) stack
+# 4. encodes only the best frame (or the best `top_k`) on its own
+#    encoder thread, with LiveCapture.encode()
+# A blurred frame has weak edges, so its Laplacian varies less.
+#
+# Usage:
+#   burst = BurstCapture(live, (600, 800, 3), count=5, budget=0.4)
+#   file_names = burst.capture_file("/home/pi/Camera/img_x.jpg").result()
+#
+# j3 @ Oct, 2026
+
+import concurrent.futures
+import time
+import cv2
+import numpy as np
+
+
+def laplacian_variance(stack, work=None):
+    # Variance of the 4-neighbour Laplacian of every image in a
+    # (n, h, w) stack; the one-pixel border is left out. `work` is an
+    # optional float32 (n, h - 2, w - 2) buffer to compute into.
+    n, h, w = stack.shape
+    if work is None:
+        work = np.empty((n, h - 2, w - 2), np.float32)
+    centre = stack[:, 1:-1, 1:-1]
+    np.multiply(centre, -4.0, out=work, dtype=np.float32)
+    work += stack[:, :-2, 1:-1]
+    work += stack[:, 2:, 1:-1]
+    work += stack[:, 1:-1, :-2]
+    work += stack[:, 1:-1, 2:]
+    return work.reshape(n, -1).var(axis=1)
+
+
+class BurstCapture:
+    def __init__(self, live, shape, count=5, factor=2, top_k=1, budget=0.5,
+                 clock=time.monotonic):
+        # live: a running LiveCapture; shape: (height, width[, channels])
+        # of its stream; budget: seconds from trigger to the best frame
+        # being picked (the JPEG encoding comes on top)
+        self.live = live
+        self.count = count
+        self.top_k = min(top_k, count)
+        self.budget = budget
+        self.clock = clock
+        self.score_size = (shape[1] // factor, shape[0] // factor)
+        width, height = self.score_size
+        self.frames = np.empty((count,) + tuple(shape), np.uint8)
+        self._full_grey = np.empty(tuple(shape[:2]), np.uint8)
+        self._grey = np.empty((count, height, width), np.uint8)
+        self._work = np.empty((count, height - 2, width - 2), np.float32)
+        self._pool = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="burst")
+        # Timings of the last burst, in seconds
+        self.grab_seconds = 0.0
+        self.score_seconds = 0.0
+        self.scores = np.zeros(count, np.float64)
+
+    def nbytes(self):
+        return self.frames.nbytes + self._grey.nbytes + self._work.nbytes + self._full_grey.nbytes
+
+    def describe(self):
+        h, w = self.frames.shape[1:3]
+        return (f"Burst of {self.count} frames at {w}x{h}, scored at "
+                f"{self.score_size[0]}x{self.score_size[1]}, {self.nbytes() / 1024 ** 2:.1f} MB preallocated")
+
+    def grab(self):
+        # Copy up to `count` consecutive frames; returns how many. Stops
+        # early once 3/4 of the budget is gone, keeping at least one.
+        # Imported here so score() can also be used on plain arrays off the Pi
+        from picamera2 import MappedArray
+        deadline = self.clock() + self.budget * 0.75
+        picam2 = self.live.picam2
+        grabbed = 0
+        start = time.perf_counter()
+        while grabbed < self.count:
+            request = picam2.capture_request()
+            try:
+                # Straight from the camera buffer into the burst buffer
+                with MappedArray(request, self.live.stream, write=False) as m:
+                    np.copyto(self.frames[grabbed], m.array)
+            finally:
+                request.release()
+            grabbed += 1
+            if self.clock() >= deadline:
+                break
+        self.grab_seconds = time.perf_counter() - start
+        return grabbed
+
+    def score(self, n=None):
+        # Sharpness of the first n frames of the buffer
+        n = self.count if n is None else n
+        start = time.perf_counter()
+        colour = self.frames.ndim == 4
+        code = cv2.COLOR_BGRA2GRAY if colour and self.frames.shape[3] == 4 else cv2.COLOR_BGR2GRAY
+        for i in range(n):
+            grey = self.frames[i]
+            if colour:
+                grey = cv2.cvtColor(grey, code, dst=self._full_grey)
+            cv2.resize(grey, self.score_size, dst=self._grey[i], interpolation=cv2.INTER_AREA)
+        self.scores[:] = 0
+        self.scores[:n] = laplacian_variance(self._grey[:n], self._work[:n])
+        self.score_seconds = time.perf_counter() - start
+        return self.scores[:n]
+
+    def best(self, n=None):
+        # Indices of the top_k sharpest frames, sharpest first
+        scores = self.score(n)
+        k = min(self.top_k, len(scores))
+        return list(np.argsort(scores)[::-1][:k])
+
+    def capture_file(self, file_name):
+        # Returns a Future resolving to the list of files written:
+        # file_name for the sharpest frame, then file_name with
+        # _2, _3... for the runners-up when top_k > 1
+        n = self.grab()
+        picks = self.best(n)
+        # Copy the picks out so the buffer can take the next burst
+        arrays = [self.frames[i].copy() for i in picks]
+        stem, ext = file_name.rsplit(".", 1)
+        names = [file_name] + [f"{stem}_{rank}.{ext}" for rank in range(2, len(arrays) + 1)]
+
+        def encode_all():
+            return [self.live.encode(array, name) for array, name in zip(arrays, names)]
+
+        return self._pool.submit(encode_all)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,229 @@
+# callback_budget.py
+#
+# Description:
+# A hook layer for the camera callbacks. Picamera2 runs
+# pre_callback and post_callback on its own thread for every frame:
+# when they take longer than a frame interval the camera simply
+# drops frames, and nothing says so. CallbackGuard is installed as
+# pre_callback/post_callback and runs the registered hooks itself:
+# - every hook is timed into a fixed-bucket histogram (metrics.py),
+#   so the cost distribution per hook is always available
+# - dropped frames are counted from gaps in the SensorTimestamp
+#   metadata (a gap of 2 frame intervals = 1 dropped frame); the
+#   frame interval comes from the FrameDuration metadata
+# - the total is checked against `budget` (a fraction of the frame
+#   interval). After `patience` frames over budget in a row, the
+#   last-registered optional hook is degraded one step: from its
+#   function to its `fallback` (e.g. a cheaper overlay), then to
+#   skipped. After `recover_after` frames comfortably under budget
+#   the last degraded hook is given its previous step back; a hook
+#   that goes over budget again right away waits twice as long
+#   before the next try.
+# Essential hooks (the motion detector, the frame ring) are timed
+# but never degraded.
+#
+# Usage:
+#   guard = CallbackGuard(picam2, budget=0.5)
+#   guard.add_pre("overlay", overlay.apply, fallback=timestamp_only.apply)
+#   guard.add_post("motion", record_frame, essential=True)
+#   guard.install()
+#   ...
+#   print(guard.describe())
+#
+# j3 @ Oct, 2026
+
+import time
+from metrics import Registry, JITTER_BUCKETS
+
+FULL = 0
+FALLBACK = 1
+SKIPPED = 2
+LEVEL_NAMES = ("full", "fallback", "skipped")
+
+
+class Hook:
+    def __init__(self, name, func, fallback=None, essential=False, histogram=None):
+        self.name = name
+        self.func = func
+        self.fallback = fallback
+        self.essential = essential
+        self.histogram = histogram
+        self.level = FULL
+        self.recover_after = None  # Frames under budget before the next step back
+        self.restored_at = None  # Frame number of the last step back
+
+    def current(self):
+        if self.level == FULL:
+            return self.func
+        if self.level == FALLBACK and self.fallback is not None:
+            return self.fallback
+        return None
+
+    def degrade(self):
+        # FULL -> FALLBACK (if there is one) -> SKIPPED
+        if self.level == FULL and self.fallback is not None:
+            self.level = FALLBACK
+        else:
+            self.level = SKIPPED
+
+    def restore(self):
+        if self.level == SKIPPED and self.fallback is not None:
+            self.level = FALLBACK
+        else:
+            self.level = FULL
+
+
+class CallbackGuard:
+    def __init__(self, picam2, budget=0.5, patience=3, recover_after=90, max_backoff=64,
+                 frame_interval=None, registry=None):
+        # budget: share of the frame interval the hooks may use.
+        # frame_interval (s) overrides the FrameDuration metadata.
+        self.picam2 = picam2
+        self.budget = budget
+        self.patience = patience
+        self.recover_after = recover_after
+        self.max_backoff = max_backoff
+        self.frame_interval = frame_interval
+        self.registry = registry if registry is not None else Registry()
+        self.pre_hooks = []
+        self.post_hooks = []
+        self.frames = 0
+        self.dropped = 0
+        self.over_budget = 0  # Frames over budget
+        self.degradations = 0
+        self.restorations = 0
+        self._cost = self.registry.histogram("callback_seconds", "Time spent in each camera callback hook",
+                                             ["hook"], buckets=JITTER_BUCKETS)
+        self._frame_cost = self.registry.histogram("callback_frame_seconds", "Time spent in all hooks per frame",
+                                                   buckets=JITTER_BUCKETS)
+        self._dropped = self.registry.counter("frames_dropped", "Frames dropped, from SensorTimestamp gaps")
+        self._level = self.registry.gauge("callback_level", "0 full, 1 fallback, 2 skipped", ["hook"])
+        self._last_timestamp = None
+        self._interval = frame_interval
+        self._pre_seconds = 0.0
+        self._over_streak = 0
+        self._under_streak = 0
+        self._degraded = []  # Stack of degraded hooks, most recent last
+
+    def _add(self, hooks, name, func, fallback, essential):
+        hook = Hook(name, func, fallback, essential, self._cost.labels(hook=name))
+        hook.recover_after = self.recover_after
+        self._level.labels(hook=name).set_function(lambda: hook.level)
+        hooks.append(hook)
+        return hook
+
+    def add_pre(self, name, func, fallback=None, essential=False):
+        return self._add(self.pre_hooks, name, func, fallback, essential)
+
+    def add_post(self, name, func, fallback=None, essential=False):
+        return self._add(self.post_hooks, name, func, fallback, essential)
+
+    def install(self):
+        self.picam2.pre_callback = self._pre
+        self.picam2.post_callback = self._post
+
+    def _run(self, hooks, request):
+        total = 0.0
+        for hook in hooks:
+            func = hook.current()
+            if func is None:
+                continue
+            start = time.perf_counter()
+            try:
+                func(request)
+            finally:
+                elapsed = time.perf_counter() - start
+                hook.histogram.observe(elapsed)
+                total += elapsed
+        return total
+
+    def _count_drops(self, request):
+        metadata = request.get_metadata()
+        timestamp = metadata.get("SensorTimestamp")  # ns
+        if self.frame_interval is None and metadata.get("FrameDuration"):
+            self._interval = metadata["FrameDuration"] / 1e6  # FrameDuration is in us
+        if timestamp is None or self._interval is None:
+            return
+        if self._last_timestamp is not None:
+            frames = round((timestamp - self._last_timestamp) / 1e9 / self._interval)
+            if frames > 1:
+                self.dropped += frames - 1
+                self._dropped.inc(frames - 1)
+        self._last_timestamp = timestamp
+
+    def _pre(self, request):
+        self._count_drops(request)
+        self._pre_seconds = self._run(self.pre_hooks, request)
+
+    def _post(self, request):
+        total = self._pre_seconds + self._run(self.post_hooks, request)
+        self._pre_seconds = 0.0
+        self.frames += 1
+        self._frame_cost.observe(total)
+        if self._interval is not None:
+            self._check_budget(total)
+
+    def _check_budget(self, total):
+        limit = self.budget * self._interval
+        if total > limit:
+            self.over_budget += 1
+            self._over_streak += 1
+            self._under_streak = 0
+            if self._over_streak >= self.patience:
+                self._over_streak = 0
+                self._degrade()
+        elif total < limit / 2:
+            self._over_streak = 0
+            self._under_streak += 1
+            if self._degraded and self._under_streak >= self._degraded[-1].recover_after:
+                self._under_streak = 0
+                self._restore()
+        else:
+            self._over_streak = 0
+
+    def _degrade(self):
+        # The last-registered optional hook that can still give something up
+        for hook in reversed(self.pre_hooks + self.post_hooks):
+            if not hook.essential and hook.level != SKIPPED:
+                if hook.restored_at is not None and self.frames - hook.restored_at <= 2 * self.patience:
+                    # Went over budget again right after a step back
+                    hook.recover_after = min(hook.recover_after * 2, self.recover_after * self.max_backoff)
+                hook.degrade()
+                if hook in self._degraded:
+                    self._degraded.remove(hook)
+                self._degraded.append(hook)
+                self.degradations += 1
+                print(f"[callbacks] over budget: {hook.name} -> {LEVEL_NAMES[hook.level]}")
+                return
+
+    def _restore(self):
+        hook = self._degraded[-1]
+        hook.restore()
+        hook.restored_at = self.frames
+        if hook.level == FULL:
+            self._degraded.pop()
+        self.restorations += 1
+        print(f"[callbacks] back under budget: {hook.name} -> {LEVEL_NAMES[hook.level]}")
+
+    def stats(self):
+        hooks = {}
+        for hook in self.pre_hooks + self.post_hooks:
+            h = hook.histogram
+            hooks[hook.name] = {"level": LEVEL_NAMES[hook.level], "calls": h.count,
+                                "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                                "p50_ms": h.quantile(0.5) * 1000 if h.count else 0.0,
+                                "p99_ms": h.quantile(0.99) * 1000 if h.count else 0.0,
+                                "max_ms": h.max * 1000}
+        return {"frames": self.frames, "dropped": self.dropped, "over_budget": self.over_budget,
+                "degradations": self.degradations, "restorations": self.restorations,
+                "frame_interval_ms": (self._interval or 0.0) * 1000, "hooks": hooks}
+
+    def describe(self):
+        stats = self.stats()
+        lines = [f"Callbacks: {stats['frames']} frames, {stats['dropped']} dropped, "
+                 f"{stats['over_budget']} over budget ({self.budget * stats['frame_interval_ms']:.1f} ms), "
+                 f"{stats['degradations']} degradations, {stats['restorations']} restorations"]
+        for name, h in stats["hooks"].items():
+            lines.append(f"  {name:<10} {h['level']:<8} {h['calls']:>6} calls  mean {h['mean_ms']:6.2f} ms  "
+                         f"p50 <= {h['p50_ms']:6.2f} ms  p99 <= {h['p99_ms']:6.2f} ms  max {h['max_ms']:6.2f} ms")
+        return "\n".join(lines)
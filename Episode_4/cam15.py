@@ -0,0 +1,169 @@
+# cam15.py
+#
+# Description:
+# Builds on cam14.py. Capturing, logging and emailing no longer
+# run one after the other on the detector thread. A trigger is
+# handed to a three-stage pipeline (pipeline.py):
+#   capture -> persist (photo log) -> notify (email)
+# Each stage has its own worker thread and bounded queue, so a
+# slow SMTP round-trip only fills the notify queue (oldest alert
+# dropped when full) and the trigger-to-file latency stays the
+# same. On Ctrl+C the queues are drained before exiting.
+#
+# j3 @ Oct, 2026
+
+import RPi.GPIO as GPIO
+import time, cv2
+from picamera2 import Picamera2, MappedArray
+from libcamera import Transform
+import os
+import signal
+import yagmail
+from pir_events import PirEdgeDetector
+from pipeline import Pipeline, Stage, DROP_NEWEST, DROP_OLDEST
+
+
+email_token = os.getenv('EMAIL_TOKEN')
+if not email_token:
+    raise ValueError("No EMAIL TOKEN found. Set the EMAIL_TOKEN environment variable.")
+
+from_email = os.getenv('FROM_EMAIL')
+if not from_email:
+    raise ValueError("No FROM EMAIL ACCOUNT found. Set the FROM EMAIL environment variable.")
+
+to_email = os.getenv('TO_EMAIL')
+if not to_email:
+    raise ValueError("No TO EMAIL ACCOUNT found. Set the TO_EMAIL environment variable.")
+
+PIR_PIN = 4
+LED_PIN = 17
+resolution = (800, 600)
+LOG_FILE_NAME = "/home/pi/Camera/log/photo_logs.txt"
+
+MOV_DETECT_THRESHOLD = 3.0  # Time threshold for sustained motion
+MIN_DURATION_BETWEEN_PHOTOS = 60.0  # Minimum time between two photos (in seconds)
+
+def apply_text(request):
+    # Text options
+    colour = (255, 255, 255)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    scale = 1
+    thickness = 1
+    # Get the current time in the format "DDMMYYYY HH:MM"
+    text = time.strftime("%d%m%Y %H:%M")
+    # Calculate the text size
+    text_size, _ = cv2.getTextSize(text, font, scale, thickness)
+
+    # Calculate the bottom-right origin
+    x = resolution[0] - text_size[0] - 10  # 10 pixels padding from the right
+    y = resolution[1] - 10  # 10 pixels padding from the bottom
+
+    origin = (x, y)
+    with MappedArray(request, "main") as m:
+        cv2.putText(m.array, text, origin, font, scale, colour, thickness)
+
+def take_photo(_picam2):
+    # Ensure the directory exists
+    if not os.path.exists("/home/pi/Camera"):
+        os.makedirs("/home/pi/Camera")
+
+    file_name = "/home/pi/Camera/img_" + str(time.time()) + ".jpg"
+    _picam2.switch_mode_and_capture_file(capture_config, file_name)
+    print(f"Photo saved: {file_name}")
+    return file_name
+
+# Ensure that the directory exists before attempting to write to the log file
+def update_photo_log_file(_photo_file_name):
+    # Ensure the directory exists
+    log_directory = os.path.dirname(LOG_FILE_NAME)
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+
+    with open(LOG_FILE_NAME, "a", encoding="utf-8") as f:
+        f.write(_photo_file_name)
+        f.write("\n")
+
+def send_email_with_photo(yagmail_client, file_name):
+    yagmail_client.send(to= to_email,
+                        subject="Movement detected!",
+                        contents="Here's a photo taken by your Raspberry Pi",
+                        attachments=file_name)
+
+def capture_stage(trigger_time):
+    photo_file_name = take_photo(picam2)
+    print(f"Trigger to file: {(time.monotonic() - trigger_time) * 1000:.0f} ms")
+    return photo_file_name
+
+def persist_stage(photo_file_name):
+    update_photo_log_file(photo_file_name)
+    return photo_file_name
+
+def notify_stage(photo_file_name):
+    send_email_with_photo(yag, photo_file_name)
+
+def on_sustained_motion(movement_timer):
+    # Runs on the detector's timer thread: just queue the work
+    print("Take Photo and Send it by Email")
+    pipeline.submit(time.monotonic())
+
+# Setup camera
+picam2 = Picamera2()
+# Create two separate configs - one for preview and one for capture.
+# Make sure the preview is the same resolution as the capture, to make
+# sure the overlay stays the same size
+capture_config = picam2.create_still_configuration({"size": resolution}, transform=Transform(hflip=True, vflip=True))
+preview_config = picam2.create_preview_configuration({"size": resolution}, transform=Transform(hflip=True, vflip=True))
+
+# Set the current config as the preview config
+picam2.configure(preview_config)
+
+# Add the timestamp
+picam2.pre_callback = apply_text
+# Start the camera
+picam2.start()
+
+# Pause for 2 seconds to allow the camera to stabilize
+time.sleep(2)
+print("Camera setup ok.")
+
+# Remove log file
+if os.path.exists(LOG_FILE_NAME):
+    os.remove(LOG_FILE_NAME)
+    print("Log file removed.")
+
+# Setup yagmail
+yag = yagmail.SMTP(from_email, email_token)
+print("Email sender setup OK.")
+
+# Setup the capture -> persist -> notify pipeline
+pipeline = Pipeline(
+    Stage("capture", capture_stage, maxsize=2, policy=DROP_NEWEST),
+    Stage("persist", persist_stage, maxsize=16),
+    Stage("notify", notify_stage, maxsize=8, policy=DROP_OLDEST),
+)
+pipeline.start()
+print("Pipeline setup ok.")
+
+# Setup GPIOs and the edge detector
+GPIO.setmode(GPIO.BCM)
+detector = PirEdgeDetector(GPIO, PIR_PIN, on_sustained_motion, led_pin=LED_PIN,
+                           threshold=MOV_DETECT_THRESHOLD,
+                           min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+detector.start()
+print("GPIOs setup ok.")
+
+print("Everything has been set up.")
+
+try:
+    # Nothing to poll: wait for signals while the GPIO thread does the work
+    while True:
+        signal.pause()
+
+except KeyboardInterrupt:
+    detector.stop()
+    print("Draining pending photos and emails...")
+    if not pipeline.close(timeout=30):
+        print("Some emails could not be sent before exiting.")
+    print(pipeline.stats())
+    GPIO.cleanup()
+    picam2.stop()
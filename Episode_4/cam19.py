@@ -0,0 +1,198 @@
+# cam19.py
+#
+# Description:
+# Builds on cam18.py. The apply_text pre_callback, which formatted
+# and drew the timestamp on every frame, is replaced by the cached
+# Overlay from overlay.py: the "DDMMYYYY HH:MM" text is rendered
+# once a minute into a mask and copied into the main stream in
+# place. A second item shows the zone name in the top-left corner.
+# See bench_overlay.py for the per-frame cost of both versions.
+#
+# j3 @ Oct, 2026
+
+import RPi.GPIO as GPIO
+import time, cv2
+from picamera2 import Picamera2, MappedArray
+from libcamera import Transform
+import os
+import signal
+from pir_events import PirEdgeDetector
+from pipeline import Pipeline, Stage, DROP_NEWEST, DROP_OLDEST
+from smtp_pool import SmtpPool, build_alert
+from frame_ring import FrameRing
+from live_capture import LiveCapture
+from overlay import Overlay, TextItem, timestamp_item, TOP_LEFT
+
+
+email_token = os.getenv('EMAIL_TOKEN')
+if not email_token:
+    raise ValueError("No EMAIL TOKEN found. Set the EMAIL_TOKEN environment variable.")
+
+from_email = os.getenv('FROM_EMAIL')
+if not from_email:
+    raise ValueError("No FROM EMAIL ACCOUNT found. Set the FROM EMAIL environment variable.")
+
+to_email = os.getenv('TO_EMAIL')
+if not to_email:
+    raise ValueError("No TO EMAIL ACCOUNT found. Set the TO_EMAIL environment variable.")
+
+PIR_PIN = 4
+LED_PIN = 17
+resolution = (800, 600)
+lores_resolution = (640, 480)
+LOG_FILE_NAME = "/home/pi/Camera/log/photo_logs.txt"
+ZONE_NAME = "Front door"
+
+MOV_DETECT_THRESHOLD = 3.0  # Time threshold for sustained motion
+MIN_DURATION_BETWEEN_PHOTOS = 60.0  # Minimum time between two photos (in seconds)
+PRE_TRIGGER_SECONDS = 4.0  # How far back the frame ring reaches
+RING_EVERY_N_FRAMES = 3  # Keep one frame in three (~10 fps at 30 fps)
+CAMERA_FPS = 30
+
+def record_frame(request):
+    # post_callback: copy every Nth lores frame into the ring
+    global frame_counter
+    frame_counter += 1
+    if frame_counter % RING_EVERY_N_FRAMES:
+        return
+    with MappedArray(request, "lores") as m:
+        ring.push(m.array)
+
+def save_motion_start_frame(movement_timer, photo_file_name):
+    # Save the ring frame from just before the rising edge (the first
+    # one since() returns, when the ring still reaches that far back)
+    frames, stamps = ring.since(movement_timer)
+    if len(frames) == 0:
+        return None
+    if stamps[0] > movement_timer:
+        # A re-trigger after the cooldown: the motion started before
+        # the oldest frame in the ring, which would not show it
+        print(f"Motion start frame skipped: the ring starts {stamps[0] - movement_timer:.1f}s after the rising edge")
+        return None
+    file_name = photo_file_name.replace(".jpg", "_start.jpg")
+    cv2.imwrite(file_name, cv2.cvtColor(frames[0], cv2.COLOR_YUV2BGR_I420))
+    print(f"Motion start frame saved: {file_name} ({movement_timer - stamps[0]:+.2f}s)")
+    return file_name
+
+def take_photo(_picam2):
+    # Ensure the directory exists
+    if not os.path.exists("/home/pi/Camera"):
+        os.makedirs("/home/pi/Camera")
+
+    file_name = "/home/pi/Camera/img_" + str(time.time()) + ".jpg"
+    # Grab from the running stream; wait only for our own encoder thread
+    _picam2.capture_file(file_name).result()
+    print(f"Photo saved: {file_name}")
+    return file_name
+
+# Ensure that the directory exists before attempting to write to the log file
+def update_photo_log_file(_photo_file_name):
+    # Ensure the directory exists
+    log_directory = os.path.dirname(LOG_FILE_NAME)
+    if not os.path.exists(log_directory):
+        os.makedirs(log_directory)
+
+    with open(LOG_FILE_NAME, "a", encoding="utf-8") as f:
+        f.write(_photo_file_name)
+        f.write("\n")
+
+def send_email_with_photo(smtp_pool, file_name):
+    smtp_pool.send(build_alert(from_email, to_email, file_name))
+
+def capture_stage(item):
+    trigger_time, movement_timer = item
+    photo_file_name = take_photo(live)
+    print(f"Trigger to file: {(time.monotonic() - trigger_time) * 1000:.0f} ms")
+    start_file_name = save_motion_start_frame(movement_timer, photo_file_name)
+    return [f for f in (start_file_name, photo_file_name) if f]
+
+def persist_stage(photo_file_names):
+    for photo_file_name in photo_file_names:
+        update_photo_log_file(photo_file_name)
+    return photo_file_names
+
+def notify_stage(photo_file_names):
+    send_email_with_photo(smtp_pool, photo_file_names)
+
+def on_sustained_motion(movement_timer):
+    # Runs on the detector's timer thread: just queue the work
+    print("Take Photo and Send it by Email")
+    pipeline.submit((time.monotonic(), movement_timer))
+
+# Setup camera
+picam2 = Picamera2()
+# A single config: the main stream is at capture resolution and
+# is what gets saved, so there is no still config to switch to
+preview_config = picam2.create_preview_configuration({"size": resolution, "format": "RGB888"},
+                                                     lores={"size": lores_resolution, "format": "YUV420"},
+                                                     transform=Transform(hflip=True, vflip=True))
+
+# Preallocate the frame ring: a YUV420 frame is height * 3/2 rows of width bytes
+ring_depth = int(PRE_TRIGGER_SECONDS * CAMERA_FPS / RING_EVERY_N_FRAMES) + 1
+ring = FrameRing(ring_depth, (lores_resolution[1] * 3 // 2, lores_resolution[0]))
+frame_counter = 0
+print(ring.describe())
+
+# Set the current config as the preview config
+picam2.configure(preview_config)
+
+# Add the timestamp and zone name, and feed the frame ring
+overlay = Overlay(resolution, [
+    timestamp_item(),
+    TextItem(lambda: ZONE_NAME, anchor=TOP_LEFT, refresh=None, scale=0.7),
+])
+picam2.pre_callback = overlay.apply
+picam2.post_callback = record_frame
+# Start the camera
+picam2.start()
+
+live = LiveCapture(picam2)
+
+# Pause for 2 seconds to allow the camera to stabilize
+time.sleep(2)
+print("Camera setup ok.")
+
+# Remove log file
+if os.path.exists(LOG_FILE_NAME):
+    os.remove(LOG_FILE_NAME)
+    print("Log file removed.")
+
+# Setup the SMTP session pool and open the first session now
+smtp_pool = SmtpPool(from_email, email_token, size=2)
+smtp_pool.release(smtp_pool.acquire())
+print("Email sender setup OK.")
+
+# Setup the capture -> persist -> notify pipeline
+pipeline = Pipeline(
+    Stage("capture", capture_stage, maxsize=2, policy=DROP_NEWEST),
+    Stage("persist", persist_stage, maxsize=16),
+    Stage("notify", notify_stage, maxsize=8, policy=DROP_OLDEST, workers=2),
+)
+pipeline.start()
+print("Pipeline setup ok.")
+
+# Setup GPIOs and the edge detector
+GPIO.setmode(GPIO.BCM)
+detector = PirEdgeDetector(GPIO, PIR_PIN, on_sustained_motion, led_pin=LED_PIN,
+                           threshold=MOV_DETECT_THRESHOLD,
+                           min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+detector.start()
+print("GPIOs setup ok.")
+
+print("Everything has been set up.")
+
+try:
+    # Nothing to poll: wait for signals while the GPIO thread does the work
+    while True:
+        signal.pause()
+
+except KeyboardInterrupt:
+    detector.stop()
+    print("Draining pending photos and emails...")
+    if not pipeline.close(timeout=30):
+        print("Some emails could not be sent before exiting.")
+    print(pipeline.stats())
+    smtp_pool.close()
+    live.close()
+    GPIO.cleanup()
+    picam2.stop()
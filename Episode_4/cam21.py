@@ -0,0 +1,46 @@
+# cam21.py
+#
+# Description:
+# Live pencil-sketch version of Episode_1/cam4.py. The SketchFilter
+# from sketch.py runs as a pre_callback, so the preview window
+# shows the sketch while the camera is running. After 5 seconds
+# a frame is taken straight from the stream with capture_array()
+# and its sketch is saved as "sketchImage.jpg", without the
+# toProcess.jpg write/read round-trip.
+# Pass "box" or "exact" on the command line to trade speed for
+# accuracy (default: downscale by 4).
+#
+# j3 @ Oct, 2026
+
+from picamera2 import Picamera2
+from time import sleep
+from libcamera import Transform
+import sys
+import cv2
+from sketch import SketchFilter, DOWNSCALE
+
+mode = sys.argv[1] if len(sys.argv) > 1 else DOWNSCALE
+
+picam2 = Picamera2()
+
+# Preview at 800 x 600, flipped like cam4.py
+preview_config = picam2.create_preview_configuration({"size": (800, 600)},
+                                                     transform=Transform(hflip=True, vflip=True))
+picam2.configure(preview_config)
+
+# One filter for the live preview...
+preview_filter = SketchFilter(mode=mode)
+picam2.pre_callback = preview_filter.apply
+picam2.start(show_preview=True)
+
+sleep(5)
+
+# ...and the still is filtered from the array, after the callback
+# is removed so the sketch is not applied twice
+picam2.pre_callback = None
+frame = picam2.capture_array("main")
+picam2.close()
+
+sketch = SketchFilter(mode=mode).process(frame)
+cv2.imwrite("sketchImage.jpg", sketch)
+print("Sketch saved: sketchImage.jpg")
@@ -0,0 +1,298 @@
+# cam27.py
+#
+# Description:
+# Builds on cam26.py, with a fast cold start. After a reboot or a
+# crash cam26.py was blind for several seconds: it imported cv2,
+# picamera2 and libcamera up front, slept a fixed 2 s after
+# picam2.start(), and only then opened SMTP and set up the GPIOs.
+# Now (startup.py):
+# - only light modules are imported at the top; cv2, picamera2,
+#   libcamera, RPi.GPIO and smtplib are imported by the setup step
+#   that needs them
+# - camera, SMTP, GPIO and storage are brought up in parallel
+# - the fixed sleep is replaced by a wait for AE/AWB convergence in
+#   the frame metadata (at most CONVERGENCE_TIMEOUT seconds)
+# - the time from process start to "armed" is printed and logged
+#   as an "armed" event with the time of every step
+#
+# j3 @ Oct, 2026
+
+import time
+import os
+import signal
+import threading
+from startup import BringUp, seconds_since_exec, wait_for_convergence
+from pipeline import Pipeline, Stage, DROP_NEWEST, DROP_OLDEST
+from event_log import TRIGGER, CAPTURE, EMAIL_SENT, EMAIL_FAILED, ARMED
+
+
+email_token = os.getenv('EMAIL_TOKEN')
+if not email_token:
+    raise ValueError("No EMAIL TOKEN found. Set the EMAIL_TOKEN environment variable.")
+
+from_email = os.getenv('FROM_EMAIL')
+if not from_email:
+    raise ValueError("No FROM EMAIL ACCOUNT found. Set the FROM EMAIL environment variable.")
+
+to_email = os.getenv('TO_EMAIL')
+if not to_email:
+    raise ValueError("No TO EMAIL ACCOUNT found. Set the TO_EMAIL environment variable.")
+
+PIR_PIN = 4
+LED_PIN = 17
+resolution = (800, 600)
+lores_resolution = (640, 480)
+EVENT_LOG_DIR = "/home/pi/Camera/log/events"
+PHOTO_DIR = "/home/pi/Camera"
+PHOTO_QUOTA_BYTES = 8 * 1024 ** 3  # Oldest photos are deleted past 8 GB
+BURST_FRAMES = 5  # Frames per burst, 5 at 30 fps is ~170 ms
+BURST_BUDGET = 0.4  # Seconds from trigger to the sharpest frame being picked
+UPLINK_BPS = 256_000  # Measured uplink speed, bits per second
+ATTACHMENT_BUDGET_SECONDS = 2.0  # Upload time allowed for the photos of one email
+# The live view has no authentication, so it only listens on the Pi
+# itself; watch it through an SSH tunnel:
+#   ssh -L 8000:localhost:8000 pi@<pi address>, then http://localhost:8000/
+# "0.0.0.0" lets anyone on the LAN watch the camera: trusted networks only.
+LIVE_VIEW_HOST = "127.0.0.1"
+LIVE_VIEW_PORT = 8000
+LIVE_VIEW_FPS = 10
+CONVERGENCE_TIMEOUT = 2.0  # The old fixed sleep, now only an upper bound
+ZONE_NAME = "Front door"
+
+MOV_DETECT_THRESHOLD = 3.0  # Time threshold for sustained motion
+MIN_DURATION_BETWEEN_PHOTOS = 60.0  # Minimum time between two photos (in seconds)
+PRE_TRIGGER_SECONDS = 4.0  # How far back the frame ring reaches
+RING_EVERY_N_FRAMES = 3  # Keep one frame in three (~10 fps at 30 fps)
+CAMERA_FPS = 30
+FUSION_POLICY = "both"  # motion.PIR_ONLY, CAMERA_ONLY, BOTH or EITHER
+MOTION_ROI = [(0.0, 0.1, 1.0, 1.0)]  # Ignore the top 10% of the picture
+
+def record_frame(request):
+    # post_callback: look for motion in the Y plane of every lores
+    # frame and copy every Nth frame into the ring
+    global frame_counter
+    frame_counter += 1
+    with MappedArray(request, "lores") as m:
+        moving = motion_detector.update(m.array[:lores_resolution[1], :lores_resolution[0]])
+        if frame_counter % RING_EVERY_N_FRAMES == 0:
+            ring.push(m.array)
+    if moving and armed and fusion.on_camera():
+        print("Camera motion: Take Photo and Send it by Email")
+        now = time.monotonic()
+        event_log.append(TRIGGER, source="camera")
+        pipeline.submit((now, now, "camera"))
+
+def save_motion_start_frame(movement_timer, photo_file_name):
+    # Save the ring frame from just before the rising edge (the first
+    # one since() returns, when the ring still reaches that far back)
+    frames, stamps = ring.since(movement_timer)
+    if len(frames) == 0:
+        return None
+    if stamps[0] > movement_timer:
+        # A re-trigger after the cooldown: the motion started before
+        # the oldest frame in the ring, which would not show it
+        print(f"Motion start frame skipped: the ring starts {stamps[0] - movement_timer:.1f}s after the rising edge")
+        return None
+    file_name = photo_file_name.replace(".jpg", "_start.jpg")
+    cv2.imwrite(file_name, cv2.cvtColor(frames[0], cv2.COLOR_YUV2BGR_I420))
+    print(f"Motion start frame saved: {file_name} ({movement_timer - stamps[0]:+.2f}s)")
+    return file_name
+
+def take_photo(_burst):
+    # Date-sharded file name; the day directory is created on demand
+    file_name = store.path_for(time.time())
+    # Grab a burst from the running stream and save the sharpest frame
+    _burst.capture_file(file_name).result()
+    print(f"Photo saved: {file_name} (burst {_burst.grab_seconds * 1000:.0f} ms, "
+          f"scoring {_burst.score_seconds * 1000:.0f} ms)")
+    return file_name
+
+def send_email_with_photo(smtp_pool, file_name, attachment_bytes=None):
+    start = time.monotonic()
+    try:
+        smtp_pool.send(build_alert(from_email, to_email, file_name))
+    except Exception as e:
+        event_log.append(EMAIL_FAILED, files=file_name, error=repr(e),
+                         duration_ms=round((time.monotonic() - start) * 1000, 1))
+        raise
+    event_log.append(EMAIL_SENT, files=file_name, attachment_bytes=attachment_bytes,
+                     duration_ms=round((time.monotonic() - start) * 1000, 1))
+
+def capture_stage(item):
+    trigger_time, movement_timer, source = item
+    photo_file_name = take_photo(burst)
+    latency_ms = (time.monotonic() - trigger_time) * 1000
+    print(f"Trigger to file: {latency_ms:.0f} ms")
+    start_file_name = save_motion_start_frame(movement_timer, photo_file_name)
+    return photo_file_name, start_file_name, latency_ms, source
+
+def persist_stage(item):
+    photo_file_name, start_file_name, latency_ms, source = item
+    for file_name in (start_file_name, photo_file_name):
+        if file_name:
+            store.add(file_name, trigger=source, zone=ZONE_NAME)
+    event_log.append(CAPTURE, file=photo_file_name, start_file=start_file_name,
+                     latency_ms=round(latency_ms, 1))
+    return [f for f in (start_file_name, photo_file_name) if f]
+
+def shrink_stage(photo_file_names):
+    # Smaller copies of the photos for the email; the originals stay as they are
+    attachments = optimizer.optimize_many(photo_file_names)
+    return attachments, sum(os.path.getsize(f) for f in attachments)
+
+def notify_stage(item):
+    attachments, attachment_bytes = item
+    send_email_with_photo(smtp_pool, attachments, attachment_bytes)
+
+def on_sustained_motion(movement_timer):
+    # Runs on the detector's timer thread: just queue the work
+    if not fusion.on_pir():
+        print("PIR motion without camera motion, ignored")
+        return
+    print("Take Photo and Send it by Email")
+    event_log.append(TRIGGER, source="pir")
+    pipeline.submit((time.monotonic(), movement_timer, "pir"))
+
+def setup_camera():
+    # Heavy imports happen here, on the bring-up thread
+    global cv2, MappedArray, picam2, ring, frame_counter, motion_detector, fusion, live, burst
+    import cv2
+    from picamera2 import Picamera2, MappedArray
+    from libcamera import Transform
+    from frame_ring import FrameRing
+    from live_capture import LiveCapture
+    from burst import BurstCapture
+    from mjpeg_server import serve
+    from overlay import Overlay, TextItem, timestamp_item, TOP_LEFT
+    from motion import BlockMotionDetector, MotionFusion, roi_from_rects
+
+    picam2 = Picamera2()
+    # A single config: the main stream is at capture resolution and
+    # is what gets saved, so there is no still config to switch to
+    preview_config = picam2.create_preview_configuration({"size": resolution, "format": "RGB888"},
+                                                         lores={"size": lores_resolution, "format": "YUV420"},
+                                                         transform=Transform(hflip=True, vflip=True))
+
+    # Preallocate the frame ring: a YUV420 frame is height * 3/2 rows of width bytes
+    ring_depth = int(PRE_TRIGGER_SECONDS * CAMERA_FPS / RING_EVERY_N_FRAMES) + 1
+    ring = FrameRing(ring_depth, (lores_resolution[1] * 3 // 2, lores_resolution[0]))
+    frame_counter = 0
+    print(ring.describe())
+
+    # Camera motion detector and PIR/camera fusion. The camera callback
+    # only triggers photos once everything is set up (armed).
+    motion_detector = BlockMotionDetector(
+        (lores_resolution[1], lores_resolution[0]),
+        roi=roi_from_rects((lores_resolution[1] // 16, lores_resolution[0] // 16), MOTION_ROI))
+    fusion = MotionFusion(FUSION_POLICY, pir_active=lambda: detector.motion(),
+                          min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+
+    # Set the current config as the preview config
+    picam2.configure(preview_config)
+
+    # Add the timestamp and zone name, and feed the frame ring
+    overlay = Overlay(resolution, [
+        timestamp_item(),
+        TextItem(lambda: ZONE_NAME, anchor=TOP_LEFT, refresh=None, scale=0.7),
+    ])
+    picam2.pre_callback = overlay.apply
+    picam2.post_callback = record_frame
+    # Start the camera
+    picam2.start()
+
+    live = LiveCapture(picam2)
+    burst = BurstCapture(live, (resolution[1], resolution[0], 3), count=BURST_FRAMES, budget=BURST_BUDGET)
+    print(burst.describe())
+
+    # Live view over HTTP, on its own event loop thread
+    import asyncio
+    threading.Thread(target=asyncio.run, args=(serve(picam2, LIVE_VIEW_HOST, LIVE_VIEW_PORT, LIVE_VIEW_FPS, 80),),
+                     name="live-view", daemon=True).start()
+
+    # Wait for the exposure and white balance to settle instead of a fixed 2 s
+    converged, waited, frames = wait_for_convergence(picam2, timeout=CONVERGENCE_TIMEOUT)
+    print(f"Camera setup ok: {'converged' if converged else 'NOT converged'} "
+          f"after {waited * 1000:.0f} ms ({frames} frames).")
+    return waited
+
+def setup_storage():
+    global event_log, store
+    from photo_store import PhotoStore
+    from event_log import EventLog
+    # Open the event log; earlier runs are kept
+    event_log = EventLog(EVENT_LOG_DIR)
+    print("Event log setup ok.")
+    # Open the photo store and its catalog
+    store = PhotoStore(PHOTO_DIR, quota_bytes=PHOTO_QUOTA_BYTES)
+    print(f"Photo store setup ok: {store.count()} photos, {store.used_bytes / 1024 ** 2:.0f} MB.")
+
+def setup_email():
+    global smtp_pool, build_alert, optimizer
+    from smtp_pool import SmtpPool, build_alert
+    from attachments import AttachmentOptimizer
+    # Setup the SMTP session pool and open the first session now
+    smtp_pool = SmtpPool(from_email, email_token, size=2)
+    smtp_pool.release(smtp_pool.acquire())
+    print("Email sender setup OK.")
+    # Attachments are shrunk to fit the uplink budget
+    optimizer = AttachmentOptimizer(uplink_bps=UPLINK_BPS, budget_seconds=ATTACHMENT_BUDGET_SECONDS)
+    print(f"Attachment budget: {optimizer.target_bytes / 1024:.0f} kB per email.")
+
+def setup_gpio():
+    global GPIO, detector
+    import RPi.GPIO as GPIO
+    from pir_events import PirEdgeDetector
+    # Setup GPIOs; the edge detector only starts once everything is up
+    GPIO.setmode(GPIO.BCM)
+    detector = PirEdgeDetector(GPIO, PIR_PIN, on_sustained_motion, led_pin=LED_PIN,
+                               threshold=MOV_DETECT_THRESHOLD,
+                               min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+    print("GPIOs setup ok.")
+
+armed = False
+
+# Bring up the camera, storage, email and GPIOs in parallel
+bring_up = BringUp()
+bring_up.add("camera", setup_camera)
+bring_up.add("storage", setup_storage)
+bring_up.add("email", setup_email)
+bring_up.add("gpio", setup_gpio)
+convergence_seconds = bring_up.run()["camera"]
+
+# Setup the capture -> persist -> shrink -> notify pipeline
+pipeline = Pipeline(
+    Stage("capture", capture_stage, maxsize=2, policy=DROP_NEWEST),
+    Stage("persist", persist_stage, maxsize=16),
+    Stage("shrink", shrink_stage, maxsize=8),
+    Stage("notify", notify_stage, maxsize=8, policy=DROP_OLDEST, workers=2),
+)
+pipeline.start()
+print("Pipeline setup ok.")
+
+detector.start()
+armed = True
+
+armed_seconds = seconds_since_exec()
+print(f"Everything has been set up: armed {armed_seconds:.2f}s after start ({bring_up.describe()}).")
+event_log.append(ARMED, seconds=round(armed_seconds, 3), convergence_ms=round(convergence_seconds * 1000, 1),
+                 steps={name: [round(start, 3), round(end, 3)] for name, (start, end) in bring_up.timings.items()})
+
+try:
+    # Nothing to poll: wait for signals while the GPIO thread does the work
+    while True:
+        signal.pause()
+
+except KeyboardInterrupt:
+    detector.stop()
+    print("Draining pending photos and emails...")
+    if not pipeline.close(timeout=30):
+        print("Some emails could not be sent before exiting.")
+    print(pipeline.stats())
+    print(optimizer.describe())
+    smtp_pool.close()
+    burst.close()
+    live.close()
+    event_log.close()
+    store.close()
+    GPIO.cleanup()
+    picam2.stop()
@@ -0,0 +1,496 @@
+# cam33.py
+#
+# Description:
+# Builds on cam32.py, with a night mode (night.py). At night a
+# single burst frame is mostly sensor noise, and the noise makes
+# the JPEG big, so the attachment optimizer squeezes it hard. Now:
+# - the frame callback hands the metadata to NightStack once every
+#   NIGHT_CHECK_EVERY frames; night mode switches on and off by
+#   itself from AnalogueGain / ExposureTime, with hysteresis
+# - at night a trigger stacks up to NIGHT_FRAMES consecutive frames,
+#   aligned on the first one, into preallocated buffers and saves
+#   their mean, within NIGHT_BUDGET seconds; in daylight the burst
+#   capture is used as before
+# - night_mode and night_stack_seconds are in the metrics
+#
+# j3 @ Oct, 2026
+
+import time
+import os
+import threading
+from startup import BringUp, seconds_since_exec, wait_for_convergence
+from pipeline import Pipeline, Stage, DROP_NEWEST
+from event_log import TRIGGER, CAPTURE, DUPLICATE, CLASSIFIED, EMAIL_SENT, EMAIL_FAILED, ARMED
+from metrics import Registry, MetricsServer, SnapshotWriter, JITTER_BUCKETS
+
+
+email_token = os.getenv('EMAIL_TOKEN')
+if not email_token:
+    raise ValueError("No EMAIL TOKEN found. Set the EMAIL_TOKEN environment variable.")
+
+from_email = os.getenv('FROM_EMAIL')
+if not from_email:
+    raise ValueError("No FROM EMAIL ACCOUNT found. Set the FROM EMAIL environment variable.")
+
+to_email = os.getenv('TO_EMAIL')
+if not to_email:
+    raise ValueError("No TO EMAIL ACCOUNT found. Set the TO_EMAIL environment variable.")
+
+PIR_PIN = 4
+LED_PIN = 17
+resolution = (800, 600)
+lores_resolution = (640, 480)
+EVENT_LOG_DIR = "/home/pi/Camera/log/events"
+OUTBOX_DB = "/home/pi/Camera/log/outbox.db"
+PHOTO_DIR = "/home/pi/Camera"
+PHOTO_QUOTA_BYTES = 8 * 1024 ** 3  # Oldest photos are deleted past 8 GB
+BURST_FRAMES = 5  # Frames per burst, 5 at 30 fps is ~170 ms
+BURST_BUDGET = 0.4  # Seconds from trigger to the sharpest frame being picked
+UPLINK_BPS = 256_000  # Measured uplink speed, bits per second
+ATTACHMENT_BUDGET_SECONDS = 2.0  # Upload time allowed for the photos of one email
+# The live view has no authentication, so it only listens on the Pi
+# itself; watch it through an SSH tunnel:
+#   ssh -L 8000:localhost:8000 pi@<pi address>, then http://localhost:8000/
+# "0.0.0.0" lets anyone on the LAN watch the camera: trusted networks only.
+LIVE_VIEW_HOST = "127.0.0.1"
+LIVE_VIEW_PORT = 8000
+LIVE_VIEW_FPS = 10
+CONVERGENCE_TIMEOUT = 2.0  # The old fixed sleep, now only an upper bound
+ZONE_NAME = "Front door"
+METRICS_PORT = 9108  # Local only: http://127.0.0.1:9108/metrics
+METRICS_SNAPSHOT = "/home/pi/Camera/log/metrics.json"
+METRICS_SNAPSHOT_SECONDS = 60
+LOOP_INTERVAL = 0.01  # Main loop period, only used to measure jitter
+CLASSIFY_BACKEND = "hog"  # "hog", "dnn" (CLASSIFY_MODEL/CLASSIFY_CONFIG) or None for no classification
+CLASSIFY_CLASSES = {"person"}  # Only alerts with one of these are emailed
+CLASSIFY_MODEL = "/home/pi/Camera/models/MobileNetSSD_deploy.caffemodel"  # dnn only
+CLASSIFY_CONFIG = "/home/pi/Camera/models/MobileNetSSD_deploy.prototxt"  # dnn only
+CLASSIFY_BUDGET = 1.5  # Seconds an alert waits for a verdict before being sent anyway
+CLASSIFY_WORKERS = 1
+DEDUP = True  # Skip captures of the same scene as a recently emailed one
+DEDUP_METHOD = "phash"  # 16x16 phash (dedup.PHASH); the threshold is for this hash
+DEDUP_THRESHOLD = 4  # Bits out of 256; in bench_dedup.py 0.3% false merges (gone 1%, moved 0%, added 0%)
+DEDUP_WINDOW = 300.0  # Seconds an emailed capture stays in the index
+DEDUP_CAPACITY = 64
+DEDUP_KEEP_PHOTOS = True  # Store duplicates (not sent), or delete them
+NIGHT_MODE = True  # Stack frames when it is dark
+NIGHT_FRAMES = 8  # Frames averaged at most; 8 frames ~ 3x less noise
+NIGHT_BUDGET = 1.0  # Seconds from trigger to the stacked frame
+NIGHT_ALIGN = True  # Undo small camera sways between the frames
+NIGHT_GAIN = (6.0, 4.0)  # AnalogueGain to switch night mode on, and off
+NIGHT_EXPOSURE = (50000, 30000)  # ExposureTime (us) to switch night mode on, and off
+NIGHT_CHECK_EVERY = 30  # Frames between two looks at the metadata (~1 s)
+
+MOV_DETECT_THRESHOLD = 3.0  # Time threshold for sustained motion
+MIN_DURATION_BETWEEN_PHOTOS = 60.0  # Minimum time between two photos (in seconds)
+PRE_TRIGGER_SECONDS = 4.0  # How far back the frame ring reaches
+RING_EVERY_N_FRAMES = 3  # Keep one frame in three (~10 fps at 30 fps)
+CAMERA_FPS = 30
+CALLBACK_BUDGET = 0.5  # Share of the frame interval the callbacks may use
+FUSION_POLICY = "both"  # motion.PIR_ONLY, CAMERA_ONLY, BOTH or EITHER
+MOTION_ROI = [(0.0, 0.1, 1.0, 1.0)]  # Ignore the top 10% of the picture
+
+# Metrics, created first so every setup step can use them
+metrics = Registry()
+loop_jitter = metrics.histogram("loop_jitter_seconds", "How late the main loop woke up",
+                                buckets=JITTER_BUCKETS)
+pir_edges = metrics.counter("pir_edges", "PIR output level changes", ["edge"])
+triggers = metrics.counter("triggers", "Photos triggered", ["source"])
+trigger_to_capture = metrics.histogram("trigger_to_capture_seconds", "From trigger to photo on disk")
+capture_seconds = metrics.histogram("capture_seconds", "Burst grab and sharpness scoring")
+encode_seconds = metrics.histogram("encode_seconds", "JPEG encode and write of the best frame")
+email_send = metrics.histogram("email_send_seconds", "SMTP send, successful or not")
+emails = metrics.counter("emails", "Emails sent or failed", ["result"])
+queue_depth = metrics.gauge("queue_depth", "Items waiting in a pipeline stage", ["stage"])
+outbox_pending = metrics.gauge("outbox_pending", "Alerts waiting in the outbox")
+classify_seconds = metrics.histogram("classify_seconds", "Time an alert waited for its verdict")
+classify_decisions = metrics.counter("classify_decisions", "Classification verdicts", ["result"])
+dedup_results = metrics.counter("dedup_results", "Captures checked for duplicates", ["result"])
+night_mode = metrics.gauge("night_mode", "1 while photos are stacked for low light")
+night_stack = metrics.histogram("night_stack_seconds", "Grabbing and stacking the frames of a night photo")
+
+# The classifier's workers are forked first, while this is the only thread
+gate = None
+if CLASSIFY_BACKEND:
+    from classify import ClassificationGate, DNN
+    gate = ClassificationGate(CLASSIFY_CLASSES, CLASSIFY_BACKEND, workers=CLASSIFY_WORKERS, budget=CLASSIFY_BUDGET,
+                              **({"model": CLASSIFY_MODEL, "config": CLASSIFY_CONFIG}
+                                 if CLASSIFY_BACKEND == DNN else {})).start()
+
+def on_pir_edge(level, timestamp):
+    pir_edges.labels(edge="rising" if level else "falling").inc()
+
+def record_frame(request):
+    # post_callback: look for motion in the Y plane of every lores
+    # frame and copy every Nth frame into the ring
+    global frame_counter
+    frame_counter += 1
+    with MappedArray(request, "lores") as m:
+        moving = motion_detector.update(m.array[:lores_resolution[1], :lores_resolution[0]])
+        if frame_counter % RING_EVERY_N_FRAMES == 0:
+            ring.push(m.array)
+    if night is not None and frame_counter % NIGHT_CHECK_EVERY == 0:
+        was_night = night.active
+        if night.observe(request.get_metadata()) != was_night:
+            print(f"Night mode {'on' if night.active else 'off'}")
+            night_mode.set(1 if night.active else 0)
+    if moving and armed and fusion.on_camera():
+        print("Camera motion: Take Photo and Send it by Email")
+        now = time.monotonic()
+        triggers.labels(source="camera").inc()
+        event_log.append(TRIGGER, source="camera")
+        pipeline.submit((now, now, "camera"))
+
+def save_motion_start_frame(movement_timer, photo_file_name):
+    # Save the ring frame from just before the rising edge (the first
+    # one since() returns, when the ring still reaches that far back)
+    frames, stamps = ring.since(movement_timer)
+    if len(frames) == 0:
+        return None
+    if stamps[0] > movement_timer:
+        # A re-trigger after the cooldown: the motion started before
+        # the oldest frame in the ring, which would not show it
+        print(f"Motion start frame skipped: the ring starts {stamps[0] - movement_timer:.1f}s after the rising edge")
+        return None
+    file_name = photo_file_name.replace(".jpg", "_start.jpg")
+    cv2.imwrite(file_name, cv2.cvtColor(frames[0], cv2.COLOR_YUV2BGR_I420))
+    print(f"Motion start frame saved: {file_name} ({movement_timer - stamps[0]:+.2f}s)")
+    return file_name
+
+def take_photo(_burst):
+    # Date-sharded file name; the day directory is created on demand
+    file_name = store.path_for(time.time())
+    start = time.perf_counter()
+    if night is not None and night.active:
+        # Low light: the mean of several frames
+        future = night.capture_file(file_name)
+        grabbed = time.perf_counter()
+        night_stack.observe(night.stack_seconds)
+        detail = f"night, {night.stacked} frames stacked, {night.rejected} left out"
+    else:
+        # Grab a burst from the running stream and save the sharpest frame
+        future = _burst.capture_file(file_name)
+        grabbed = time.perf_counter()
+        detail = f"burst {_burst.grab_seconds * 1000:.0f} ms, scoring {_burst.score_seconds * 1000:.0f} ms"
+    future.result()
+    capture_seconds.observe(grabbed - start)
+    encode_seconds.observe(time.perf_counter() - grabbed)
+    print(f"Photo saved: {file_name} ({detail}, {(grabbed - start) * 1000:.0f} ms)")
+    return file_name
+
+def build_email(photo_file_names, meta):
+    # Called by the outbox when the alert is sent, with the shrunk copies
+    # the shrink stage made; they are only made again if they are gone
+    # (evicted from the optimizer's cache, or /tmp cleared by a reboot)
+    attachments = meta.get("attachments")
+    if not attachments or not all(os.path.exists(f) for f in attachments):
+        attachments = optimizer.optimize_many(photo_file_names)
+    return build_alert(from_email, to_email, attachments)
+
+def on_email_result(photo_file_names, meta, error, duration):
+    # Called by the outbox after every send attempt
+    email_send.observe(duration)
+    if error is not None:
+        emails.labels(result="failed").inc()
+        event_log.append(EMAIL_FAILED, files=photo_file_names, error=repr(error),
+                         duration_ms=round(duration * 1000, 1))
+        return
+    emails.labels(result="sent").inc()
+    event_log.append(EMAIL_SENT, files=photo_file_names, attachment_bytes=meta.get("attachment_bytes"),
+                     duration_ms=round(duration * 1000, 1))
+
+def capture_stage(item):
+    trigger_time, movement_timer, source = item
+    photo_file_name = take_photo(burst)
+    latency = time.monotonic() - trigger_time
+    trigger_to_capture.observe(latency)
+    latency_ms = latency * 1000
+    print(f"Trigger to file: {latency_ms:.0f} ms")
+    start_file_name = save_motion_start_frame(movement_timer, photo_file_name)
+    return photo_file_name, start_file_name, latency_ms, source
+
+def dedup_stage(item):
+    # A capture of the same scene as a recently emailed one goes no further
+    photo_file_name, start_file_name, latency_ms, source = item
+    if dedup is None:
+        return item
+    try:
+        match = dedup.find_file(photo_file_name)
+    except Exception as e:
+        print(f"Dedup failed ({e!r}), photo kept")
+        return item
+    if match is None:
+        dedup_results.labels(result="new").inc()
+        return item
+    dedup_results.labels(result="duplicate").inc()
+    for file_name in (start_file_name, photo_file_name):
+        if not file_name:
+            continue
+        if DEDUP_KEEP_PHOTOS:
+            store.add(file_name, trigger=source, zone=ZONE_NAME)
+        else:
+            os.remove(file_name)
+    event_log.append(DUPLICATE, file=photo_file_name, of=match.key, distance=match.distance,
+                     repeats=match.repeats, age_s=round(match.age, 1), kept=DEDUP_KEEP_PHOTOS)
+    print(f"Same scene as {match.key} ({match.distance} bits, repeat {match.repeats}), not sent")
+    return None
+
+def persist_stage(item):
+    photo_file_name, start_file_name, latency_ms, source = item
+    for file_name in (start_file_name, photo_file_name):
+        if file_name:
+            store.add(file_name, trigger=source, zone=ZONE_NAME)
+    event_log.append(CAPTURE, file=photo_file_name, start_file=start_file_name,
+                     latency_ms=round(latency_ms, 1))
+    return [f for f in (start_file_name, photo_file_name) if f]
+
+def classify_stage(photo_file_names):
+    # Drops the alert (not the photos) when nothing of interest is in them
+    if gate is None or gate.failure is not None:
+        return photo_file_names  # No classifier, or it broke: every alert is sent
+    decision = gate.check(photo_file_names)
+    classify_seconds.observe(decision.seconds)
+    classify_decisions.labels(result=decision.reason).inc()
+    event_log.append(CLASSIFIED, files=photo_file_names, result=decision.reason, send=decision.send,
+                     detections=[[label, score] for label, score, _ in decision.detections],
+                     duration_ms=round(decision.seconds * 1000, 1))
+    print(f"Classified in {decision.seconds * 1000:.0f} ms: {decision.reason}")
+    return photo_file_names if decision.send else None
+
+def shrink_stage(photo_file_names):
+    # Smaller copies of the photos for the email; the originals stay as they are
+    attachments = optimizer.optimize_many(photo_file_names)
+    return photo_file_names, attachments
+
+def notify_stage(item):
+    # The outbox keeps the originals' names and sends when it can
+    photo_file_names, attachments = item
+    outbox.put(photo_file_names, attachments=attachments,
+               attachment_bytes=sum(os.path.getsize(f) for f in attachments))
+    if dedup is not None:
+        # Only now is the scene "already sent": repeats of a capture that
+        # was suppressed or dropped on the way must still get through
+        try:
+            dedup.add_file(photo_file_names[-1])
+        except Exception as e:
+            print(f"Dedup index not updated ({e!r})")
+
+def on_sustained_motion(movement_timer):
+    # Runs on the detector's timer thread: just queue the work
+    if not fusion.on_pir():
+        print("PIR motion without camera motion, ignored")
+        return
+    print("Take Photo and Send it by Email")
+    triggers.labels(source="pir").inc()
+    event_log.append(TRIGGER, source="pir")
+    pipeline.submit((time.monotonic(), movement_timer, "pir"))
+
+def setup_camera():
+    # Heavy imports happen here, on the bring-up thread
+    global cv2, MappedArray, picam2, guard, ring, frame_counter, motion_detector, fusion, live, burst, night
+    import cv2
+    from picamera2 import Picamera2, MappedArray
+    from libcamera import Transform
+    from frame_ring import FrameRing
+    from live_capture import LiveCapture
+    from burst import BurstCapture
+    from night import NightStack
+    from mjpeg_server import serve
+    from overlay import Overlay, TextItem, timestamp_item, TOP_LEFT
+    from callback_budget import CallbackGuard
+    from motion import BlockMotionDetector, MotionFusion, roi_from_rects
+
+    picam2 = Picamera2()
+    # A single config: the main stream is at capture resolution and
+    # is what gets saved, so there is no still config to switch to
+    preview_config = picam2.create_preview_configuration({"size": resolution, "format": "RGB888"},
+                                                         lores={"size": lores_resolution, "format": "YUV420"},
+                                                         transform=Transform(hflip=True, vflip=True))
+
+    # Preallocate the frame ring: a YUV420 frame is height * 3/2 rows of width bytes
+    ring_depth = int(PRE_TRIGGER_SECONDS * CAMERA_FPS / RING_EVERY_N_FRAMES) + 1
+    ring = FrameRing(ring_depth, (lores_resolution[1] * 3 // 2, lores_resolution[0]))
+    frame_counter = 0
+    print(ring.describe())
+
+    # Camera motion detector and PIR/camera fusion. The camera callback
+    # only triggers photos once everything is set up (armed).
+    motion_detector = BlockMotionDetector(
+        (lores_resolution[1], lores_resolution[0]),
+        roi=roi_from_rects((lores_resolution[1] // 16, lores_resolution[0] // 16), MOTION_ROI))
+    fusion = MotionFusion(FUSION_POLICY, pir_active=lambda: detector.motion(),
+                          min_interval=MIN_DURATION_BETWEEN_PHOTOS)
+
+    # Set the current config as the preview config
+    picam2.configure(preview_config)
+
+    # Add the timestamp and zone name, and feed the frame ring
+    overlay = Overlay(resolution, [
+        timestamp_item(),
+        TextItem(lambda: ZONE_NAME, anchor=TOP_LEFT, refresh=None, scale=0.7),
+    ])
+    # Under budget pressure the zone name goes first, then the overlay
+    guard = CallbackGuard(picam2, budget=CALLBACK_BUDGET, registry=metrics)
+    guard.add_pre("overlay", overlay.apply, fallback=Overlay(resolution, [timestamp_item()]).apply)
+    guard.add_post("frame", record_frame, essential=True)
+    guard.install()
+    # Start the camera
+    picam2.start()
+
+    live = LiveCapture(picam2)
+    burst = BurstCapture(live, (resolution[1], resolution[0], 3), count=BURST_FRAMES, budget=BURST_BUDGET)
+    print(burst.describe())
+    if NIGHT_MODE:
+        night = NightStack(live, (resolution[1], resolution[0], 3), count=NIGHT_FRAMES, budget=NIGHT_BUDGET,
+                           align=NIGHT_ALIGN, gain_on=NIGHT_GAIN[0], gain_off=NIGHT_GAIN[1],
+                           exposure_on=NIGHT_EXPOSURE[0], exposure_off=NIGHT_EXPOSURE[1])
+        print(night.describe())
+
+    # Live view over HTTP, on its own event loop thread
+    import asyncio
+    threading.Thread(target=asyncio.run, args=(serve(picam2, LIVE_VIEW_HOST, LIVE_VIEW_PORT, LIVE_VIEW_FPS, 80),),
+                     name="live-view", daemon=True).start()
+
+    # Wait for the exposure and white balance to settle instead of a fixed 2 s
+    converged, waited, frames = wait_for_convergence(picam2, timeout=CONVERGENCE_TIMEOUT)
+    print(f"Camera setup ok: {'converged' if converged else 'NOT converged'} "
+          f"after {waited * 1000:.0f} ms ({frames} frames).")
+    return waited
+
+def setup_storage():
+    global event_log, store, dedup
+    from photo_store import PhotoStore
+    from event_log import EventLog
+    from dedup import DedupIndex
+    # Open the event log; earlier runs are kept
+    event_log = EventLog(EVENT_LOG_DIR)
+    print("Event log setup ok.")
+    # Open the photo store and its catalog
+    store = PhotoStore(PHOTO_DIR, quota_bytes=PHOTO_QUOTA_BYTES)
+    print(f"Photo store setup ok: {store.count()} photos, {store.used_bytes / 1024 ** 2:.0f} MB.")
+    # Recently emailed captures, to spot repeats of the same scene
+    dedup = DedupIndex(DEDUP_CAPACITY, threshold=DEDUP_THRESHOLD, window=DEDUP_WINDOW,
+                       method=DEDUP_METHOD) if DEDUP else None
+
+def setup_email():
+    global smtp_pool, build_alert, optimizer, outbox
+    from smtp_pool import SmtpPool, build_alert
+    from attachments import AttachmentOptimizer
+    from outbox import Outbox
+    # Setup the SMTP session pool and open the first session now
+    smtp_pool = SmtpPool(from_email, email_token, size=2)
+    try:
+        smtp_pool.release(smtp_pool.acquire())
+        print("Email sender setup OK.")
+    except Exception as e:
+        # Not fatal any more: the alerts wait in the outbox
+        print(f"Email server unreachable ({e!r}), alerts will wait in the outbox.")
+    # The outbox workers are started once the event log is open too
+    outbox = Outbox(OUTBOX_DB, smtp_pool, build_email, workers=2, on_result=on_email_result)
+    print(f"Outbox setup ok: {outbox.pending()} alerts waiting.")
+    # Attachments are shrunk to fit the uplink budget
+    optimizer = AttachmentOptimizer(uplink_bps=UPLINK_BPS, budget_seconds=ATTACHMENT_BUDGET_SECONDS)
+    print(f"Attachment budget: {optimizer.target_bytes / 1024:.0f} kB per email.")
+
+def setup_classifier():
+    # Not fatal either: without a classifier every alert is sent. The
+    # workers are not forked again once the other threads run.
+    global gate
+    try:
+        gate.warm_up()
+        print(f"Classifier setup ok: {CLASSIFY_BACKEND}, {'/'.join(sorted(CLASSIFY_CLASSES))}.")
+    except Exception as e:
+        gate.close()
+        gate = None
+        print(f"Classifier unavailable ({e!r}), every alert will be sent.")
+
+def setup_gpio():
+    global GPIO, detector
+    import RPi.GPIO as GPIO
+    from pir_events import PirEdgeDetector
+    # Setup GPIOs; the edge detector only starts once everything is up
+    GPIO.setmode(GPIO.BCM)
+    detector = PirEdgeDetector(GPIO, PIR_PIN, on_sustained_motion, led_pin=LED_PIN,
+                               threshold=MOV_DETECT_THRESHOLD,
+                               min_interval=MIN_DURATION_BETWEEN_PHOTOS, on_edge=on_pir_edge)
+    print("GPIOs setup ok.")
+
+armed = False
+night = None  # Set up with the camera
+
+# Bring up the camera, storage, email and GPIOs in parallel
+bring_up = BringUp()
+bring_up.add("camera", setup_camera)
+bring_up.add("storage", setup_storage)
+bring_up.add("email", setup_email)
+bring_up.add("gpio", setup_gpio)
+if gate is not None:
+    bring_up.add("classifier", setup_classifier)
+convergence_seconds = bring_up.run()["camera"]
+
+# Setup the capture -> dedup -> persist -> classify -> shrink -> notify pipeline
+pipeline = Pipeline(
+    Stage("capture", capture_stage, maxsize=2, policy=DROP_NEWEST),
+    Stage("dedup", dedup_stage, maxsize=16),
+    Stage("persist", persist_stage, maxsize=16),
+    Stage("classify", classify_stage, maxsize=8),
+    Stage("shrink", shrink_stage, maxsize=8),
+    Stage("notify", notify_stage, maxsize=8),
+)
+pipeline.start()
+outbox.start()
+print("Pipeline setup ok.")
+
+# Queue depths are read from the pipeline when scraped
+for stage in pipeline.stages:
+    queue_depth.labels(stage=stage.name).set_function(stage.depth)
+outbox_pending.set_function(outbox.pending)
+metrics_server = MetricsServer(metrics, port=METRICS_PORT).start()
+snapshot_writer = SnapshotWriter(metrics, METRICS_SNAPSHOT, interval=METRICS_SNAPSHOT_SECONDS).start()
+print(f"Metrics on http://127.0.0.1:{METRICS_PORT}/metrics and in {METRICS_SNAPSHOT}.")
+
+detector.start()
+armed = True
+
+armed_seconds = seconds_since_exec()
+print(f"Everything has been set up: armed {armed_seconds:.2f}s after start ({bring_up.describe()}).")
+event_log.append(ARMED, seconds=round(armed_seconds, 3), convergence_ms=round(convergence_seconds * 1000, 1),
+                 steps={name: [round(start, 3), round(end, 3)] for name, (start, end) in bring_up.timings.items()})
+
+try:
+    # Nothing to poll, the GPIO thread does the work; the loop only
+    # measures how late it wakes up
+    next_time = time.monotonic() + LOOP_INTERVAL
+    while True:
+        time.sleep(max(0.0, next_time - time.monotonic()))
+        now = time.monotonic()
+        loop_jitter.observe(now - next_time)
+        next_time = now + LOOP_INTERVAL
+
+except KeyboardInterrupt:
+    detector.stop()
+    print("Draining pending photos and emails...")
+    if not pipeline.close(timeout=30):
+        print("Some photos could not be processed before exiting.")
+    snapshot_writer.close()
+    metrics_server.close()
+    outbox.close(timeout=30)
+    print(pipeline.stats())
+    print(outbox.describe())
+    print(guard.describe())
+    print(optimizer.describe())
+    if dedup is not None:
+        print(dedup.describe())
+    if gate is not None:
+        print(gate.describe())
+        gate.close()
+    smtp_pool.close()
+    burst.close()
+    if night is not None:
+        print(night.describe())
+        night.close()
+    live.close()
+    event_log.close()
+    store.close()
+    GPIO.cleanup()
+    picam2.stop()
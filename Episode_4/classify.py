@@ -0,0 +1,283 @@
+# classify.py
+#
+# Description:
+# Optional gate between the capture and the email: every sustained
+# PIR trigger used to send an alert, cats and curtains included.
+# ClassificationGate looks at the captured photos with a small CPU
+# detector and only lets the alert through when one of the
+# configured classes (e.g. "person") is in at least one of them.
+# - Backends, both from OpenCV, so there is nothing else to install:
+#   "hog": the built-in HOG + linear SVM people detector (OpenCV
+#          4.x, as shipped with Raspberry Pi OS; no model file,
+#          "person" only)
+#   "dnn": an SSD-style detector loaded with cv2.dnn.readNet, e.g.
+#          MobileNet-SSD (MobileNetSSD_deploy.caffemodel + .prototxt,
+#          20 VOC classes); the model files are not bundled
+# - Inference runs in a process pool (workers forked at start-up
+#   that load the model once), so neither the GPIO/camera threads
+#   nor the GIL are held up while a photo is being looked at.
+# - Results are cached per photo, keyed by a hash of the file's
+#   bytes, so a photo is never classified twice.
+# - Every alert has a time budget: if the workers have not answered
+#   within `budget` seconds, or fail, the alert is sent anyway
+#   (fail open), because a late or missing verdict must never cost
+#   an alert. The result still lands in the cache when it arrives.
+# - The workers are only ever forked once, at start-up. If they
+#   cannot load the model, or the pool breaks later (a worker
+#   killed), the gate turns itself off for good (`failure` says
+#   why) and every alert is sent: forking again from the running,
+#   multi-threaded process is not safe.
+#
+# Usage:
+#   gate = ClassificationGate(classes={"person"}, backend="hog", budget=1.5).start()
+#   ... start the other threads ...
+#   gate.warm_up()
+#   decision = gate.check(["/home/pi/Camera/.../img_1.jpg"])
+#   if decision.send: ...
+#
+# j3 @ Oct, 2026
+
+import collections
+import concurrent.futures
+import hashlib
+import multiprocessing
+import threading
+import time
+import numpy as np
+
+HOG = "hog"
+DNN = "dnn"
+
+# Class ids of MobileNet-SSD (PASCAL VOC), 0 is the background
+VOC_CLASSES = ("background", "aeroplane", "bicycle", "bird", "boat", "bottle", "bus", "car", "cat",
+               "chair", "cow", "diningtable", "dog", "horse", "motorbike", "person", "pottedplant",
+               "sheep", "sofa", "train", "tvmonitor")
+
+PASSED = "passed"  # A configured class was found
+SUPPRESSED = "suppressed"  # Nothing of interest in the photos
+TIMEOUT = "timeout"  # Over budget: sent anyway
+ERROR = "error"  # The classifier failed: sent anyway
+DISABLED = "disabled"  # The classifier is off after a failure: sent anyway
+
+Decision = collections.namedtuple("Decision", ["send", "reason", "detections", "seconds"])
+
+_detector = None  # The model, one per worker process
+
+
+class HogPersonDetector:
+    def __init__(self, max_width=400, hit_threshold=0.3, win_stride=(8, 8), scale=1.05):
+        import cv2
+        if not hasattr(cv2, "HOGDescriptor"):
+            raise RuntimeError(f"OpenCV {cv2.__version__} has no HOGDescriptor (moved out of OpenCV 5), "
+                               "use the dnn backend")
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        self.max_width = max_width
+        self.hit_threshold = hit_threshold
+        self.win_stride = win_stride
+        self.scale = scale
+
+    def detect(self, image):
+        import cv2
+        factor = min(1.0, self.max_width / image.shape[1])
+        if factor < 1.0:
+            image = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        boxes, weights = self.hog.detectMultiScale(image, hitThreshold=self.hit_threshold,
+                                                   winStride=self.win_stride, scale=self.scale)
+        # Empty tuples when nothing is found
+        return [("person", round(float(w), 3), tuple(int(v / factor) for v in box))
+                for box, w in zip(boxes, np.asarray(weights).ravel())]
+
+
+class SsdDetector:
+    def __init__(self, model, config=None, class_names=VOC_CLASSES, input_size=(300, 300),
+                 scale=1 / 127.5, mean=127.5, confidence=0.5):
+        import cv2
+        self.net = cv2.dnn.readNet(model, config or "")
+        self.class_names = class_names
+        self.input_size = input_size
+        self.scale = scale
+        self.mean = mean
+        self.confidence = confidence
+
+    def detect(self, image):
+        import cv2
+        height, width = image.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(image, self.input_size), self.scale, self.input_size,
+                                     (self.mean, self.mean, self.mean))
+        self.net.setInput(blob)
+        # DetectionOutput: [1, 1, N, 7] of (image, class, confidence, x0, y0, x1, y1)
+        detections = []
+        for _, class_id, confidence, x0, y0, x1, y1 in self.net.forward().reshape(-1, 7):
+            if confidence < self.confidence or not 0 < class_id < len(self.class_names):
+                continue
+            box = (int(x0 * width), int(y0 * height), int((x1 - x0) * width), int((y1 - y0) * height))
+            detections.append((self.class_names[int(class_id)], round(float(confidence), 3), box))
+        return detections
+
+
+def _init_worker(backend, options):
+    # Runs once in every worker process
+    global _detector
+    import cv2
+    cv2.setNumThreads(1)  # One worker = one core
+    _detector = HogPersonDetector(**options) if backend == HOG else SsdDetector(**options)
+
+
+def _classify(file_name):
+    import cv2
+    start = time.perf_counter()
+    image = cv2.imread(file_name)
+    if image is None:
+        raise IOError(f"Could not read {file_name}")
+    detections = _detector.detect(image)
+    return detections, time.perf_counter() - start
+
+
+def _ready():
+    return _detector is not None
+
+
+def frame_hash(file_name):
+    with open(file_name, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class ClassificationGate:
+    def __init__(self, classes=("person",), backend=HOG, workers=1, budget=1.5, cache_size=256, **options):
+        # options go to HogPersonDetector or SsdDetector (e.g. model=, config=)
+        self.classes = set(classes)
+        if backend == HOG and self.classes - {"person"}:
+            raise ValueError("The HOG detector only finds people")
+        self.backend = backend
+        self.options = options
+        self.workers = workers
+        self.budget = budget
+        self.cache_size = cache_size
+        self.counts = collections.Counter()  # Decisions by reason
+        self.inference_seconds = []
+        self._cache = collections.OrderedDict()  # hash -> detections
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = {}  # hash -> Future, so a photo is only submitted once
+        self._starting = []
+        self._forked = False
+        self.failure = None  # Why the gate was turned off, if it was
+
+    def start(self):
+        # Fork the workers and start loading the model. Call it before
+        # any other thread is started: the cam scripts have no
+        # __main__ guard, so spawn/forkserver workers would run the
+        # whole script again, and fork is only safe while the process
+        # has a single thread.
+        pool = self._get_pool()
+        self._starting = [pool.submit(_ready) for _ in range(self.workers)]
+        return self
+
+    def warm_up(self, timeout=60):
+        # Wait for the workers to have the model loaded; on failure the
+        # gate is turned off and the error raised
+        try:
+            if not self._forked:
+                self.start()
+            for future in self._starting:
+                future.result(timeout)
+        except Exception as e:
+            self._disable(repr(e))
+            raise
+
+    def _get_pool(self):
+        with self._lock:
+            if self.failure is not None:
+                raise RuntimeError(f"Classifier disabled: {self.failure}")
+            if self._pool is None:
+                if self._forked:
+                    raise RuntimeError("Classifier closed")
+                # All the workers are forked on the first submit
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("fork"),
+                    initializer=_init_worker, initargs=(self.backend, self.options))
+                self._forked = True
+            return self._pool
+
+    def _disable(self, failure):
+        # For good: the workers are never forked again
+        with self._lock:
+            if self.failure is not None:
+                return
+            self.failure = failure
+            pool, self._pool = self._pool, None
+        print(f"[classify] disabled ({failure}), every alert will be sent")
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _remember(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            detections, seconds = future.result()
+            self.inference_seconds.append(seconds)
+            del self.inference_seconds[:-1000]
+            self._cache[key] = detections
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _submit(self, file_name):
+        # Cached detections, or a Future of (detections, seconds)
+        key = frame_hash(file_name)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._pending.get(key)
+        if future is None:
+            future = self._get_pool().submit(_classify, file_name)
+            with self._lock:
+                self._pending[key] = future
+            future.add_done_callback(lambda f: self._remember(key, f))
+        return future
+
+    def check(self, file_names):
+        # Decision for one alert, within self.budget seconds
+        start = time.monotonic()
+        file_names = [file_names] if isinstance(file_names, str) else list(file_names)
+        reason = None
+        detections = []
+        if self.failure is not None:
+            self.counts[DISABLED] += 1
+            return Decision(True, DISABLED, detections, 0.0)
+        try:
+            results = [self._submit(f) for f in file_names]
+            for result in results:
+                if isinstance(result, concurrent.futures.Future):
+                    result = result.result(max(0.0, self.budget - (time.monotonic() - start)))[0]
+                detections += result
+                if any(label in self.classes for label, _, _ in result):
+                    reason = PASSED
+                    break  # One photo with a match is enough
+            else:
+                reason = SUPPRESSED
+        except concurrent.futures.TimeoutError:
+            reason = TIMEOUT
+        except Exception as e:
+            print(f"[classify] failed: {e!r}")
+            reason = ERROR
+            if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                self._disable(repr(e))
+        self.counts[reason] += 1
+        return Decision(reason != SUPPRESSED, reason, detections, time.monotonic() - start)
+
+    def describe(self):
+        seconds = sorted(self.inference_seconds)
+        latency = (f", inference p50 {seconds[len(seconds) // 2] * 1000:.0f} ms "
+                   f"max {seconds[-1] * 1000:.0f} ms" if seconds else "")
+        failure = f", disabled: {self.failure}" if self.failure is not None else ""
+        return (f"Classifier ({self.backend}, {'/'.join(sorted(self.classes))}): "
+                + ", ".join(f"{n} {reason}" for reason, n in sorted(self.counts.items())) + latency + failure)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,180 @@
+# dedup.py
+#
+# Description:
+# Perceptual-hash deduplication of the captures. When someone
+# lingers in front of the camera, a new, near identical photo is
+# taken after every MIN_DURATION_BETWEEN_PHOTOS, and each one is
+# stored, logged and emailed. DedupIndex remembers the hashes of
+# the recent captures and tells when a new one is the same scene as
+# one of them.
+# - dhash: (size+1) x size area-downscaled grey image, one bit per
+#   horizontal gradient sign; phash: sign of the size x size low
+#   frequencies of the 4size x 4size DCT against their median (DC
+#   left out). size * size bits either way. Both are a handful of
+#   NumPy/OpenCV calls on a tiny image; the JPEG is decoded at 1/4
+#   scale, so hashing a photo costs a few milliseconds.
+# - The classic 8x8 (64 bit) hashes are made for whole-picture
+#   near-duplicates: a person is a few cells of the grid and barely
+#   moves the distance (see bench_dedup.py). 16x16 hashes tell
+#   "someone moved/arrived/left" much better.
+# - The default is a 16x16 phash within 4 bits. In bench_dedup.py it
+#   merges 0.3% of the different pairs (figure gone 1%, moved 0%,
+#   added 0%): a wrong merge drops an alert, and an arrival must
+#   never be merged. The price is that it merges only 7% of the
+#   same-scene pairs (noise, light). A 16x16 dhash within 6 bits
+#   merges 37% of those, but also 5% of the "figure added" pairs.
+# - The index is a fixed-size array of hashes (capacity entries,
+#   oldest evicted first), compared with the new hash in one
+#   vectorized XOR + popcount.
+# - A capture within `threshold` bits of an entry younger than
+#   `window` seconds is a duplicate: the caller skips it and the
+#   entry counts the repeat (coalescing). The window runs from when
+#   the entry was added, not from its last repeat, so a long stay
+#   is reported again every `window` seconds.
+# - find() and add() are separate so that the caller only adds the
+#   captures it actually sent: a repeat of a photo that was never
+#   emailed (no alert, or one suppressed) must not be dropped.
+#   check() does both, for a plain "seen it before?".
+# - find() and add() are called from different threads (the dedup
+#   and the notify stages of cam32.py), so they take a lock.
+#
+# Usage:
+#   index = DedupIndex(threshold=4, window=300)
+#   match = index.find_file(file_name)
+#   if match: print(f"same as {match.key} ({match.distance} bits, {match.repeats} repeats)")
+#   ...
+#   index.add_file(file_name)  # Once its alert is on its way
+#
+# j3 @ Oct, 2026
+
+import collections
+import time
+import threading
+import cv2
+import numpy as np
+
+DHASH = "dhash"
+PHASH = "phash"
+
+Match = collections.namedtuple("Match", ["key", "distance", "repeats", "age"])
+
+_BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(grey, size=16):
+    # Hashes are size * size bits, packed in a uint8 array
+    small = cv2.resize(grey, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def phash(grey, size=16, factor=4):
+    small = cv2.resize(grey, (size * factor, size * factor), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:size, :size].ravel()
+    return np.packbits(low > np.median(low[1:]))
+
+
+HASHES = {DHASH: dhash, PHASH: phash}
+
+
+def hamming(a, b):
+    # Differing bits; b may be a (n, bytes) array of hashes
+    return _BYTE_BITS[np.bitwise_xor(a, b)].sum(axis=-1, dtype=np.int64)
+
+
+def read_grey(file_name, reduced=cv2.IMREAD_REDUCED_GRAYSCALE_4):
+    # The JPEG decoder scales down while decoding, much cheaper than a full decode
+    grey = cv2.imread(file_name, reduced)
+    if grey is None:
+        raise IOError(f"Could not read {file_name}")
+    return grey
+
+
+class DedupIndex:
+    def __init__(self, capacity=64, threshold=4, window=300.0, method=PHASH, size=16, clock=time.time):
+        if size % 8:
+            raise ValueError("The hash size must be a multiple of 8")
+        self.capacity = capacity
+        self.threshold = threshold
+        self.window = window
+        self.method = method
+        self.size = size
+        self.hash = HASHES[method]
+        self.clock = clock
+        self.hashes = np.zeros((capacity, size * size // 8), dtype=np.uint8)
+        self.added = np.full(capacity, -np.inf)  # -inf marks an empty slot
+        self.keys = [None] * capacity
+        self.repeats = np.zeros(capacity, dtype=np.int64)
+        self.checked = 0
+        self.duplicates = 0
+        self.hashed = 0
+        self.hash_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def find(self, value, now=None):
+        # Match for a hash among the entries younger than `window`, or None
+        now = self.clock() if now is None else now
+        with self._lock:
+            return self._find(value, now)
+
+    def _find(self, value, now):
+        self.checked += 1
+        live = self.added > now - self.window
+        if live.any():
+            distances = np.where(live, hamming(value, self.hashes), self.size * self.size + 1)
+            best = int(np.argmin(distances))
+            if distances[best] <= self.threshold:
+                self.duplicates += 1
+                self.repeats[best] += 1
+                return Match(self.keys[best], int(distances[best]), int(self.repeats[best]),
+                             now - self.added[best])
+        return None
+
+    def add(self, value, key, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._add(value, key, now)
+
+    def _add(self, value, key, now):
+        slot = int(np.argmin(self.added))  # Oldest, or empty
+        self.hashes[slot] = value
+        self.added[slot] = now
+        self.keys[slot] = key
+        self.repeats[slot] = 0
+
+    def check(self, value, key, now=None):
+        # find(), and add() when there is no match, as one step
+        now = self.clock() if now is None else now
+        with self._lock:
+            match = self._find(value, now)
+            if match is None:
+                self._add(value, key, now)
+        return match
+
+    def hash_image(self, grey):
+        start = time.perf_counter()
+        value = self.hash(grey, self.size)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.hash_seconds += elapsed
+            self.hashed += 1
+        return value
+
+    def hash_file(self, file_name):
+        return self.hash_image(read_grey(file_name))
+
+    def find_file(self, file_name, now=None):
+        return self.find(self.hash_file(file_name), now)
+
+    def add_file(self, file_name, now=None):
+        self.add(self.hash_file(file_name), file_name, now)
+
+    def check_image(self, grey, key, now=None):
+        return self.check(self.hash_image(grey), key, now)
+
+    def check_file(self, file_name, now=None):
+        return self.check(self.hash_file(file_name), file_name, now)
+
+    def describe(self):
+        mean = self.hash_seconds / self.hashed * 1000 if self.hashed else 0.0
+        return (f"Dedup ({self.method} {self.size}x{self.size}, <= {self.threshold} bits, {self.window:.0f} s): "
+                f"{self.checked} checked, {self.duplicates} duplicates, {mean:.1f} ms per hash")
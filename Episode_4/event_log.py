@@ -0,0 +1,249 @@
+# event_log.py
+#
+# Description:
+# Structured, append-only event log that replaces photo_logs.txt.
+# cam12.py/cam13.py reopen the text file for every photo and
+# delete it at startup; EventLog instead:
+# - writes typed records (trigger, capture, email_sent,
+#   email_failed, ...) as JSON lines through one open, buffered
+#   file, with flush + fsync batched every `fsync_interval` seconds
+# - rotates to a new segment file when the current one is larger
+#   than `max_segment_bytes`
+# - keeps a sparse index next to every segment (timestamp and byte
+#   offset of every `index_every`-th record), so "events between
+#   T1 and T2" seeks straight to the right place instead of
+#   reading months of data
+# - picks up where it left off after a restart (a line cut short
+#   by a crash is dropped)
+#
+# Usage:
+#   log = EventLog("/home/pi/Camera/log/events")
+#   log.append("capture", file=file_name, latency_ms=12.5)
+#   for event in log.query(t1, t2, types={"capture"}): ...
+# or from the shell:
+#   python3 event_log.py /home/pi/Camera/log/events --since "2026-10-01 00:00"
+#
+# j3 @ Oct, 2026
+
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_SUFFIX = ".idx"
+
+TRIGGER = "trigger"
+CAPTURE = "capture"
+DUPLICATE = "duplicate"
+CLASSIFIED = "classified"
+EMAIL_SENT = "email_sent"
+EMAIL_FAILED = "email_failed"
+ARMED = "armed"
+
+
+class EventLog:
+    def __init__(self, directory, max_segment_bytes=4 * 1024 * 1024, index_every=64,
+                 fsync_interval=1.0, clock=time.time):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.index_every = index_every
+        self.fsync_interval = fsync_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+        # Segment number -> timestamp of its first record
+        self.segments = {}
+        for name in os.listdir(directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                number = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                index = self._read_index(number)
+                self.segments[number] = index[0][0] if index else None
+        self._open_segment(max(self.segments) if self.segments else 1)
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="event-log", daemon=True)
+        self._flusher.start()
+
+    # ---- Files ----
+
+    def _path(self, number, suffix=SEGMENT_SUFFIX):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{suffix}")
+
+    def _read_index(self, number):
+        # [(timestamp, offset), ...] of a segment, oldest first
+        index = []
+        try:
+            with open(self._path(number, INDEX_SUFFIX), encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2:
+                        index.append((float(parts[0]), int(parts[1])))
+        except FileNotFoundError:
+            pass
+        return index
+
+    def _open_segment(self, number):
+        path = self._path(number)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Drop index entries for data that never reached the disk
+        index = [(t, offset) for t, offset in self._read_index(number) if offset < size]
+        start = index[-1][1] if index else 0
+        count = 0
+        last_t = index[-1][0] if index else None
+        good = start
+        with open(path, "ab+") as f:
+            # Re-read the records after the last index entry
+            f.seek(start)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Cut short by a crash
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if count % self.index_every == 0 and not (index and index[-1][1] == good):
+                    index.append((record["t"], good))
+                count += 1
+                last_t = record["t"]
+                good += len(line)
+            f.truncate(good)
+        if index and index[-1][1] >= good:
+            # The last indexed record itself was damaged
+            index = [(t, offset) for t, offset in index if offset < good]
+            count = 0
+        with open(self._path(number, INDEX_SUFFIX), "w", encoding="utf-8") as f:
+            for t, offset in index:
+                f.write(f"{t!r} {offset}\n")
+
+        self.number = number
+        self.size = good
+        self.count = count  # Records since the last index entry
+        self.last_t = last_t
+        self.segments[number] = index[0][0] if index else None
+        self._file = open(path, "ab", buffering=64 * 1024)
+        self._index_file = open(self._path(number, INDEX_SUFFIX), "a", encoding="utf-8")
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._index_file.close()
+        self._open_segment(self.number + 1)
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        # Index after the data it points to
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._dirty = False
+
+    def _flush_loop(self):
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._dirty and not self._closed:
+                    self._sync()
+
+    # ---- Writing ----
+
+    def append(self, event_type, timestamp=None, **fields):
+        record = {"t": self.clock() if timestamp is None else timestamp, "type": event_type}
+        record.update(fields)
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise ValueError("Event log is closed")
+            if self.size and self.size + len(line) > self.max_segment_bytes:
+                self._rotate()
+            if self.count % self.index_every == 0:
+                self._index_file.write(f"{record['t']!r} {self.size}\n")
+                if self.segments.get(self.number) is None:
+                    self.segments[self.number] = record["t"]
+            self._file.write(line)
+            self.size += len(line)
+            self.count += 1
+            self.last_t = record["t"]
+            self._dirty = True
+        return record
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._sync()
+            self._closed = True
+            self._file.close()
+            self._index_file.close()
+
+    # ---- Reading ----
+
+    def query(self, start=None, end=None, types=None):
+        # Records with start <= t <= end (either may be None), oldest
+        # first. Records are assumed to be appended in time order.
+        with self._lock:
+            if not self._closed:
+                self._file.flush()
+                self._index_file.flush()
+            numbers = sorted(self.segments)
+            firsts = [self.segments[n] for n in numbers]
+        for i, number in enumerate(numbers):
+            if end is not None and firsts[i] is not None and firsts[i] > end:
+                break
+            # Skip the segment if the next one already starts before `start`
+            next_first = firsts[i + 1] if i + 1 < len(numbers) else None
+            if start is not None and next_first is not None and next_first < start:
+                continue
+            offset = 0
+            if start is not None:
+                index = self._read_index(number)
+                stamps = [t for t, _ in index]
+                # Last index entry before `start`: records at exactly
+                # `start` can come before an entry stamped `start`
+                position = max(bisect.bisect_left(stamps, start) - 1, 0)
+                if index:
+                    offset = index[position][1]
+            with open(self._path(number), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    record = json.loads(line)
+                    if start is not None and record["t"] < start:
+                        continue
+                    if end is not None and record["t"] > end:
+                        return
+                    if types is None or record["type"] in types:
+                        yield record
+
+
+def _parse_time(text):
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the detector event log")
+    parser.add_argument("directory", nargs="?", default="/home/pi/Camera/log/events")
+    parser.add_argument("--since", help='e.g. "2026-10-01 00:00"')
+    parser.add_argument("--until", help='e.g. "2026-10-02 00:00"')
+    parser.add_argument("--type", action="append", help="only this event type (repeatable)")
+    args = parser.parse_args()
+
+    log = EventLog(args.directory)
+    try:
+        for event in log.query(_parse_time(args.since) if args.since else None,
+                               _parse_time(args.until) if args.until else None,
+                               set(args.type) if args.type else None):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.pop("t")))
+            print(stamp, event.pop("type"), json.dumps(event))
+    finally:
+        log.close()
@@ -0,0 +1,196 @@
+# fake_gpio.py
+#
+# Description:
+# A drop-in stand-in for the small part of RPi.GPIO used by
+# this series (setmode, setup, input, output, add_event_detect,
+# remove_event_detect, cleanup). It lets the detector scripts
+# run, be tested and be benchmarked on a plain Linux box.
+# Input levels are changed with set_input(), which fires the
+# registered edge callbacks just like the real library does
+# from its own event thread.
+# Recorded PIR traces (CSV lines of "seconds,level") can be
+# replayed on a pin with replay_trace(), or queued with
+# schedule_trace() to start as soon as the pin is set up.
+#
+# Usage:
+#   import fake_gpio as GPIO
+#   GPIO.setmode(GPIO.BCM)
+#   GPIO.setup(4, GPIO.IN)
+#   GPIO.set_input(4, GPIO.HIGH)
+#
+# j3 @ Oct, 2026
+
+import csv
+import threading
+import time
+
+BCM = 11
+BOARD = 10
+IN = 1
+OUT = 0
+LOW = 0
+HIGH = 1
+RISING = 31
+FALLING = 32
+BOTH = 33
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+
+_lock = threading.RLock()
+_mode = None
+_directions = {}
+_levels = {}
+_detectors = {}  # pin -> [edge, [callbacks]]
+_output_writes = 0  # Number of output() calls, handy for benchmarks
+_scheduled = {}  # pin -> (trace, speed) to replay once the pin is set up
+
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+
+def getmode():
+    return _mode
+
+
+def setwarnings(flag):
+    pass
+
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=LOW):
+    if _mode is None:
+        raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+    with _lock:
+        _directions[channel] = direction
+        if direction == OUT:
+            _levels[channel] = initial
+        else:
+            _levels.setdefault(channel, HIGH if pull_up_down == PUD_UP else LOW)
+        scheduled = _scheduled.pop(channel, None) if direction == IN else None
+    if scheduled is not None:
+        replay_trace(channel, *scheduled)
+
+
+def input(channel):
+    with _lock:
+        if channel not in _directions:
+            raise RuntimeError("You must setup() the GPIO channel first")
+        return _levels[channel]
+
+
+def output(channel, value):
+    global _output_writes
+    with _lock:
+        if _directions.get(channel) != OUT:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        _levels[channel] = HIGH if value else LOW
+        _output_writes += 1
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    with _lock:
+        if _directions.get(channel) != IN:
+            raise RuntimeError("You must setup() the GPIO channel as an input first")
+        if channel in _detectors:
+            raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+        _detectors[channel] = [edge, []]
+        if callback is not None:
+            _detectors[channel][1].append(callback)
+
+
+def add_event_callback(channel, callback):
+    with _lock:
+        if channel not in _detectors:
+            raise RuntimeError("Add event detection using add_event_detect first before adding a callback")
+        _detectors[channel][1].append(callback)
+
+
+def remove_event_detect(channel):
+    with _lock:
+        _detectors.pop(channel, None)
+
+
+def cleanup(channel=None):
+    global _mode
+    with _lock:
+        channels = [channel] if channel is not None else list(_directions)
+        for c in channels:
+            _directions.pop(c, None)
+            _levels.pop(c, None)
+            _detectors.pop(c, None)
+        if channel is None:
+            _mode = None
+
+
+# ---- Test helpers (not part of RPi.GPIO) ----
+
+def set_input(channel, value):
+    # Drive an input pin and run the edge callbacks, if any match.
+    with _lock:
+        old = _levels.get(channel, LOW)
+        new = HIGH if value else LOW
+        _levels[channel] = new
+        detector = _detectors.get(channel)
+        if old == new or detector is None:
+            return
+        edge, callbacks = detector
+        callbacks = list(callbacks)
+    if edge == BOTH or (edge == RISING and new == HIGH) or (edge == FALLING and new == LOW):
+        for callback in callbacks:
+            callback(channel)
+
+
+def get_output(channel):
+    with _lock:
+        return _levels.get(channel, LOW)
+
+
+def output_writes():
+    return _output_writes
+
+
+def load_trace(file_name):
+    # CSV of "seconds,level" rows (seconds from the start of the trace)
+    trace = []
+    with open(file_name, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            try:
+                trace.append((float(row[0]), HIGH if int(row[1]) else LOW))
+            except (IndexError, ValueError):
+                continue  # Header or comment line
+    return trace
+
+
+def save_trace(file_name, trace):
+    with open(file_name, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["seconds", "level"])
+        for offset, level in trace:
+            writer.writerow([f"{offset:.6f}", level])
+
+
+def replay_trace(channel, trace, speed=1.0, on_edge=None):
+    # Drive `channel` from a background thread following `trace`.
+    # speed=10 replays ten times faster. on_edge(level, t) is called
+    # right before each change, with the time.monotonic() it happened.
+    def run():
+        start = time.monotonic()
+        for offset, level in trace:
+            delay = start + offset / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if on_edge is not None:
+                on_edge(level, time.monotonic())
+            set_input(channel, level)
+
+    thread = threading.Thread(target=run, name=f"trace-{channel}", daemon=True)
+    thread.start()
+    return thread
+
+
+def schedule_trace(channel, trace, speed=1.0):
+    # Replay `trace` as soon as `channel` is set up as an input
+    with _lock:
+        _scheduled[channel] = (trace, speed)
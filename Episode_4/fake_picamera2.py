@@ -0,0 +1,453 @@
+# fake_picamera2.py
+#
+# Description:
+# A hardware-free stand-in for the parts of Picamera2 and
+# libcamera used by this series, so the scripts can be run,
+# measured and regression-tested on a plain Linux box.
+#
+# Picamera2 runs a camera thread that produces frames at the
+# configured frame rate from a synthetic generator or a video
+# file (looped). Every frame goes through pre_callback and
+# post_callback exactly like on the Pi, and can be captured with
+# capture_file, capture_array, capture_request or
+# switch_mode_and_capture_file. The time the real camera takes to
+# start, stop and reconfigure, and the frames the exposure needs
+# to settle, are modelled with the TIMINGS below.
+# The metadata has SensorTimestamp, ExposureTime, AnalogueGain,
+# FrameDuration, Lux and AeLocked (False until the exposure has
+# settled after start).
+#
+# The fakes/ directory has picamera2, libcamera and RPi.GPIO
+# modules that forward here and to fake_gpio.py, so any script in
+# this folder runs unchanged with:
+#   PYTHONPATH=fakes python3 cam20.py
+# Set FAKE_CAMERA_SOURCE to a video file to replay it.
+#
+# j3 @ Oct, 2026
+
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+# Modelled costs of the real camera (seconds / frames)
+TIMINGS = {
+    "start": 0.12,  # picam2.start()
+    "stop": 0.03,  # picam2.stop()
+    "configure": 0.08,  # picam2.configure()
+    "ae_settle_frames": 12,  # Frames before AeLocked after start
+}
+
+DEFAULT_FPS = 30.0
+SENSOR_SIZE = (2592, 1944)
+
+
+class Transform:
+    def __init__(self, hflip=False, vflip=False, rotation=0, transpose=False):
+        if rotation == 180:
+            hflip, vflip = not hflip, not vflip
+        elif rotation:
+            raise ValueError("Only 0 and 180 degree rotations are supported")
+        self.hflip = bool(hflip)
+        self.vflip = bool(vflip)
+        self.transpose = transpose
+
+    def __repr__(self):
+        return f"<libcamera.Transform hflip={int(self.hflip)} vflip={int(self.vflip)}>"
+
+
+class Preview:
+    NULL = "null"
+    DRM = "drm"
+    QT = "qt"
+    QTGL = "qtgl"
+
+
+class _Section:
+    # Attribute-style view of a configuration, e.g. config.main.size
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def to_dict(self):
+        return {k: v.to_dict() if isinstance(v, _Section) else v
+                for k, v in self.__dict__.items() if v is not None}
+
+
+class CameraConfiguration(_Section):
+    def __init__(self, main, lores=None, transform=None, controls=None,
+                 buffer_count=4, use_case="preview"):
+        super().__init__(
+            use_case=use_case,
+            main=_Section(size=tuple(main.get("size", (640, 480))),
+                          format=main.get("format", "XBGR8888")),
+            lores=None if lores is None else _Section(size=tuple(lores["size"]),
+                                                      format=lores.get("format", "YUV420")),
+            sensor=_Section(output_size=None),
+            transform=transform or Transform(),
+            controls=dict(controls or {}),
+            buffer_count=buffer_count,
+        )
+
+    @property
+    def size(self):
+        return self.main.size
+
+    @size.setter
+    def size(self, value):
+        self.main.size = tuple(value)
+
+    def streams(self):
+        yield "main", self.main
+        if self.lores is not None:
+            yield "lores", self.lores
+
+
+def _frame_shape(size, fmt):
+    width, height = size
+    if fmt in ("RGB888", "BGR888"):
+        return (height, width, 3)
+    if fmt in ("XBGR8888", "XRGB8888"):
+        return (height, width, 4)
+    if fmt in ("YUV420", "YVU420"):
+        return (height * 3 // 2, width)
+    raise ValueError(f"Unsupported format {fmt}")
+
+
+def _convert(bgr, size, fmt):
+    # BGR source frame -> stream buffer in the Picamera2 memory layout
+    if (bgr.shape[1], bgr.shape[0]) != tuple(size):
+        bgr = cv2.resize(bgr, tuple(size), interpolation=cv2.INTER_AREA)
+    if fmt == "RGB888":  # Stored B, G, R
+        return bgr.copy()
+    if fmt == "BGR888":
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+    if fmt == "XBGR8888":  # Stored R, G, B, 255
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGBA)
+    if fmt == "XRGB8888":  # Stored B, G, R, 255
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+    if fmt == "YUV420":
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420)
+    if fmt == "YVU420":
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_YV12)
+    raise ValueError(f"Unsupported format {fmt}")
+
+
+def _to_bgr(array, fmt):
+    if fmt == "RGB888":
+        return array
+    if fmt == "BGR888":
+        return cv2.cvtColor(array, cv2.COLOR_RGB2BGR)
+    if fmt == "XBGR8888":
+        return cv2.cvtColor(array, cv2.COLOR_RGBA2BGR)
+    if fmt == "XRGB8888":
+        return cv2.cvtColor(array, cv2.COLOR_BGRA2BGR)
+    if fmt == "YUV420":
+        return cv2.cvtColor(array, cv2.COLOR_YUV2BGR_I420)
+    if fmt == "YVU420":
+        return cv2.cvtColor(array, cv2.COLOR_YUV2BGR_YV12)
+    raise ValueError(f"Unsupported format {fmt}")
+
+
+class SyntheticSource:
+    # A noisy scene with a bright square walking across it now and then
+    def __init__(self, size=(640, 480), seed=1, walk_every=10.0, walk_time=3.0):
+        width, height = size
+        rng = np.random.default_rng(seed)
+        base = rng.integers(30, 200, (height, width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(base, (0, 0), 6)
+        self.noise = rng.integers(-3, 4, (8, height, width, 3), dtype=np.int16)
+        self.walk_every = walk_every
+        self.walk_time = walk_time
+        self.size = size
+
+    def frame(self, index, timestamp):
+        width, height = self.size
+        frame = np.clip(self.background + self.noise[index % len(self.noise)], 0, 255).astype(np.uint8)
+        phase = timestamp % self.walk_every
+        if phase < self.walk_time:
+            x = int(phase / self.walk_time * (width - width // 6))
+            y = height // 3
+            frame[y:y + height // 3, x:x + width // 6] = (200, 220, 240)
+        return frame
+
+
+class VideoSource:
+    # Frames from a video file, looped
+    def __init__(self, file_name):
+        self.cap = cv2.VideoCapture(file_name)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open {file_name}")
+
+    def frame(self, index, timestamp):
+        ok, frame = self.cap.read()
+        if not ok:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        return frame
+
+
+class CompletedRequest:
+    def __init__(self, camera, buffers, metadata):
+        self.camera = camera
+        self.buffers = buffers  # stream name -> array
+        self.metadata = metadata
+        self.config = camera.camera_config
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+
+    def make_array(self, name="main"):
+        return self.buffers[name].copy()
+
+    def make_buffer(self, name="main"):
+        return self.buffers[name].tobytes()
+
+    def get_metadata(self):
+        return dict(self.metadata)
+
+    def save(self, name, file_output, format=None):
+        stream = getattr(self.config, name)
+        bgr = _to_bgr(self.buffers[name], stream.format)
+        if not cv2.imwrite(file_output, bgr):
+            raise IOError(f"Could not write {file_output}")
+
+
+class MappedArray:
+    def __init__(self, request, stream, write=True):
+        self.request = request
+        self.stream = stream
+
+    def __enter__(self):
+        self.array = self.request.buffers[self.stream]
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class Picamera2:
+    def __init__(self, camera_num=0, source=None, fps=DEFAULT_FPS, timings=None):
+        self.camera_num = camera_num
+        self.fps = fps
+        self.timings = dict(TIMINGS, **(timings or {}))
+        env_source = os.getenv("FAKE_CAMERA_SOURCE")
+        self.source = source or (VideoSource(env_source) if env_source else None)
+        self.pre_callback = None
+        self.post_callback = None
+        self.camera_config = None
+        self.started = False
+        self.frames = 0
+        self.callback_seconds = []  # Time spent in pre/post callbacks per frame
+        self.preview_configuration = self.create_preview_configuration()
+        self.still_configuration = self.create_still_configuration()
+        self.video_configuration = self.create_video_configuration()
+        self._cond = threading.Condition()
+        self._latest = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._settled_at = 0
+        self._ae_target = 10000
+
+    # ---- Configurations ----
+
+    def create_preview_configuration(self, main={}, lores=None, raw=None, transform=None,
+                                     colour_space=None, buffer_count=4, controls={}, **kwargs):
+        main = dict({"size": (640, 480), "format": "XBGR8888"}, **(main or {}))
+        return CameraConfiguration(main, lores, transform, controls, buffer_count, "preview")
+
+    def create_still_configuration(self, main={}, lores=None, raw=None, transform=None,
+                                   colour_space=None, buffer_count=1, controls={}, **kwargs):
+        main = dict({"size": SENSOR_SIZE, "format": "BGR888"}, **(main or {}))
+        return CameraConfiguration(main, lores, transform, controls, buffer_count, "still")
+
+    def create_video_configuration(self, main={}, lores=None, raw=None, transform=None,
+                                   colour_space=None, buffer_count=6, controls={}, **kwargs):
+        main = dict({"size": (1280, 720), "format": "XBGR8888"}, **(main or {}))
+        return CameraConfiguration(main, lores, transform, controls, buffer_count, "video")
+
+    def configure(self, camera_config="preview"):
+        if self.started:
+            raise RuntimeError("Camera must be stopped before configuring")
+        if isinstance(camera_config, str):
+            camera_config = getattr(self, f"{camera_config}_configuration")
+        elif isinstance(camera_config, dict):
+            camera_config = CameraConfiguration(camera_config["main"], camera_config.get("lores"),
+                                                camera_config.get("transform"))
+        time.sleep(self.timings["configure"])
+        self.camera_config = camera_config
+
+    def set_controls(self, controls):
+        if self.camera_config is not None:
+            self.camera_config.controls.update(controls)
+
+    # ---- Start / stop ----
+
+    def start(self, config=None, show_preview=False):
+        if config is not None:
+            self.configure(config)
+        if self.camera_config is None:
+            self.configure("preview")
+        if self.started:
+            return
+        time.sleep(self.timings["start"])
+        self._stop.clear()
+        self._settled_at = self.frames + self.timings["ae_settle_frames"]
+        self._thread = threading.Thread(target=self._run, name="fake-camera", daemon=True)
+        self.started = True
+        self._thread.start()
+
+    def start_preview(self, preview=None, **kwargs):
+        pass
+
+    def stop_preview(self):
+        pass
+
+    def stop(self):
+        if not self.started:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.started = False
+        time.sleep(self.timings["stop"])
+
+    def close(self):
+        self.stop()
+
+    # ---- Camera thread ----
+
+    def _metadata(self, timestamp_ns):
+        # Exposure ramps towards its target until it settles
+        remaining = max(0, self._settled_at - self.frames)
+        settle = self.timings["ae_settle_frames"] or 1
+        exposure = int(self._ae_target * (1 + remaining / settle))
+        return {
+            "SensorTimestamp": timestamp_ns,
+            "FrameDuration": int(1e6 / self.fps),
+            "ExposureTime": exposure,
+            "AnalogueGain": 1.0 + remaining / settle,
+            "DigitalGain": 1.0,
+            "Lux": 400.0,
+            "AeLocked": remaining == 0,
+            "ColourGains": (1.8, 1.6),
+        }
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        next_frame = time.monotonic()
+        config = self.camera_config
+        if self.source is None:
+            self.source = SyntheticSource(config.main.size)
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now < next_frame:
+                self._stop.wait(next_frame - now)
+                continue
+            next_frame += interval
+            if next_frame < now:
+                next_frame = now + interval  # Running late: drop frames like the real pipeline
+
+            bgr = self.source.frame(self.frames, now)
+            if config.transform.hflip and config.transform.vflip:
+                bgr = cv2.flip(bgr, -1)
+            elif config.transform.hflip:
+                bgr = cv2.flip(bgr, 1)
+            elif config.transform.vflip:
+                bgr = cv2.flip(bgr, 0)
+            buffers = {name: _convert(bgr, stream.size, stream.format)
+                       for name, stream in config.streams()}
+            request = CompletedRequest(self, buffers, self._metadata(time.monotonic_ns()))
+
+            t = time.perf_counter()
+            if self.pre_callback:
+                self.pre_callback(request)
+            if self.post_callback:
+                self.post_callback(request)
+            self.callback_seconds.append(time.perf_counter() - t)
+            if len(self.callback_seconds) > 10000:
+                del self.callback_seconds[:5000]
+
+            with self._cond:
+                self.frames += 1
+                self._latest = request
+                self._cond.notify_all()
+
+    def _next_request(self, timeout=5.0):
+        if not self.started:
+            raise RuntimeError("Camera is not running")
+        with self._cond:
+            count = self.frames
+            if not self._cond.wait_for(lambda: self.frames > count, timeout):
+                raise TimeoutError("No frame from the camera")
+            request = self._latest
+        request.acquire()
+        return request
+
+    # ---- Captures ----
+
+    def capture_request(self, wait=None, flush=None):
+        return self._next_request()
+
+    def capture_metadata(self, wait=None):
+        request = self._next_request()
+        try:
+            return request.get_metadata()
+        finally:
+            request.release()
+
+    def capture_array(self, name="main", wait=None):
+        request = self._next_request()
+        try:
+            return request.make_array(name)
+        finally:
+            request.release()
+
+    def capture_file(self, file_output, name="main", format=None, wait=None, signal_function=None):
+        request = self._next_request()
+        try:
+            request.save(name, file_output, format)
+            return request.get_metadata()
+        finally:
+            request.release()
+
+    def switch_mode_and_capture_file(self, camera_config, file_output, name="main",
+                                     format=None, wait=None, signal_function=None, delay=0):
+        # Stop, reconfigure, let the exposure settle again, capture, switch back
+        previous = self.camera_config
+        self.stop()
+        self.configure(camera_config)
+        self.start()
+        try:
+            for _ in range(max(delay, self.timings["ae_settle_frames"] // 3)):
+                self._next_request().release()
+            return self.capture_file(file_output, name, format)
+        finally:
+            self.stop()
+            self.configure(previous)
+            self.start()
+
+    def start_and_record_video(self, output, encoder=None, config=None, quality=None,
+                               show_preview=False, duration=0, audio=False):
+        if config is not None or self.camera_config is None:
+            self.configure(config or "video")
+        self.start()
+        size = self.camera_config.main.size
+        writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, size)
+        end = time.monotonic() + duration
+        try:
+            while time.monotonic() < end:
+                request = self._next_request()
+                try:
+                    writer.write(_to_bgr(request.buffers["main"], self.camera_config.main.format))
+                finally:
+                    request.release()
+        finally:
+            writer.release()
+            self.stop()
@@ -0,0 +1,15 @@
+# Hardware-free RPi.GPIO, see ../fake_gpio.py.
+# FAKE_PIR_TRACE=trace.csv replays a recorded PIR trace on
+# FAKE_PIR_PIN (default 4) once the script sets that pin up,
+# FAKE_PIR_SPEED times faster than recorded.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fake_gpio import *
+from fake_gpio import load_trace, schedule_trace
+
+if os.getenv("FAKE_PIR_TRACE"):
+    schedule_trace(int(os.getenv("FAKE_PIR_PIN", "4")), load_trace(os.getenv("FAKE_PIR_TRACE")),
+                   float(os.getenv("FAKE_PIR_SPEED", "1")))
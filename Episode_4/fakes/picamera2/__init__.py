@@ -0,0 +1,7 @@
+# Hardware-free picamera2, see ../fake_picamera2.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fake_picamera2 import Picamera2, MappedArray, Preview, CompletedRequest
@@ -0,0 +1,90 @@
+# frame_ring.py
+#
+# Description:
+# A fixed-size ring buffer of recent camera frames. All the
+# memory is allocated once, as a single NumPy array of shape
+# (depth, height, width[, channels]), and every new frame is
+# copied into the next slot, so nothing is allocated per frame
+# and memory use is known (and printed) up front.
+#
+# Feed it from a Picamera2 post_callback:
+#   with MappedArray(request, "lores") as m:
+#       ring.push(m.array)
+# and when the PIR fires, pull the frames recorded since the
+# rising edge:
+#   frames, stamps = ring.since(movement_timer)
+# Timestamps use time.monotonic(), the same clock as
+# pir_events.py, so movement_timer can be used directly.
+#
+# j3 @ Oct, 2026
+
+import threading
+import time
+import numpy as np
+
+
+class FrameRing:
+    def __init__(self, depth, shape, dtype=np.uint8, clock=time.monotonic):
+        self.depth = depth
+        self.shape = tuple(shape)
+        self.clock = clock
+        self.frames = np.zeros((depth,) + self.shape, dtype=dtype)
+        self.stamps = np.full(depth, -np.inf)  # -inf marks an empty slot
+        self.count = 0  # Total frames pushed since start
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes + self.stamps.nbytes
+
+    def describe(self):
+        size = "x".join(str(n) for n in self.shape)
+        return (f"Frame ring: {self.depth} frames of {size} {self.frames.dtype}, "
+                f"{self.nbytes / (1024 * 1024):.1f} MB")
+
+    def push(self, frame, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        with self._lock:
+            slot = self.count % self.depth
+            np.copyto(self.frames[slot], frame)
+            self.stamps[slot] = timestamp
+            self.count += 1
+
+    def latest(self, out=None):
+        # Copy of the newest frame, or None if nothing was pushed yet
+        with self._lock:
+            if self.count == 0:
+                return None, None
+            slot = (self.count - 1) % self.depth
+            if out is None:
+                out = self.frames[slot].copy()
+            else:
+                np.copyto(out, self.frames[slot])
+            return out, self.stamps[slot]
+
+    def since(self, start, out=None, margin=0.0):
+        # Frames with timestamp >= start - margin, oldest first.
+        # Also returns the frame just before `start`, if it is still
+        # in the buffer, so the moment motion began is not missed.
+        # If `out` (shape (depth,) + shape) is given it is filled
+        # in place and a view of it is returned.
+        with self._lock:
+            n = min(self.count, self.depth)
+            first = (self.count - n) % self.depth
+            order = (np.arange(n) + first) % self.depth
+            stamps = self.stamps[order]
+            keep = int(np.searchsorted(stamps, start - margin, side="left"))
+            keep = max(0, keep - 1)
+            order = order[keep:]
+            if out is None:
+                frames = self.frames[order]  # Fancy indexing copies
+            else:
+                frames = out[:len(order)]
+                np.take(self.frames, order, axis=0, out=frames)
+            return frames, stamps[keep:].copy()
+
+    def clear(self):
+        with self._lock:
+            self.stamps.fill(-np.inf)
+            self.count = 0
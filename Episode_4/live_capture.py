@@ -0,0 +1,69 @@
+# live_capture.py
+#
+# Description:
+# Still capture without switching camera mode. The scripts up to
+# cam17.py call picam2.switch_mode_and_capture_file() on every
+# trigger: the camera is stopped, reconfigured for the still
+# config, captures, and is switched back, which costs hundreds of
+# milliseconds and makes the exposure settle again.
+#
+# LiveCapture expects the camera to be already running with its
+# "main" stream at the capture resolution. It grabs the next
+# completed request with capture_request(), copies the main
+# stream out of it and releases the request straight away, so
+# the camera keeps streaming. The JPEG encoding and the file
+# write happen on a separate encoder thread.
+#
+# j3 @ Oct, 2026
+
+import concurrent.futures
+import time
+import cv2
+
+
+class LiveCapture:
+    def __init__(self, picam2, stream="main", quality=90, encoders=1):
+        self.picam2 = picam2
+        self.stream = stream
+        self.quality = quality
+        self._pool = concurrent.futures.ThreadPoolExecutor(encoders, thread_name_prefix="jpeg")
+
+    def grab(self):
+        # Copy of the next frame plus its metadata
+        request = self.picam2.capture_request()
+        try:
+            array = request.make_array(self.stream)
+            metadata = request.get_metadata()
+        finally:
+            request.release()
+        return array, metadata
+
+    def encode(self, array, file_name):
+        # Picamera2 "RGB888" is stored B, G, R in memory, as OpenCV expects.
+        # "XBGR8888" (the preview default) is R, G, B, 255.
+        if array.ndim == 3 and array.shape[2] == 4:
+            array = cv2.cvtColor(array, cv2.COLOR_RGBA2BGR)
+        if not cv2.imwrite(file_name, array, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+            raise IOError(f"Could not write {file_name}")
+        return file_name
+
+    def capture_file(self, file_name):
+        # Returns a Future that resolves to file_name once it is on disk
+        array, _ = self.grab()
+        return self._pool.submit(self.encode, array, file_name)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+def measure(capture, count=10, interval=0.5):
+    # Trigger-to-JPEG-on-disk latency of capture(file_name), in seconds.
+    # `capture` must block until the file is written.
+    latencies = []
+    for i in range(count):
+        file_name = f"/tmp/live_capture_{i}.jpg"
+        t = time.perf_counter()
+        capture(file_name)
+        latencies.append(time.perf_counter() - t)
+        time.sleep(interval)
+    return latencies
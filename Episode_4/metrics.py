@@ -0,0 +1,306 @@
+# metrics.py
+#
+# Description:
+# Built-in metrics for the detector, instead of reading prints:
+# - Counter:   things that only go up (PIR edges, emails failed...)
+# - Gauge:     a current value, set directly or read from a function
+#              when scraped (queue depths)
+# - Histogram: a distribution (latencies, durations) kept as counts
+#              in fixed buckets, so it uses the same memory after
+#              one observation or after a million
+# Metrics can have labels, e.g. pir_edges{edge="rising"}.
+# A Registry renders everything in the Prometheus text format;
+# MetricsServer serves it on a local HTTP port (/metrics), and
+# SnapshotWriter writes a JSON snapshot of the same numbers to a
+# file every `interval` seconds (written to a temporary file and
+# renamed, so readers never see half a file).
+# Recording a value costs a lock and a few additions (a bisect for
+# histograms), see bench_metrics.py.
+#
+# Usage:
+#   registry = Registry()
+#   latency = registry.histogram("trigger_to_capture_seconds", "Trigger to photo on disk")
+#   latency.observe(0.12)
+#   MetricsServer(registry, port=9108).start()
+#   curl http://127.0.0.1:9108/metrics
+#
+# j3 @ Oct, 2026
+
+import bisect
+import http.server
+import json
+import math
+import os
+import threading
+import time
+
+# Seconds, from 1 ms to 60 s: fits loop jitter as well as email sends
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds, from 50 us to 100 ms: for how late a 10 ms loop wakes up
+JITTER_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, **labels):
+        # The child metric for one set of label values (created once)
+        key = tuple((name, str(labels[name])) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _series(self):
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+
+    def _family(self):
+        # Name in the HELP and TYPE lines
+        return self.name
+
+    def render(self):
+        family = self._family()
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+        for labels, child in self._series():
+            lines += child._render(self.name, labels)
+        return lines
+
+    def snapshot(self):
+        if self.labelnames:
+            return {_label_text(labels): child._value() for labels, child in self._series()}
+        return self._value()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def _family(self):
+        # The samples are name_total, so the family is too (as the
+        # official client writes text format 0.0.4)
+        return f"{self.name}_total"
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def _value(self):
+        return self.value
+
+    def _render(self, name, labels):
+        return [f"{name}_total{_label_text(labels)} {self.value}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames=(), func=None):
+        # func() is called at scrape time instead of keeping a value
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+        self.func = func
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, func):
+        self.func = func
+
+    def _value(self):
+        return self.func() if self.func is not None else self.value
+
+    def _render(self, name, labels):
+        return [f"{name}{_label_text(labels)} {self._value()}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def time(self):
+        # with histogram.time(): ... observes the duration of the block
+        return _Timer(self)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th quantile, or None
+        # with no observations (JSON has no NaN)
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return None
+        rank = q * total
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            if running >= rank:
+                return bound if bound != math.inf else self.max
+        return self.max
+
+    def _value(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "max": round(self.max, 6),
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+    def _render(self, name, labels):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        lines = []
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            le = "+Inf" if bound == math.inf else repr(bound)
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', le),))} {running}")
+        lines.append(f"{name}_sum{_label_text(labels)} {value_sum}")
+        lines.append(f"{name}_count{_label_text(labels)} {total}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), func=None):
+        return self._add(Gauge(name, help_text, labelnames, func))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {"time": time.time(), **{name: m.snapshot() for name, m in self.metrics.items()}}
+
+
+class MetricsServer:
+    # GET /metrics in the Prometheus text format, on its own thread
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        registry_ = registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # No line per scrape
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SnapshotWriter:
+    # Writes registry.snapshot() as JSON to file_name every `interval` s
+    def __init__(self, registry, file_name, interval=60.0):
+        self.registry = registry
+        self.file_name = file_name
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+        self._thread.start()
+        return self
+
+    def write(self):
+        tmp = self.file_name + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f, indent=1, default=str, allow_nan=False)
+        os.replace(tmp, self.file_name)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.write()  # Final numbers
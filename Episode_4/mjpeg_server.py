@@ -0,0 +1,276 @@
+# mjpeg_server.py
+#
+# Description:
+# Live view of the camera in any browser, replacing the local
+# Preview.QTGL window of cam1.py/cam3.py/cam11.py, which needs a
+# display attached to the Pi.
+# - CameraSource runs on its own thread: while at least one client
+#   is watching it takes the next frame from the running camera,
+#   encodes it to JPEG once, straight from the camera buffer, and
+#   hands it to the FrameHub on the asyncio loop.
+# - FrameHub keeps only the latest frame, already wrapped in its
+#   multipart headers. Every client writes those same bytes objects
+#   to its socket, so one encode serves any number of clients and
+#   nothing is copied per client.
+# - A client that cannot keep up simply gets the newest frame once
+#   its socket has drained: the frames in between are skipped (and
+#   counted), and the kernel + transport buffers are the only
+#   memory a slow client can hold.
+# Routes: /  (page), /stream.mjpg, /snapshot.jpg, /stats (JSON)
+# There is no authentication, so it listens on 127.0.0.1 unless told
+# otherwise: reach it through an SSH tunnel, or pass --host 0.0.0.0
+# on a trusted network only (anyone on it can then watch).
+#
+# Usage:
+#   python3 mjpeg_server.py --port 8000 --size 640x480 --fps 10
+#   ssh -L 8000:localhost:8000 pi@<pi address> (from the other machine)
+#   then open http://localhost:8000/ in a browser
+#   (PYTHONPATH=fakes python3 mjpeg_server.py runs it off the Pi)
+#
+# j3 @ Oct, 2026
+
+import argparse
+import asyncio
+import json
+import resource
+import socket
+import threading
+import time
+import cv2
+
+BOUNDARY = b"frame"
+PAGE = b"""<html><head><title>Raspberry Pi camera</title></head>
+<body style="margin:0;background:#000"><img src="/stream.mjpg" style="width:100%"></body></html>"""
+
+
+class Frame:
+    # One encoded frame, with the multipart part header already built
+    __slots__ = ("number", "timestamp", "jpeg", "header")
+
+    def __init__(self, number, timestamp, jpeg):
+        self.number = number
+        self.timestamp = timestamp  # time.time() at capture
+        self.jpeg = jpeg
+        self.header = (b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\n"
+                       + b"Content-Length: %d\r\nX-Timestamp: %.6f\r\n\r\n" % (len(jpeg), timestamp))
+
+
+class FrameHub:
+    # Latest frame plus a condition the clients wait on. Only touched
+    # from the asyncio loop.
+    def __init__(self):
+        self.frame = None
+        self.clients = 0
+        self.published = 0
+        self._changed = asyncio.Condition()
+        self.watching = threading.Event()  # Set while there are clients
+
+    async def publish(self, frame):
+        async with self._changed:
+            self.frame = frame
+            self.published += 1
+            self._changed.notify_all()
+
+    async def next_frame(self, after):
+        # Newest frame with a number above `after`
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.frame is not None and self.frame.number > after)
+            return self.frame
+
+    def join(self):
+        self.clients += 1
+        self.watching.set()
+
+    def leave(self):
+        self.clients -= 1
+        if self.clients == 0:
+            self.watching.clear()
+
+
+class CameraSource:
+    # Encoder thread: camera -> JPEG -> FrameHub
+    def __init__(self, picam2, hub, loop, stream="main", fps=10, quality=80):
+        self.picam2 = picam2
+        self.hub = hub
+        self.loop = loop
+        self.stream = stream
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="mjpeg-encoder", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.hub.watching.set()  # Wake the thread up
+        self._thread.join(timeout=5)
+
+    def _encode(self):
+        # Imported here so the server can be imported without a camera
+        from picamera2 import MappedArray
+        request = self.picam2.capture_request()
+        try:
+            timestamp = time.time()
+            with MappedArray(request, self.stream, write=False) as m:
+                array = m.array
+                if array.ndim == 3 and array.shape[2] == 4:
+                    # "XBGR8888" is R, G, B, 255 in memory
+                    array = cv2.cvtColor(array, cv2.COLOR_RGBA2BGR)
+                ok, jpeg = cv2.imencode(".jpg", array, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        finally:
+            request.release()
+        return timestamp, jpeg.tobytes()
+
+    def _run(self):
+        number = 0
+        next_time = time.monotonic()
+        while not self._stop.is_set():
+            # Nobody watching: no capture, no encode
+            self.hub.watching.wait()
+            if self._stop.is_set():
+                break
+            start = time.perf_counter()
+            timestamp, jpeg = self._encode()
+            self.encode_seconds += time.perf_counter() - start
+            self.encoded += 1
+            number += 1
+            asyncio.run_coroutine_threadsafe(self.hub.publish(Frame(number, timestamp, jpeg)), self.loop)
+            next_time = max(next_time + self.interval, time.monotonic())
+            self._stop.wait(next_time - time.monotonic())
+
+
+class MjpegServer:
+    def __init__(self, hub, source=None, host="127.0.0.1", port=8000, write_buffer=256 * 1024):
+        self.hub = hub
+        self.source = source
+        self.host = host
+        self.port = port
+        self.write_buffer = write_buffer
+        self.sent = 0
+        self.skipped = 0
+        self._positions = {}  # Streaming writer -> number of the last frame sent
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self._server
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def stats(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        newest = self.hub.frame.number if self.hub.frame is not None else 0
+        # Frames a client blocked in drain() is missing so far
+        behind = [newest - last for last in self._positions.values() if newest - last > 1]
+        stats = {
+            "clients": self.hub.clients,
+            "published": self.hub.published,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "lagging_clients": len(behind),
+            "frames_behind": sum(behind),
+            "cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "max_rss_kb": usage.ru_maxrss,
+        }
+        if self.source is not None:
+            stats["encoded"] = self.source.encoded
+            stats["encode_seconds"] = self.source.encode_seconds
+        return stats
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Skip the request headers
+            while (await reader.readline()).strip():
+                pass
+            parts = request_line.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+            if path == "/stream.mjpg":
+                await self._stream(writer)
+            elif path == "/snapshot.jpg" and self.hub.frame is not None:
+                self._respond(writer, b"image/jpeg", self.hub.frame.jpeg)
+            elif path == "/stats":
+                self._respond(writer, b"application/json", json.dumps(self.stats()).encode())
+            elif path in ("/", "/index.html"):
+                self._respond(writer, b"text/html", PAGE)
+            else:
+                writer.write(b"HTTP/1.0 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, content_type, body):
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Type: %s\r\nContent-Length: %d\r\n"
+                     b"Cache-Control: no-cache\r\n\r\n" % (content_type, len(body)))
+        writer.write(body)
+
+    async def _stream(self, writer):
+        # drain() only waits once the transport holds more than this,
+        # and the kernel keeps no more than about as much again
+        writer.transport.set_write_buffer_limits(high=self.write_buffer)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.write_buffer)
+        writer.write(b"HTTP/1.0 200 OK\r\nCache-Control: no-cache\r\nPragma: no-cache\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n\r\n")
+        self.hub.join()
+        last = 0
+        try:
+            while True:
+                frame = await self.hub.next_frame(last)
+                if last:
+                    self.skipped += frame.number - last - 1
+                last = self._positions[writer] = frame.number
+                # The same bytes objects go to every client
+                writer.writelines((frame.header, frame.jpeg, b"\r\n"))
+                self.sent += 1
+                await writer.drain()
+        finally:
+            self._positions.pop(writer, None)
+            self.hub.leave()
+
+
+async def serve(picam2, host, port, fps, quality, stream="main"):
+    hub = FrameHub()
+    source = CameraSource(picam2, hub, asyncio.get_running_loop(), stream=stream, fps=fps, quality=quality)
+    server = MjpegServer(hub, source, host, port)
+    await server.start()
+    source.start()
+    print(f"Live view on http://{host}:{port}/")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        source.stop()
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the camera as an MJPEG stream")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to serve the whole network")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--size", default="640x480")
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--quality", type=int, default=80)
+    args = parser.parse_args()
+
+    from picamera2 import Picamera2
+    from libcamera import Transform
+    picam2 = Picamera2()
+    size = tuple(int(n) for n in args.size.split("x"))
+    picam2.configure(picam2.create_video_configuration({"size": size, "format": "RGB888"},
+                                                       transform=Transform(hflip=True, vflip=True)))
+    picam2.start()
+    try:
+        asyncio.run(serve(picam2, args.host, args.port, args.fps, args.quality))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        picam2.stop()
@@ -0,0 +1,135 @@
+# motion.py
+#
+# Description:
+# Camera-based motion detection to back up the PIR sensor, which
+# is fooled by heat drafts. BlockMotionDetector works on the Y
+# (brightness) plane of the small "lores" YUV420 stream:
+# - the frame is averaged down to a grid of blocks (e.g. 16x16 px)
+# - every block is compared with a running-average background
+# - a block is "active" if it differs by more than `threshold`
+# - motion is reported when at least `min_blocks` active blocks
+#   inside the region-of-interest mask are seen for `persistence`
+#   frames in a row
+# All buffers are preallocated and the work is a handful of
+# vectorized NumPy/OpenCV calls on a grid of a few hundred cells,
+# so it easily keeps up with the camera on one Pi core.
+#
+# MotionFusion decides whether a photo is taken from the PIR and
+# camera signals: PIR_ONLY, CAMERA_ONLY, BOTH or EITHER.
+#
+# j3 @ Oct, 2026
+
+import threading
+import time
+import cv2
+import numpy as np
+
+PIR_ONLY = "pir"
+CAMERA_ONLY = "camera"
+BOTH = "both"
+EITHER = "either"
+
+
+def roi_from_rects(grid_shape, rects):
+    # Block mask from (x0, y0, x1, y1) rectangles given as fractions
+    # of the frame, e.g. [(0.0, 0.5, 1.0, 1.0)] = bottom half only
+    rows, cols = grid_shape
+    mask = np.zeros(grid_shape, dtype=bool)
+    for x0, y0, x1, y1 in rects:
+        mask[int(y0 * rows):int(np.ceil(y1 * rows)), int(x0 * cols):int(np.ceil(x1 * cols))] = True
+    return mask
+
+
+class BlockMotionDetector:
+    def __init__(self, shape, block=16, threshold=12.0, min_blocks=3,
+                 persistence=2, learning_rate=0.05, roi=None):
+        # shape is (height, width) of the Y plane
+        height, width = shape
+        self.grid_shape = (height // block, width // block)
+        self.crop = (self.grid_shape[0] * block, self.grid_shape[1] * block)
+        self.threshold = threshold
+        self.min_blocks = min_blocks
+        self.persistence = persistence
+        self.learning_rate = learning_rate
+        self.roi = np.ones(self.grid_shape, dtype=bool) if roi is None else roi
+        if self.roi.shape != self.grid_shape:
+            raise ValueError(f"ROI mask must have shape {self.grid_shape}")
+        self.small_u8 = np.zeros(self.grid_shape, dtype=np.uint8)
+        self.small = np.zeros(self.grid_shape, dtype=np.float32)
+        self.background = np.zeros(self.grid_shape, dtype=np.float32)
+        self.diff = np.zeros(self.grid_shape, dtype=np.float32)
+        self.abs_diff = np.zeros(self.grid_shape, dtype=np.float32)
+        self.active = np.zeros(self.grid_shape, dtype=bool)
+        self.frames = 0
+        self.active_blocks = 0
+        self.streak = 0
+        self.motion = False
+
+    def update(self, y_plane):
+        # Feed one frame; returns True while motion is detected
+        cropped = y_plane[:self.crop[0], :self.crop[1]]
+        # cv2.resize only fills `dst` in place when the dtype matches
+        cv2.resize(cropped, (self.grid_shape[1], self.grid_shape[0]),
+                   dst=self.small_u8, interpolation=cv2.INTER_AREA)
+        np.copyto(self.small, self.small_u8)
+        if self.frames == 0:
+            self.background[:] = self.small
+        self.frames += 1
+
+        np.subtract(self.small, self.background, out=self.diff)
+        np.abs(self.diff, out=self.abs_diff)
+        np.greater(self.abs_diff, self.threshold, out=self.active)
+
+        # Background follows the scene slowly (lighting changes)
+        self.diff *= self.learning_rate
+        self.background += self.diff
+
+        self.active &= self.roi
+        self.active_blocks = int(np.count_nonzero(self.active))
+
+        self.streak = self.streak + 1 if self.active_blocks >= self.min_blocks else 0
+        self.motion = self.streak >= self.persistence
+        return self.motion
+
+
+class MotionFusion:
+    def __init__(self, policy=EITHER, pir_active=None, window=2.0,
+                 min_interval=60.0, clock=time.monotonic):
+        # pir_active() tells whether the PIR output is high right now
+        if policy not in (PIR_ONLY, CAMERA_ONLY, BOTH, EITHER):
+            raise ValueError(f"Unknown fusion policy: {policy}")
+        self.policy = policy
+        self.pir_active = pir_active or (lambda: False)
+        self.window = window  # How long a camera detection counts for BOTH
+        self.min_interval = min_interval
+        self.clock = clock
+        self.last_camera_motion = None
+        self.last_fire = None
+        self._lock = threading.Lock()
+
+    def on_pir(self):
+        # Sustained PIR motion; returns True if a photo should be taken
+        now = self.clock()
+        if self.policy == CAMERA_ONLY:
+            return False
+        if self.policy == BOTH:
+            if self.last_camera_motion is None or now - self.last_camera_motion > self.window:
+                return False
+        return self._fire(now)
+
+    def on_camera(self):
+        # Camera motion; returns True if a photo should be taken
+        now = self.clock()
+        self.last_camera_motion = now
+        if self.policy == PIR_ONLY:
+            return False
+        if self.policy == BOTH and not self.pir_active():
+            return False
+        return self._fire(now)
+
+    def _fire(self, now):
+        with self._lock:
+            if self.last_fire is not None and now - self.last_fire < self.min_interval:
+                return False
+            self.last_fire = now
+            return True
@@ -0,0 +1,180 @@
+# night.py
+#
+# Description:
+# Low-light mode: the photo is the average of several consecutive
+# frames of the live stream instead of a single one. At night the
+# sensor runs at high analogue gain and a single frame is mostly
+# noise; the noise also makes the JPEG large, so the attachment
+# optimizer has to compress it hard to fit the uplink budget.
+# Averaging N frames divides the noise by about sqrt(N).
+# NightStack:
+# - decides on its own when it is night: observe() is fed the frame
+#   metadata and switches on when AnalogueGain or ExposureTime go
+#   over the "on" thresholds, and off again only below the lower
+#   "off" thresholds (hysteresis, so dusk does not flap)
+# - on a trigger, copies frames straight from the camera buffers
+#   and adds them into a preallocated uint16 accumulator (up to 257
+#   frames of uint8 fit), with no per-frame allocation of frame
+#   sized arrays
+# - optionally aligns every frame on the first one (global
+#   translation only, for a camera on a pole that sways): phase
+#   correlation of float32 grey images shrunk by `factor`, then a
+#   sub-pixel shift into a preallocated buffer. Frames that do not
+#   match (low correlation response, or a shift over `max_shift`
+#   pixels) are left out rather than smeared in.
+# - stops taking frames when the next one would not fit in 3/4 of
+#   the latency budget, keeping at least one; the mean and the
+#   JPEG encoding on the encoder thread come on top
+#
+# Usage:
+#   night = NightStack(live, (600, 800, 3), count=8, budget=1.0)
+#   night.observe(request.get_metadata())  # e.g. from a callback
+#   if night.active:
+#       file_names = night.capture_file("/home/pi/Camera/img_x.jpg").result()
+#
+# j3 @ Oct, 2026
+
+import concurrent.futures
+import time
+import cv2
+import numpy as np
+
+
+class NightStack:
+    def __init__(self, live, shape, count=8, budget=1.0, align=True, factor=4, max_shift=32,
+                 min_response=0.05, gain_on=6.0, gain_off=4.0, exposure_on=50000, exposure_off=30000,
+                 clock=time.monotonic):
+        # live: a running LiveCapture; shape: (height, width[, channels])
+        # of its stream; budget: seconds from trigger to the mean being
+        # ready; exposures in microseconds, as in the metadata
+        if not 1 <= count <= 257:
+            raise ValueError("count must be 1 to 257 for a uint16 accumulator")
+        self.live = live
+        self.count = count
+        self.budget = budget
+        self.align = align
+        self.max_shift = max_shift
+        self.min_response = min_response
+        self.gain_on, self.gain_off = gain_on, gain_off
+        self.exposure_on, self.exposure_off = exposure_on, exposure_off
+        self.clock = clock
+        self.active = False
+        shape = tuple(shape)
+        height, width = shape[:2]
+        self.small_size = (width // factor, height // factor)
+        self.factor = factor
+        self._acc = np.zeros(shape, np.uint16)
+        self._frame = np.empty(shape, np.uint8)
+        self._shifted = np.empty(shape, np.uint8)
+        self._out = np.empty(shape, np.uint8)
+        self._grey = np.empty((height, width), np.uint8)
+        self._small = np.empty(self.small_size[::-1], np.uint8)
+        self._ref = np.empty(self.small_size[::-1], np.float32)
+        self._cur = np.empty(self.small_size[::-1], np.float32)
+        self._window = cv2.createHanningWindow(self.small_size, cv2.CV_32F)
+        self._shift = np.zeros((2, 3), np.float64)
+        self._shift[0, 0] = self._shift[1, 1] = 1.0
+        self._pool = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="night")
+        self.n = 0
+        # Figures of the last stack
+        self.stacked = 0
+        self.rejected = 0
+        self.stack_seconds = 0.0
+        self.shifts = []
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self._acc, self._frame, self._shifted, self._out, self._grey,
+                                      self._small, self._ref, self._cur, self._window))
+
+    def describe(self):
+        h, w = self._acc.shape[:2]
+        aligned = f"aligned at {self.small_size[0]}x{self.small_size[1]}" if self.align else "not aligned"
+        return (f"Night stack of up to {self.count} frames at {w}x{h}, {aligned}, "
+                f"{self.nbytes() / 1024 ** 2:.1f} MB preallocated, {'on' if self.active else 'off'}")
+
+    def observe(self, metadata):
+        # Night or not, from the exposure and gain the AE picked
+        gain = metadata.get("AnalogueGain", 1.0)
+        exposure = metadata.get("ExposureTime", 0)
+        if self.active:
+            self.active = gain > self.gain_off or exposure > self.exposure_off
+        else:
+            self.active = gain >= self.gain_on or exposure >= self.exposure_on
+        return self.active
+
+    def _small_grey(self, frame, out):
+        grey = frame
+        if frame.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            grey = cv2.cvtColor(frame, code, dst=self._grey)
+        cv2.resize(grey, self.small_size, dst=self._small, interpolation=cv2.INTER_AREA)
+        np.copyto(out, self._small, casting="unsafe")
+
+    def reset(self):
+        self._acc.fill(0)
+        self.n = 0
+        self.rejected = 0
+        self.shifts = []
+
+    def add(self, frame):
+        # Adds one frame; returns False if it was left out
+        if self.align and self.n == 0:
+            self._small_grey(frame, self._ref)
+        elif self.align:
+            self._small_grey(frame, self._cur)
+            (dx, dy), response = cv2.phaseCorrelate(self._ref, self._cur, self._window)
+            dx, dy = dx * self.factor, dy * self.factor
+            if response < self.min_response or max(abs(dx), abs(dy)) > self.max_shift:
+                self.rejected += 1
+                return False
+            self.shifts.append((round(dx, 1), round(dy, 1)))
+            if abs(dx) >= 0.5 or abs(dy) >= 0.5:
+                # Move the frame back onto the first one
+                self._shift[0, 2], self._shift[1, 2] = -dx, -dy
+                frame = cv2.warpAffine(frame, self._shift, (frame.shape[1], frame.shape[0]), dst=self._shifted,
+                                       flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        np.add(self._acc, frame, out=self._acc)
+        self.n += 1
+        return True
+
+    def result(self):
+        # The mean of the frames added since reset(), as uint8 (a view
+        # of an internal buffer, overwritten by the next stack)
+        return cv2.convertScaleAbs(self._acc, dst=self._out, alpha=1.0 / max(self.n, 1))
+
+    def grab(self):
+        # Stacks up to `count` consecutive frames within the budget;
+        # returns how many were stacked
+        from picamera2 import MappedArray
+        start = time.perf_counter()
+        deadline = self.clock() + self.budget * 0.75
+        picam2 = self.live.picam2
+        self.reset()
+        taken = 0
+        while taken < self.count:
+            t = self.clock()
+            request = picam2.capture_request()
+            try:
+                with MappedArray(request, self.live.stream, write=False) as m:
+                    # Copied out so the camera buffer goes back at once
+                    np.copyto(self._frame, m.array)
+            finally:
+                request.release()
+            self.add(self._frame)
+            taken += 1
+            now = self.clock()
+            last = now - t
+            if now + last >= deadline and self.n:
+                break  # The next frame would be over budget
+        self.stacked = self.n
+        self.stack_seconds = time.perf_counter() - start
+        return self.n
+
+    def capture_file(self, file_name):
+        # Returns a Future resolving to [file_name], like BurstCapture
+        self.grab()
+        array = self.result().copy()  # The buffers take the next stack
+        return self._pool.submit(lambda: [self.live.encode(array, file_name)])
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,330 @@
+# outbox.py
+#
+# Description:
+# Durable outbox for the email alerts. In cam13.py a Gmail outage
+# makes yag.send raise and kills the detector; since cam18.py the
+# pipeline survives it, but the alert is lost. Outbox instead:
+# - spools every alert in a SQLite table (WAL, synchronous=FULL):
+#   put() is one INSERT, so an alert is either fully queued or not
+#   at all, and it survives a crash, a reboot or a power cut
+# - drains it with `workers` threads (at most the SmtpPool size),
+#   each claiming a batch of due alerts and sending the whole batch
+#   over one pooled session, so a backlog goes out in a few logins
+#   instead of one login per alert
+# - keeps retry state per alert (attempts, next attempt, last error)
+#   with exponential backoff; an alert the server refuses for its
+#   own sake (a bad attachment, a 5xx) is given up after
+#   `max_attempts` and kept in the table as "dead"
+# - treats a connection failure as an outage of the whole outbox:
+#   only one worker probes the server, at growing intervals, and as
+#   soon as a send succeeds every waiting alert is made due again
+#   so the backlog drains at once
+# Alerts caught mid-send by a crash are sent again on the next
+# start (at least once delivery).
+#
+# Usage:
+#   outbox = Outbox("/home/pi/Camera/outbox.db", smtp_pool,
+#                   lambda files, meta: build_alert(from_email, to_email, files))
+#   outbox.start()
+#   outbox.put(["/home/pi/Camera/.../img_1.jpg"], trigger="pir")
+#   ...
+#   outbox.close()
+#
+# j3 @ Oct, 2026
+
+import json
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import traceback
+from smtp_pool import connection_error
+
+PENDING = "pending"
+SENDING = "sending"
+DEAD = "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    files TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt);
+"""
+
+
+def _transient(error):
+    # 4xx replies (e.g. 421 too busy, 452 storage full) are worth retrying
+    return isinstance(error, smtplib.SMTPResponseException) and 400 <= error.smtp_code < 500
+
+
+class Outbox:
+    def __init__(self, path, pool, build, workers=2, batch_size=10, base_delay=5.0,
+                 max_delay=600.0, max_attempts=8, clock=time.time, on_result=None):
+        # build(files, meta) -> EmailMessage, called when the alert is sent.
+        # on_result(files, meta, error, seconds), if given, is called from
+        # a worker after every send attempt (error is None on success).
+        self.pool = pool
+        self.build = build
+        self.on_result = on_result
+        self.workers = min(workers, pool.size)
+        self.batch_size = batch_size
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.sent = 0
+        self.failures = 0
+        self.batches = 0
+        self.outages = 0
+
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SCHEMA)
+        with self._db:
+            # Alerts that were being sent when the last run stopped
+            self._db.execute("UPDATE outbox SET state = ? WHERE state = ?", (PENDING, SENDING))
+
+        self._wake = threading.Condition()
+        self._closed = False
+        self._outage_until = 0.0  # No sends before this time, except one probe
+        self._outage_streak = 0
+        self._probing = False
+        self._threads = []
+        self._final = None  # (waiting, dead) once closed
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    # ---- Producer side ----
+
+    def put(self, files, **meta):
+        # Queue an alert; returns its id once it is on disk
+        files = [files] if isinstance(files, str) else list(files or [])
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (created, files, meta, state) VALUES (?, ?, ?, ?)",
+                (self.clock(), json.dumps(files), json.dumps(meta), PENDING))
+        with self._wake:
+            self._wake.notify()
+        return cursor.lastrowid
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE state != ?", (DEAD,)).fetchone()[0]
+
+    def dead(self):
+        with self._lock:
+            return self._db.execute("SELECT id, files, attempts, last_error FROM outbox WHERE state = ?",
+                                    (DEAD,)).fetchall()
+
+    # ---- Drain ----
+
+    def _claim(self, limit):
+        # Mark up to `limit` due alerts as being sent; returns them,
+        # or the time the next one is due
+        now = self.clock()
+        with self._lock, self._db:
+            rows = self._db.execute(
+                "SELECT id, files, meta, attempts FROM outbox WHERE state = ? AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?", (PENDING, now, limit)).fetchall()
+            if rows:
+                self._db.executemany("UPDATE outbox SET state = ? WHERE id = ?",
+                                     [(SENDING, row[0]) for row in rows])
+                return rows, None
+            next_due = self._db.execute("SELECT MIN(next_attempt) FROM outbox WHERE state = ?",
+                                        (PENDING,)).fetchone()[0]
+        return [], next_due
+
+    def _backoff(self, attempts):
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        return delay * random.uniform(0.8, 1.2)  # Spread the retries a little
+
+    def _done(self, ids):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def _retry(self, rows, error, count_attempt=True, until=None):
+        now = self.clock()
+        updates = []
+        for id_, _, _, attempts in rows:
+            attempts += 1 if count_attempt else 0
+            give_up = count_attempt and not _transient(error) and attempts >= self.max_attempts
+            next_attempt = until if until is not None else now + self._backoff(attempts)
+            updates.append((DEAD if give_up else PENDING, attempts, next_attempt, repr(error), id_))
+        with self._lock, self._db:
+            self._db.executemany("UPDATE outbox SET state = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                                 "WHERE id = ?", updates)
+
+    def _report(self, row, error, start):
+        if error is not None:
+            self.failures += 1
+        if self.on_result is not None:
+            try:
+                self.on_result(json.loads(row[1]), json.loads(row[2]), error, time.monotonic() - start)
+            except Exception:
+                traceback.print_exc()
+
+    def _send_batch(self, rows):
+        # One session for the whole batch; a message the server refuses
+        # only fails itself, a dropped connection fails the rest
+        sent = []
+        remaining = list(rows)
+        start = time.monotonic()
+        try:
+            with self.pool.session() as session:
+                while remaining:
+                    row = remaining.pop(0)
+                    start = time.monotonic()
+                    try:
+                        msg = self.build(json.loads(row[1]), json.loads(row[2]))
+                    except Exception as e:  # E.g. a missing attachment
+                        self._report(row, e, start)
+                        self._retry([row], e)
+                        continue
+                    try:
+                        session.smtp.send_message(msg)
+                    except Exception as e:
+                        if connection_error(e):
+                            remaining.insert(0, row)
+                            raise
+                        self._report(row, e, start)
+                        self._retry([row], e)
+                        continue
+                    session.sent += 1
+                    sent.append(row[0])
+                    self._report(row, None, start)
+        except Exception as e:  # Includes failing to connect or log in
+            self._done(sent)
+            if not remaining:
+                # Raised once the last alert was handled (e.g. by the
+                # database): no alert is left to fail, and it is no outage
+                traceback.print_exc()
+                return sent, [], None
+            self._report(remaining[0], e, start)
+            return sent, remaining, e
+        self._done(sent)
+        return sent, [], None
+
+    def _on_outage(self, rows, error):
+        with self._wake:
+            self._outage_streak += 1
+            if self._outage_streak == 1:
+                self.outages += 1
+            self._outage_until = self.clock() + self._backoff(self._outage_streak)
+            until = self._outage_until
+        # An outage is no fault of these alerts: no attempt is counted
+        self._retry(rows, error, count_attempt=False, until=until)
+        print(f"[outbox] server unreachable ({error!r}), next try in {until - self.clock():.0f}s")
+
+    def _on_recovery(self):
+        with self._wake:
+            was_down = self._outage_streak > 0
+            self._outage_streak = 0
+            self._outage_until = 0.0
+            self._wake.notify_all()
+        if was_down:
+            # Everything that was waiting for the server is due now
+            with self._lock, self._db:
+                self._db.execute("UPDATE outbox SET next_attempt = 0 WHERE state = ?", (PENDING,))
+            print("[outbox] server reachable again, draining the backlog")
+
+    def _wait(self, timeout):
+        with self._wake:
+            if not self._closed:
+                self._wake.wait(timeout)
+
+    def _run(self):
+        while not self._closed:
+            try:
+                self._step()
+            except Exception:
+                # E.g. the database failing: the worker must not die with
+                # it (alerts it had claimed are sent again on the next start)
+                traceback.print_exc()
+                self._wait(1.0)
+
+    def _step(self):
+        # One claim and send
+        now = self.clock()
+        with self._wake:
+            # During an outage a single worker probes the server
+            down = now < self._outage_until or (self._outage_streak and self._probing)
+            if not down and self._outage_streak:
+                self._probing = True
+                probe = True
+            else:
+                probe = False
+        if down:
+            self._wait(max(0.1, self._outage_until - now))
+            return
+        try:
+            # The probe is a single alert
+            rows, next_due = self._claim(1 if probe else self.batch_size)
+            if not rows:
+                if probe:
+                    self._probing = False
+                self._wait(None if next_due is None else max(0.05, next_due - self.clock()))
+                return
+            sent, remaining, error = self._send_batch(rows)
+            with self._wake:
+                self.batches += 1
+                self.sent += len(sent)
+            if error is not None:
+                self._on_outage(remaining, error)
+            elif sent:
+                self._on_recovery()
+        finally:
+            if probe:
+                self._probing = False
+
+    def flush(self, timeout=None):
+        # Wait until nothing is due; returns False on timeout or outage
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                due = self._db.execute("SELECT COUNT(*) FROM outbox WHERE state = ? OR "
+                                       "(state = ? AND next_attempt <= ?)",
+                                       (SENDING, PENDING, self.clock())).fetchone()[0]
+            if due == 0:
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def close(self, timeout=10.0):
+        # Send what is due, then stop; the rest waits on disk
+        self.flush(timeout)
+        with self._wake:
+            self._closed = True
+            self._wake.notify_all()
+        # No timeout: a worker in the middle of a send (bounded by the
+        # SMTP timeout) must record it before the database is closed,
+        # or the alert is sent again on the next start
+        for t in self._threads:
+            t.join()
+        self._final = (self.pending(), len(self.dead()))
+        with self._lock:
+            self._db.close()
+
+    def describe(self):
+        waiting, dead = self._final if self._final else (self.pending(), len(self.dead()))
+        return (f"Outbox: {self.sent} sent in {self.batches} batches, {self.failures} failures, "
+                f"{self.outages} outages, {self.pool.connects} logins, {waiting} waiting, {dead} dead")
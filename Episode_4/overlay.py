@@ -0,0 +1,146 @@
+# overlay.py
+#
+# Description:
+# Cached text overlays for the camera pre_callback. apply_text in
+# cam5.py and cam11.py-cam18.py calls time.strftime, cv2.getTextSize
+# and cv2.putText on every frame, even though the timestamp only
+# changes once a minute.
+#
+# Each TextItem is rendered once per change into a small alpha
+# mask the size of its text box. On every frame only that box is
+# touched, in place, through a NumPy slice of the mapped frame:
+#   cv2.copyTo(colour, mask, frame[y0:y1, x0:x1])
+# When the OpenCV build draws anti-aliased text (OpenCV 5 does,
+# the 4.x on Raspberry Pi OS does not) the box is alpha-blended
+# with cv2.blendLinear instead. The text function itself is only called again when the item's
+# refresh period (aligned to the clock, e.g. every full minute)
+# has passed.
+#
+# Usage:
+#   overlay = Overlay(resolution, [TextItem(lambda: time.strftime("%d%m%Y %H:%M"))])
+#   picam2.pre_callback = overlay.apply
+#
+# j3 @ Oct, 2026
+
+import time
+import cv2
+import numpy as np
+
+BOTTOM_RIGHT = "bottom_right"
+BOTTOM_LEFT = "bottom_left"
+TOP_RIGHT = "top_right"
+TOP_LEFT = "top_left"
+
+
+class TextItem:
+    def __init__(self, text_fn, anchor=BOTTOM_RIGHT, padding=10, refresh=60.0,
+                 colour=(255, 255, 255), font=cv2.FONT_HERSHEY_SIMPLEX,
+                 scale=1, thickness=1, binary=False):
+        # text_fn() returns the text; it is called again every
+        # `refresh` seconds (aligned to the clock, None = never).
+        # binary=True thresholds anti-aliased glyphs to a hard mask,
+        # which always takes the fast copyTo path.
+        self.text_fn = text_fn
+        self.anchor = anchor
+        self.padding = padding
+        self.refresh = refresh
+        self.colour = colour
+        self.font = font
+        self.scale = scale
+        self.thickness = thickness
+        self.binary = binary
+        self.text = None
+        self.next_refresh = 0.0
+        self.alpha = None  # uint8 coverage mask of the text box
+        self.box = None  # (y0, y1, x0, x1) in the frame
+        self._mask = None  # uint8 0/1 mask, when the glyphs have no soft edges
+        self._weights = None  # (background, text) float32 weights otherwise
+        self._fill = None  # Text colour image the size of the box
+        self.renders = 0
+
+    def update(self, now, resolution):
+        # Re-render the mask if the text changed
+        if now < self.next_refresh:
+            return
+        if self.refresh is None:
+            self.next_refresh = float("inf")
+        else:
+            self.next_refresh = (now // self.refresh + 1) * self.refresh
+        text = self.text_fn()
+        if text == self.text:
+            return
+        self.text = text
+        self._render(resolution)
+
+    def _render(self, resolution):
+        (w, h), baseline = cv2.getTextSize(self.text, self.font, self.scale, self.thickness)
+        h += baseline
+        canvas = np.zeros((h, w), dtype=np.uint8)
+        cv2.putText(canvas, self.text, (0, h - baseline), self.font, self.scale,
+                    255, self.thickness)
+        if self.binary:
+            canvas[:] = np.where(canvas >= 128, 255, 0)
+        # Crop to what is inside the frame
+        width, height = resolution
+        if self.anchor in (BOTTOM_RIGHT, TOP_RIGHT):
+            x0 = width - w - self.padding
+        else:
+            x0 = self.padding
+        if self.anchor in (BOTTOM_RIGHT, BOTTOM_LEFT):
+            # Same baseline position as apply_text: `padding` px from the bottom
+            y0 = height - self.padding - (h - baseline)
+        else:
+            y0 = self.padding
+        cx0, cy0 = max(0, -x0), max(0, -y0)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(width, x0 + w - cx0), min(height, y0 + h - cy0)
+        self.alpha = canvas[cy0:cy0 + y1 - y0, cx0:cx0 + x1 - x0]
+        self.box = (y0, y1, x0, x1)
+        if np.all((self.alpha == 0) | (self.alpha == 255)):
+            self._mask = (self.alpha > 0).astype(np.uint8)
+            self._weights = None
+        else:
+            text_weight = self.alpha.astype(np.float32) / 255
+            self._mask = None
+            self._weights = (1 - text_weight, text_weight)
+        self._fill = None
+        self.renders += 1
+
+    def draw(self, frame):
+        y0, y1, x0, x1 = self.box
+        region = frame[y0:y1, x0:x1]
+        if self._fill is None or self._fill.shape != region.shape:
+            channels = region.shape[2]
+            colour = tuple(self.colour) + (255,) * (channels - len(self.colour))
+            self._fill = np.empty(region.shape, dtype=frame.dtype)
+            self._fill[:] = colour[:channels]
+        if self._mask is not None:
+            cv2.copyTo(self._fill, self._mask, region)
+        else:
+            region[:] = cv2.blendLinear(region, self._fill, *self._weights)
+
+
+class Overlay:
+    def __init__(self, resolution, items, stream="main", clock=time.time):
+        self.resolution = tuple(resolution)
+        self.items = list(items)
+        self.stream = stream
+        self.clock = clock
+
+    def draw(self, frame):
+        now = self.clock()
+        for item in self.items:
+            item.update(now, self.resolution)
+            if item.box is not None:
+                item.draw(frame)
+
+    def apply(self, request):
+        # Imported here so the overlay can also be used on plain arrays off the Pi
+        from picamera2 import MappedArray
+        with MappedArray(request, self.stream) as m:
+            self.draw(m.array)
+
+
+def timestamp_item(fmt="%d%m%Y %H:%M", **kwargs):
+    # The "DDMMYYYY HH:MM" stamp drawn by apply_text
+    return TextItem(lambda: time.strftime(fmt), refresh=60.0, **kwargs)
@@ -0,0 +1,243 @@
+# photo_store.py
+#
+# Description:
+# Storage manager for the captures. take_photo used to drop every
+# photo into the flat /home/pi/Camera directory and nothing was
+# ever deleted; PhotoStore instead:
+# - shards photos by date: /home/pi/Camera/2026/10/18/img_<t>.jpg
+# - records every photo in a SQLite catalog (path, timestamp, size,
+#   trigger and zone), indexed by time, so lookups never list the
+#   directories
+# - enforces a disk quota: a background thread deletes the oldest
+#   photos in small batches, straight from the catalog, until the
+#   store is back under the quota. The running total of bytes is
+#   kept in memory, so there is never a walk over the whole tree.
+# Existing flat archives can be moved into the shards with the
+# "import" command.
+#
+# Usage:
+#   store = PhotoStore("/home/pi/Camera", quota_bytes=8 * 1024 ** 3)
+#   file_name = store.path_for(time.time())
+#   ... save the photo to file_name ...
+#   store.add(file_name, trigger="pir", zone="Front door")
+# or from the shell:
+#   python3 photo_store.py import /home/pi/Camera
+#   python3 photo_store.py stats /home/pi/Camera
+#   python3 photo_store.py query /home/pi/Camera --since "2026-10-01 00:00"
+#
+# j3 @ Oct, 2026
+
+import argparse
+import fnmatch
+import os
+import sqlite3
+import threading
+import time
+
+CATALOG_NAME = "catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    t REAL NOT NULL,
+    size INTEGER NOT NULL,
+    trigger TEXT,
+    zone TEXT
+);
+CREATE INDEX IF NOT EXISTS photos_t ON photos (t);
+"""
+
+
+class PhotoStore:
+    def __init__(self, root, quota_bytes=None, evict_batch=32, clock=time.time):
+        self.root = os.path.abspath(root)
+        self.quota_bytes = quota_bytes
+        self.evict_batch = evict_batch
+        self.clock = clock
+        self.evicted = 0
+        self.evicted_bytes = 0
+        os.makedirs(self.root, exist_ok=True)
+
+        # One connection shared by the callers and the evictor thread
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, CATALOG_NAME), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self.used_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM photos").fetchone()[0]
+        self._made_dirs = set()
+
+        self._closed = False
+        self._wake = threading.Event()
+        self._evictor = threading.Thread(target=self._evict_loop, name="photo-store", daemon=True)
+        self._evictor.start()
+        self._wake.set()  # Apply a quota lowered since the last run
+
+    # ---- Paths ----
+
+    def path_for(self, timestamp=None, suffix=".jpg", prefix="img_"):
+        # Absolute file name for a photo taken at `timestamp`; the day
+        # directory is created on first use
+        timestamp = self.clock() if timestamp is None else timestamp
+        day = time.strftime("%Y/%m/%d", time.localtime(timestamp))
+        if day not in self._made_dirs:
+            os.makedirs(os.path.join(self.root, day), exist_ok=True)
+            self._made_dirs.add(day)
+        return os.path.join(self.root, day, f"{prefix}{timestamp}{suffix}")
+
+    def _relative(self, file_name):
+        return os.path.relpath(os.path.abspath(file_name), self.root)
+
+    # ---- Catalog ----
+
+    def add(self, file_name, timestamp=None, trigger=None, zone=None):
+        # Record a photo that is already on disk
+        size = os.path.getsize(file_name)
+        if timestamp is None:
+            timestamp = _timestamp_from_name(file_name) or self.clock()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO photos (path, t, size, trigger, zone) VALUES (?, ?, ?, ?, ?)",
+                (self._relative(file_name), timestamp, size, trigger, zone))
+            self._db.commit()
+            if cursor.rowcount:
+                self.used_bytes += size
+        if self.quota_bytes is not None and self.used_bytes > self.quota_bytes:
+            self._wake.set()
+        return file_name
+
+    def query(self, start=None, end=None, trigger=None, zone=None, limit=None):
+        # [(absolute path, t, size, trigger, zone), ...], oldest first
+        sql = "SELECT path, t, size, trigger, zone FROM photos WHERE 1"
+        args = []
+        for clause, value in (("t >= ?", start), ("t <= ?", end), ("trigger = ?", trigger), ("zone = ?", zone)):
+            if value is not None:
+                sql += " AND " + clause
+                args.append(value)
+        sql += " ORDER BY t"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [(os.path.join(self.root, path), t, size, trig, z) for path, t, size, trig, z in rows]
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+
+    # ---- Eviction ----
+
+    def evict_once(self):
+        # Delete up to evict_batch of the oldest photos while over the
+        # quota. Returns the number of photos deleted.
+        if self.quota_bytes is None or self.used_bytes <= self.quota_bytes:
+            return 0
+        with self._lock:
+            rows = self._db.execute("SELECT id, path, size FROM photos ORDER BY t LIMIT ?",
+                                    (self.evict_batch,)).fetchall()
+        deleted = []
+        freed = 0
+        for row_id, path, size in rows:
+            if self.used_bytes - freed <= self.quota_bytes:
+                break
+            full_path = os.path.join(self.root, path)
+            try:
+                os.remove(full_path)
+            except FileNotFoundError:
+                pass  # Removed by hand; drop it from the catalog anyway
+            deleted.append((row_id,))
+            freed += size
+            self._remove_empty_dirs(os.path.dirname(full_path))
+        with self._lock:
+            self._db.executemany("DELETE FROM photos WHERE id = ?", deleted)
+            self._db.commit()
+            self.used_bytes -= freed
+        self.evicted += len(deleted)
+        self.evicted_bytes += freed
+        return len(deleted)
+
+    def _remove_empty_dirs(self, directory):
+        # Remove the day, month and year directories once they are
+        # empty. Days handed out by path_for() are kept: a photo may be
+        # about to be written there.
+        while directory != self.root and directory.startswith(self.root + os.sep):
+            if os.path.relpath(directory, self.root) in self._made_dirs:
+                return
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return  # Not empty
+            directory = os.path.dirname(directory)
+
+    def _evict_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            # Small batches, so add() and query() get the lock in between
+            while not self._closed and self.evict_once():
+                time.sleep(0)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._evictor.join(timeout=5)
+        with self._lock:
+            self._db.close()
+
+    # ---- Migration ----
+
+    def import_flat(self, directory, pattern="img_*.jpg"):
+        # Move photos from a flat directory (the old layout) into the
+        # date shards. Returns the number of photos imported.
+        imported = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not fnmatch.fnmatch(entry.name, pattern):
+                    continue
+                timestamp = _timestamp_from_name(entry.name) or entry.stat().st_mtime
+                target = os.path.join(os.path.dirname(self.path_for(timestamp)), entry.name)
+                os.replace(entry.path, target)
+                self.add(target, timestamp, trigger="import")
+                imported += 1
+        return imported
+
+
+def _timestamp_from_name(file_name):
+    # img_1724238000.123.jpg / img_1724238000.123_start.jpg -> 1724238000.123
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    try:
+        return float(stem.split("_")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _parse_time(text):
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the date-sharded photo store")
+    parser.add_argument("command", choices=["import", "stats", "query"])
+    parser.add_argument("root", nargs="?", default="/home/pi/Camera")
+    parser.add_argument("--since", help='e.g. "2026-10-01 00:00"')
+    parser.add_argument("--until", help='e.g. "2026-10-02 00:00"')
+    args = parser.parse_args()
+
+    store = PhotoStore(args.root)
+    try:
+        if args.command == "import":
+            start = time.perf_counter()
+            imported = store.import_flat(args.root)
+            print(f"{imported} photos imported in {time.perf_counter() - start:.1f}s")
+        elif args.command == "stats":
+            print(f"{store.count()} photos, {store.used_bytes / 1024 ** 2:.1f} MB")
+        else:
+            for path, t, size, trigger, zone in store.query(
+                    _parse_time(args.since) if args.since else None,
+                    _parse_time(args.until) if args.until else None):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t))
+                print(stamp, path, size, trigger or "", zone or "")
+    finally:
+        store.close()
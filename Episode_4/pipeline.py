@@ -0,0 +1,146 @@
+# pipeline.py
+#
+# Description:
+# A small staged pipeline made of worker threads joined by
+# bounded queues. Each Stage runs one function on every item
+# it receives and hands the result to the next stage, e.g.
+#   capture -> persist (log) -> notify (email)
+# so a slow SMTP round-trip only backs up the notify queue and
+# never stalls the PIR detector or the next capture.
+#
+# When a queue is full the stage applies its drop policy:
+# - BLOCK:       wait for room (backpressure on the producer)
+# - DROP_NEWEST: discard the incoming item
+# - DROP_OLDEST: discard the oldest queued item to make room
+#
+# Pipeline.close() drains the queues stage by stage, which is
+# what the scripts call on KeyboardInterrupt.
+#
+# j3 @ Oct, 2026
+
+import queue
+import threading
+import time
+import traceback
+
+BLOCK = "block"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+
+_STOP = object()
+
+
+class Stage:
+    def __init__(self, name, func, maxsize=8, policy=BLOCK, workers=1):
+        if policy not in (BLOCK, DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.name = name
+        self.func = func
+        self.policy = policy
+        self.workers = workers
+        self.next_stage = None
+        self.queue = queue.Queue(maxsize)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def put(self, item):
+        # Returns False when the item was dropped
+        if self.policy == BLOCK:
+            self.queue.put(item)
+            return True
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                if self.policy == DROP_NEWEST:
+                    self._count_drop()
+                    return False
+            # DROP_OLDEST: make room and try again
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count_drop()
+            except queue.Empty:
+                pass
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stop(self, timeout=None):
+        # Let the workers finish what is queued, then exit
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self.queue.put(_STOP, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                return False  # Workers are stuck; they are daemons and die with the process
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        alive = any(t.is_alive() for t in self._threads)
+        self._threads = []
+        return not alive
+
+    def _count_drop(self):
+        with self._lock:
+            self.dropped += 1
+        print(f"[{self.name}] queue full, item dropped")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                try:
+                    result = self.func(item)
+                except Exception:
+                    with self._lock:
+                        self.errors += 1
+                    print(f"[{self.name}] failed:")
+                    traceback.print_exc()
+                    continue
+                with self._lock:
+                    self.processed += 1
+                if result is not None and self.next_stage is not None:
+                    self.next_stage.put(result)
+            finally:
+                self.queue.task_done()
+
+
+class Pipeline:
+    def __init__(self, *stages):
+        self.stages = list(stages)
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.next_stage = next_stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, item):
+        return self.stages[0].put(item)
+
+    def close(self, timeout=None):
+        # Drain front to back so nothing is lost between stages.
+        # Returns False if some stage did not finish in time.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ok = True
+        for stage in self.stages:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ok = stage.stop(remaining) and ok
+        return ok
+
+    def stats(self):
+        return {s.name: {"processed": s.processed, "dropped": s.dropped,
+                         "errors": s.errors, "depth": s.depth()}
+                for s in self.stages}
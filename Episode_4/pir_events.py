@@ -0,0 +1,132 @@
+# pir_events.py
+#
+# Description:
+# Interrupt-driven PIR motion detector. Instead of the
+# time.sleep(0.01) + GPIO.input() polling loop used from cam6.py
+# to cam13.py, the PIR pin is watched with GPIO.add_event_detect().
+# Every rising/falling edge is timestamped the moment the GPIO
+# event thread wakes up and stored in a small edge history.
+# The sustained-motion (MOV_DETECT_THRESHOLD) and cooldown
+# (MIN_DURATION_BETWEEN_PHOTOS) rules (trigger_policy.py) are
+# evaluated from timers, so nothing runs while the PIR output is
+# stable and the LED is only written when the level changes.
+#
+# The GPIO backend is pluggable: pass RPi.GPIO on the Pi or
+# fake_gpio on a plain Linux box.
+#
+# j3 @ Oct, 2026
+
+import collections
+import threading
+import time
+from trigger_policy import TriggerPolicy, MOV_DETECT_THRESHOLD, MIN_DURATION_BETWEEN_PHOTOS
+
+Edge = collections.namedtuple("Edge", ["timestamp", "level"])
+
+
+class PirEdgeDetector:
+    def __init__(self, gpio, pir_pin, on_trigger, led_pin=None,
+                 threshold=MOV_DETECT_THRESHOLD,
+                 min_interval=MIN_DURATION_BETWEEN_PHOTOS,
+                 bouncetime=None, history=256, clock=time.monotonic, on_edge=None):
+        # on_trigger(movement_timer) is called from a timer thread
+        # with the timestamp of the rising edge that started the motion.
+        # on_edge(level, timestamp), if given, is called from the GPIO
+        # thread for every real level change (e.g. to count edges).
+        self.gpio = gpio
+        self.pir_pin = pir_pin
+        self.led_pin = led_pin
+        self.on_trigger = on_trigger
+        self.on_edge = on_edge
+        self.policy = TriggerPolicy(threshold, min_interval)
+        self.bouncetime = bouncetime
+        self.clock = clock
+        self.edges = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._timer = None
+        self._generation = 0  # Bumped on every edge to invalidate stale timers
+        self._started = False
+
+    @property
+    def movement_timer(self):
+        # Timestamp of the last rising edge
+        return self.policy.movement_timer
+
+    @property
+    def last_time_photo_taken(self):
+        return self.policy.last_trigger
+
+    @property
+    def triggers(self):
+        return self.policy.triggers
+
+    def start(self):
+        gpio = self.gpio
+        gpio.setup(self.pir_pin, gpio.IN)
+        if self.led_pin is not None:
+            gpio.setup(self.led_pin, gpio.OUT)
+            gpio.output(self.led_pin, gpio.LOW)
+        kwargs = {"callback": self._on_edge}
+        if self.bouncetime:
+            kwargs["bouncetime"] = self.bouncetime
+        gpio.add_event_detect(self.pir_pin, gpio.BOTH, **kwargs)
+        self._started = True
+        # The pin may already be high when we start watching it
+        if gpio.input(self.pir_pin) == gpio.HIGH:
+            self._on_edge(self.pir_pin)
+
+    def stop(self):
+        if self._started:
+            self.gpio.remove_event_detect(self.pir_pin)
+            self._started = False
+        with self._lock:
+            self._generation += 1
+            self._cancel_timer()
+
+    def motion(self):
+        # True while the PIR output is high
+        return bool(self.edges) and self.edges[-1].level == self.gpio.HIGH
+
+    def _on_edge(self, channel):
+        timestamp = self.clock()
+        # RPi.GPIO does not say which edge fired with BOTH, so read it back
+        level = self.gpio.input(channel)
+        with self._lock:
+            if self.edges and self.edges[-1].level == level:
+                return  # Bounce or a duplicate event, nothing changed
+            self.edges.append(Edge(timestamp, level))
+            self._generation += 1
+            self._cancel_timer()
+            deadline = self.policy.edge(timestamp, level == self.gpio.HIGH)
+            if deadline is not None:
+                self._schedule(deadline)
+        # Activate LED when movement is detected.
+        if self.led_pin is not None:
+            self.gpio.output(self.led_pin, level)
+        if self.on_edge is not None:
+            self.on_edge(level, timestamp)
+
+    def _schedule(self, deadline):
+        # Must be called with self._lock held
+        generation = self._generation
+        delay = max(0.0, deadline - self.clock())
+        self._timer = threading.Timer(delay, self._on_timer, args=(generation,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self, generation):
+        with self._lock:
+            if generation != self._generation:
+                return  # An edge arrived after this timer was armed
+            # While cooling down the policy asks to look again once the
+            # cooldown ends, as long as the motion is sustained
+            fired, deadline = self.policy.deadline(self.clock())
+            self._schedule(deadline)
+            movement_timer = self.policy.movement_timer
+        if fired:
+            self.on_trigger(movement_timer)
@@ -0,0 +1,103 @@
+# sketch.py
+#
+# Description:
+# Fast pencil-sketch filter. Episode_1/cam4.py saves the capture
+# to toProcess.jpg, reads it back with cv2.imread and runs a
+# 125x125 cv2.GaussianBlur at full resolution, which takes
+# seconds on a Pi. SketchFilter works on the frame array straight
+# from Picamera2 and approximates the big blur, with a choice of
+# accuracy/speed trade-off:
+# - EXACT:     the full-resolution GaussianBlur, as in cam4.py
+# - BOX:       three passes of a box blur (cv2.blur costs the same
+#              whatever the kernel size) with the same spread
+# - DOWNSCALE: shrink by `factor`, blur the small image, and
+#              scale the result back up (the fastest)
+# Buffers are allocated once per frame size, so the filter can run
+# as a pre_callback on the live preview.
+#
+# j3 @ Oct, 2026
+
+import math
+import cv2
+import numpy as np
+
+EXACT = "exact"
+BOX = "box"
+DOWNSCALE = "downscale"
+
+
+def gaussian_sigma(ksize):
+    # The sigma OpenCV uses for GaussianBlur(..., (ksize, ksize), 0)
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
+
+
+class SketchFilter:
+    def __init__(self, ksize=125, mode=DOWNSCALE, factor=4, box_passes=3):
+        if mode not in (EXACT, BOX, DOWNSCALE):
+            raise ValueError(f"Unknown sketch mode: {mode}")
+        self.ksize = ksize
+        self.mode = mode
+        self.factor = factor
+        self.box_passes = box_passes
+        self.sigma = gaussian_sigma(ksize)
+        # Box width whose repeated passes match the Gaussian spread
+        box = math.sqrt(12 * self.sigma ** 2 / box_passes + 1)
+        self.box = int(box) | 1
+        self._shape = None
+
+    def _allocate(self, shape):
+        height, width = shape
+        self._shape = shape
+        self.grey = np.empty(shape, dtype=np.uint8)
+        self.inverted = np.empty(shape, dtype=np.uint8)
+        self.blurred = np.empty(shape, dtype=np.uint8)
+        self.sketch = np.empty(shape, dtype=np.uint8)
+        small = (max(1, width // self.factor), max(1, height // self.factor))
+        self.small = np.empty((small[1], small[0]), dtype=np.uint8)
+        self.small_blurred = np.empty((small[1], small[0]), dtype=np.uint8)
+
+    def _blur(self, src, dst):
+        if self.mode == EXACT:
+            cv2.GaussianBlur(src, (self.ksize, self.ksize), 0, dst=dst)
+        elif self.mode == BOX:
+            cv2.blur(src, (self.box, self.box), dst=dst)
+            for _ in range(self.box_passes - 1):
+                cv2.blur(dst, (self.box, self.box), dst=dst)
+        else:
+            height, width = self.small.shape
+            cv2.resize(src, (width, height), dst=self.small, interpolation=cv2.INTER_AREA)
+            sigma = self.sigma / self.factor
+            cv2.GaussianBlur(self.small, (0, 0), sigma, dst=self.small_blurred)
+            cv2.resize(self.small_blurred, (src.shape[1], src.shape[0]), dst=dst,
+                       interpolation=cv2.INTER_LINEAR)
+
+    def process(self, frame):
+        # frame: 3 or 4 channel array from Picamera2 (or OpenCV BGR),
+        # or an already grey image. Returns the grey sketch (a buffer
+        # owned by the filter, overwritten by the next call).
+        if frame.shape[:2] != self._shape:
+            self._allocate(frame.shape[:2])
+        if frame.ndim == 2:
+            np.copyto(self.grey, frame)
+        elif frame.shape[2] == 4:
+            # Picamera2 XBGR8888 is R, G, B, 255 in memory
+            cv2.cvtColor(frame, cv2.COLOR_RGBA2GRAY, dst=self.grey)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.grey)
+        # Same steps as cam4.py
+        cv2.bitwise_not(self.grey, dst=self.inverted)
+        self._blur(self.inverted, self.blurred)
+        cv2.bitwise_not(self.blurred, dst=self.blurred)
+        cv2.divide(self.grey, self.blurred, dst=self.sketch, scale=256)
+        return self.sketch
+
+    def apply(self, request, stream="main"):
+        # pre_callback: replace the stream contents with the sketch
+        from picamera2 import MappedArray
+        with MappedArray(request, stream) as m:
+            sketch = self.process(m.array)
+            if m.array.ndim == 2:
+                np.copyto(m.array, sketch)
+            else:
+                # Same grey value in the colour channels
+                m.array[:, :, :3] = sketch[:, :, None]
@@ -0,0 +1,193 @@
+# smtp_pool.py
+#
+# Description:
+# A small pool of authenticated SMTP sessions for the photo
+# alerts. cam13.py keeps one yagmail.SMTP object for the whole
+# run: it dies after the server's idle timeout and cannot be
+# shared between threads. SmtpPool instead:
+# - opens up to `size` sessions (STARTTLS + login) on demand
+# - checks a session with NOOP before reusing it when it has
+#   been idle for a while, and reconnects when it is dead
+# - retries a send once on a fresh session if the server
+#   dropped the connection mid-way
+# - can push several queued alerts through one session
+#
+# It only uses smtplib and email from the standard library.
+#
+# j3 @ Oct, 2026
+
+import contextlib
+import mimetypes
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+from email.message import EmailMessage
+
+GMAIL_HOST = "smtp.gmail.com"
+GMAIL_PORT = 587
+
+# Errors that say nothing about the message itself
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                     smtplib.SMTPAuthenticationError, smtplib.SMTPHeloError)
+
+
+def connection_error(error):
+    # Every SMTPException is an OSError; only the socket ones count here
+    return isinstance(error, CONNECTION_ERRORS) or (
+        isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException))
+
+
+def build_alert(from_email, to_email, file_name,
+                subject="Movement detected!",
+                contents="Here's a photo taken by your Raspberry Pi"):
+    # file_name may be a single path or a list of paths
+    msg = EmailMessage()
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(contents)
+    file_names = [file_name] if isinstance(file_name, str) else list(file_name or [])
+    for file_name in file_names:
+        ctype, _ = mimetypes.guess_type(file_name)
+        maintype, subtype = (ctype or "application/octet-stream").split("/", 1)
+        with open(file_name, "rb") as f:
+            msg.add_attachment(f.read(), maintype=maintype, subtype=subtype,
+                               filename=os.path.basename(file_name))
+    return msg
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+        self.sent = 0
+
+
+class SmtpPool:
+    def __init__(self, user, password, host=GMAIL_HOST, port=GMAIL_PORT,
+                 size=2, starttls=True, idle_check=30.0, timeout=30.0):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.size = size
+        self.starttls = starttls
+        self.idle_check = idle_check  # Seconds idle before a NOOP health check
+        self.timeout = timeout
+        self.connects = 0
+        self.reconnects = 0
+        self._idle = queue.LifoQueue()  # Most recently used session first
+        self._open = 0
+        self._lock = threading.Condition()
+        self._closed = False
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls(context=ssl.create_default_context())
+            if self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self.connects += 1
+        return _Session(smtp)
+
+    def _healthy(self, session):
+        if time.monotonic() - session.last_used < self.idle_check:
+            return True
+        try:
+            return session.smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = None
+            if session is not None:
+                if self._healthy(session):
+                    return session
+                self._discard(session)
+                self.reconnects += 1
+                continue
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("SMTP pool is closed")
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                # Every session is busy: wait for one to come back
+                self._lock.wait(1.0)
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, session, broken=False):
+        if broken or self._closed:
+            self._discard(session)
+            return
+        session.last_used = time.monotonic()
+        self._idle.put(session)
+        with self._lock:
+            self._lock.notify()
+
+    def _discard(self, session):
+        try:
+            session.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            session.smtp.close()
+        with self._lock:
+            self._open -= 1
+            self._lock.notify()
+
+    @contextlib.contextmanager
+    def session(self):
+        session = self.acquire()
+        broken = False
+        try:
+            yield session
+        except Exception as e:
+            # A refused recipient or message leaves the session usable
+            broken = connection_error(e)
+            raise
+        finally:
+            self.release(session, broken)
+
+    def send(self, msg):
+        self.send_many([msg])
+
+    def send_many(self, msgs):
+        # Send a batch over one session; reconnect once if it drops
+        pending = list(msgs)
+        for attempt in range(2):
+            try:
+                with self.session() as session:
+                    while pending:
+                        session.smtp.send_message(pending[0])
+                        session.sent += 1
+                        pending.pop(0)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if attempt == 1:
+                    raise
+                self.reconnects += 1
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,110 @@
+# startup.py
+#
+# Description:
+# Helpers for a fast cold start. Up to cam26.py the scripts import
+# cv2, picamera2 and libcamera first, start the camera, sleep a
+# fixed 2 s "to allow the camera to stabilize", and only then open
+# the SMTP session and set up the GPIOs, one after the other, while
+# the house is unwatched.
+# - BringUp runs the independent setup steps (camera, SMTP, GPIO,
+#   storage...) on parallel threads, each doing its own heavy
+#   imports, and records how long every step took.
+# - wait_for_convergence() replaces the fixed sleep: it reads the
+#   frame metadata until the exposure (AE) and white balance (AWB)
+#   have settled, which usually takes a few hundred milliseconds,
+#   with a timeout as a safety net.
+# - seconds_since_exec() measures from the moment the process was
+#   started (before the interpreter even loaded), so the "armed"
+#   time covers everything a restart costs.
+#
+# Usage:
+#   bring_up = BringUp()
+#   bring_up.add("camera", start_camera)
+#   bring_up.add("smtp", open_smtp)
+#   results = bring_up.run()
+#   print(bring_up.describe())
+#
+# j3 @ Oct, 2026
+
+import concurrent.futures
+import os
+import time
+
+_IMPORTED = time.monotonic()
+
+
+def seconds_since_exec():
+    # Time since this process was started, from /proc (Linux only);
+    # falls back to the time since this module was imported
+    try:
+        with open("/proc/self/stat", encoding="ascii") as f:
+            # Field 22 is the start time in clock ticks after boot; the
+            # command name (field 2) may contain spaces, so split after it
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", encoding="ascii") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _IMPORTED
+
+
+class BringUp:
+    def __init__(self):
+        self.steps = {}
+        self.timings = {}  # name -> (start, end), seconds since exec
+
+    def add(self, name, func, *args):
+        self.steps[name] = (func, args)
+
+    def _timed(self, name, func, args):
+        start = seconds_since_exec()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] = (start, seconds_since_exec())
+
+    def run(self):
+        # Runs every step at once; returns {name: result}. The first
+        # failure is raised once all the steps have finished.
+        with concurrent.futures.ThreadPoolExecutor(len(self.steps) or 1,
+                                                   thread_name_prefix="bring-up") as pool:
+            futures = {name: pool.submit(self._timed, name, func, args)
+                       for name, (func, args) in self.steps.items()}
+            concurrent.futures.wait(futures.values())
+        return {name: future.result() for name, future in futures.items()}
+
+    def describe(self):
+        return ", ".join(f"{name} {start:.2f}-{end:.2f}s"
+                         for name, (start, end) in sorted(self.timings.items(), key=lambda item: item[1]))
+
+
+def _close(a, b, tolerance):
+    return abs(a - b) <= tolerance * max(abs(a), abs(b), 1e-9)
+
+
+def wait_for_convergence(picam2, timeout=2.0, stable_frames=3, tolerance=0.03):
+    # Wait until AE and AWB have settled. Uses AeLocked when the
+    # camera reports it; otherwise the exposure (ExposureTime x
+    # AnalogueGain) and the colour gains must stay within `tolerance`
+    # for `stable_frames` frames in a row.
+    # Returns (converged, seconds waited, frames read).
+    start = time.monotonic()
+    frames = stable = 0
+    previous = None
+    while time.monotonic() - start < timeout:
+        metadata = picam2.capture_metadata()
+        frames += 1
+        exposure = metadata.get("ExposureTime", 0) * metadata.get("AnalogueGain", 1.0)
+        gains = metadata.get("ColourGains", (1.0, 1.0))
+        if previous is not None and _close(exposure, previous[0], tolerance) \
+                and all(_close(g, p, tolerance) for g, p in zip(gains, previous[1])):
+            stable += 1
+        else:
+            stable = 0
+        previous = (exposure, gains)
+        locked = metadata.get("AeLocked")
+        # AeLocked says nothing about AWB, so the gains must also have
+        # stopped moving since the previous frame
+        if (locked and stable >= 1) or (locked is None and stable >= stable_frames):
+            return True, time.monotonic() - start, frames
+    return False, time.monotonic() - start, frames
@@ -0,0 +1,355 @@
+# timelapse.py
+#
+# Description:
+# Long-running time-lapse from the running camera. Episode_1/cam2.py
+# can only record 5 s of video in one go; here a frame is sampled
+# every `interval` seconds, for hours or months, and appended to a
+# segmented video as it comes:
+# - TimeLapse runs a thread that grabs the next frame of the live
+#   stream once per interval (into a preallocated buffer, so the
+#   camera keeps streaming), encodes it to JPEG and hands it to
+#   the writer. The schedule follows the wall clock and carries
+#   over a restart; samples that could not be taken on time are
+#   skipped, not bunched up.
+# - TimeLapseWriter appends the JPEGs to segment files that are
+#   plain MJPEG streams (JPEG after JPEG, playable with ffplay,
+#   mpv or VLC, and turned into .mkv/.avi without re-encoding by
+#   "export"), one segment per `segment_seconds`. Next to every
+#   segment, an index file has one "timestamp offset length" line
+#   per frame, written after the frame itself.
+# - Nothing is held in memory and nothing is ever re-encoded: a
+#   frame costs one JPEG encode and two appends, whether the
+#   time-lapse is one hour or one month old.
+# - After a restart (or a crash) the last segment is resumed: index
+#   lines pointing past the end of the data and data past the last
+#   indexed frame (a frame cut short) are dropped, then appending
+#   goes on where it stopped.
+# - Optional disk quota: the oldest segments are deleted past
+#   `max_bytes`.
+#
+# Usage:
+#   writer = TimeLapseWriter("/home/pi/Camera/timelapse", segment_seconds=86400)
+#   timelapse = TimeLapse(picam2, writer, interval=60).start()
+#   ...
+#   timelapse.close()
+# or from the shell:
+#   python3 timelapse.py info /home/pi/Camera/timelapse
+#   python3 timelapse.py export /home/pi/Camera/timelapse out.mkv --fps 25 --since "2026-10-01 00:00"
+#
+# j3 @ Oct, 2026
+
+import argparse
+import os
+import shutil
+import subprocess
+import threading
+import time
+import cv2
+import numpy as np
+
+SEGMENT_PREFIX = "timelapse-"
+SEGMENT_SUFFIX = ".mjpeg"
+INDEX_SUFFIX = ".idx"
+
+
+class TimeLapseWriter:
+    def __init__(self, directory, segment_seconds=86400, max_bytes=None, fsync_every=10, clock=time.time):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.fsync_every = fsync_every
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        os.makedirs(directory, exist_ok=True)
+
+        # Segment number -> timestamp of its first frame
+        self.segments = {}
+        self.total_bytes = 0
+        for name in os.listdir(directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                number = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+                self.segments[number] = _first_timestamp(self._path(number, INDEX_SUFFIX))
+                self.total_bytes += os.path.getsize(self._path(number))
+        self._open_segment(max(self.segments) if self.segments else 1)
+
+    # ---- Files ----
+
+    def _path(self, number, suffix=SEGMENT_SUFFIX):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:06d}{suffix}")
+
+    def _open_segment(self, number):
+        path = self._path(number)
+        index_path = self._path(number, INDEX_SUFFIX)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        # Walk the index once, keeping only the last good line
+        good = index_good = 0
+        frames = 0
+        last_t = None
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                for line in f:
+                    parts = line.split()
+                    if not line.endswith(b"\n") or len(parts) != 3:
+                        break  # Cut short by a crash
+                    t, offset, length = float(parts[0]), int(parts[1]), int(parts[2])
+                    if offset != good or offset + length > size:
+                        break  # The frame never fully reached the disk
+                    good = offset + length
+                    index_good += len(line)
+                    frames += 1
+                    last_t = t
+        # Drop whatever is past the last complete frame
+        for file_name, end in ((path, good), (index_path, index_good)):
+            with open(file_name, "ab") as f:
+                f.truncate(end)
+        self.total_bytes -= size - good
+        self.number = number
+        self.size = good
+        self.frames = frames
+        self.last_t = last_t
+        if frames == 0:
+            self.segments[number] = None
+        self._file = open(path, "ab")
+        self._index_file = open(index_path, "ab")
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._index_file.close()
+        self._open_segment(self.number + 1)
+        self._enforce_quota()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        # Index after the data it points to
+        self._index_file.flush()
+        os.fsync(self._index_file.fileno())
+        self._unsynced = 0
+
+    def _enforce_quota(self):
+        while self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self.segments) > 1:
+            oldest = min(self.segments)
+            self.total_bytes -= os.path.getsize(self._path(oldest))
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(self._path(oldest, suffix))
+                except FileNotFoundError:
+                    pass
+            del self.segments[oldest]
+
+    # ---- Writing ----
+
+    def append(self, jpeg, timestamp=None):
+        # One encoded frame (bytes-like), stamped with wall-clock time
+        timestamp = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            first = self.segments.get(self.number)
+            if first is not None and timestamp - first >= self.segment_seconds:
+                self._rotate()
+            if self.segments.get(self.number) is None:
+                self.segments[self.number] = timestamp
+            self._file.write(jpeg)
+            self._file.flush()
+            self._index_file.write(f"{timestamp!r} {self.size} {len(jpeg)}\n".encode("ascii"))
+            self._index_file.flush()
+            self.size += len(jpeg)
+            self.total_bytes += len(jpeg)
+            self.frames += 1
+            self.last_t = timestamp
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                self._sync()
+            if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+                self._enforce_quota()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+            self._index_file.close()
+
+    # ---- Reading ----
+
+    def frames_between(self, start=None, end=None):
+        # (timestamp, jpeg) of the frames with start <= t <= end, oldest
+        # first, read one at a time
+        with self._lock:
+            self._file.flush()
+            self._index_file.flush()
+            numbers = sorted(self.segments)
+        return read_frames(self.directory, numbers, start, end)
+
+
+def _first_timestamp(index_path):
+    try:
+        with open(index_path, "rb") as f:
+            line = f.readline().split()
+        return float(line[0]) if len(line) == 3 else None
+    except FileNotFoundError:
+        return None
+
+
+def segment_numbers(directory):
+    return sorted(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+                  if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+
+def read_frames(directory, numbers=None, start=None, end=None):
+    numbers = segment_numbers(directory) if numbers is None else numbers
+    for number in numbers:
+        path = os.path.join(directory, f"{SEGMENT_PREFIX}{number:06d}")
+        try:
+            data = open(path + SEGMENT_SUFFIX, "rb")
+            index = open(path + INDEX_SUFFIX, "rb")
+        except FileNotFoundError:
+            continue  # Deleted by the quota meanwhile
+        with data, index:
+            for line in index:
+                parts = line.split()
+                if len(parts) != 3:
+                    break
+                t, offset, length = float(parts[0]), int(parts[1]), int(parts[2])
+                if start is not None and t < start:
+                    continue
+                if end is not None and t > end:
+                    return
+                data.seek(offset)
+                jpeg = data.read(length)
+                if len(jpeg) < length:
+                    break
+                yield t, jpeg
+
+
+class TimeLapse:
+    def __init__(self, picam2, writer, interval=60.0, quality=85, stream="main", clock=time.time):
+        self.picam2 = picam2
+        self.writer = writer
+        self.interval = interval
+        self.quality = quality
+        self.stream = stream
+        self.clock = clock
+        self._buffer = None  # Allocated on the first frame, reused after
+        self._stop = threading.Event()
+        self._thread = None
+        self.frames = 0
+        self.skipped = 0
+        self.encode_seconds = 0.0
+
+    def describe(self):
+        mean = self.encode_seconds / self.frames * 1000 if self.frames else 0.0
+        return (f"Time-lapse every {self.interval:g} s: {self.frames} frames, {self.skipped} skipped, "
+                f"{mean:.1f} ms per frame, segment {self.writer.number} ({self.writer.frames} frames), "
+                f"{self.writer.total_bytes / 1024 ** 2:.1f} MB on disk")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="timelapse", daemon=True)
+        self._thread.start()
+        return self
+
+    def sample(self):
+        # Grab, encode and append one frame
+        from picamera2 import MappedArray
+        request = self.picam2.capture_request()
+        try:
+            with MappedArray(request, self.stream, write=False) as m:
+                if self._buffer is None:
+                    self._buffer = np.empty_like(m.array)
+                np.copyto(self._buffer, m.array)
+        finally:
+            request.release()
+        start = time.perf_counter()
+        frame = self._buffer
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise IOError("JPEG encoding failed")
+        self.writer.append(jpeg.data)
+        self.encode_seconds += time.perf_counter() - start
+        self.frames += 1
+
+    def _run(self):
+        # Next sample one interval after the last frame on disk, even
+        # if that frame was written before a restart
+        last = self.writer.last_t
+        next_time = self.clock() if last is None else max(last + self.interval, self.clock())
+        while not self._stop.wait(max(0.0, next_time - self.clock())):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Time-lapse frame failed: {e!r}")
+            next_time += self.interval
+            now = self.clock()
+            if next_time < now:
+                # Fell behind (or the clock jumped): skip to the next slot
+                missed = int((now - next_time) // self.interval) + 1
+                self.skipped += missed
+                next_time += missed * self.interval
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.writer.close()
+
+
+def export(directory, file_name, fps=25, start=None, end=None):
+    # Copies the frames into a video container with ffmpeg, without
+    # re-encoding; returns the number of frames
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("export needs ffmpeg (sudo apt install ffmpeg)")
+    process = subprocess.Popen([ffmpeg, "-loglevel", "error", "-y", "-f", "mjpeg", "-framerate", str(fps),
+                                "-i", "-", "-c", "copy", file_name], stdin=subprocess.PIPE)
+    count = 0
+    try:
+        for _, jpeg in read_frames(directory, start=start, end=end):
+            process.stdin.write(jpeg)
+            count += 1
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed with code {process.returncode}")
+    return count
+
+
+def _parse_time(text):
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M")) if text else None
+
+
+def _format_time(t):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) if t is not None else "-"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and export time-lapse segments")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("info", help="list the segments")
+    p.add_argument("directory")
+    p = commands.add_parser("export", help="write the frames to a video file (needs ffmpeg)")
+    p.add_argument("directory")
+    p.add_argument("output", help="e.g. out.mkv or out.avi")
+    p.add_argument("--fps", type=float, default=25)
+    p.add_argument("--since", help='"YYYY-MM-DD HH:MM"')
+    p.add_argument("--until", help='"YYYY-MM-DD HH:MM"')
+    args = parser.parse_args()
+
+    if args.command == "info":
+        for number in segment_numbers(args.directory):
+            path = os.path.join(args.directory, f"{SEGMENT_PREFIX}{number:06d}")
+            first = last = None
+            frames = 0
+            with open(path + INDEX_SUFFIX, "rb") as f:
+                for line in f:
+                    t = float(line.split()[0])
+                    first = t if first is None else first
+                    last = t
+                    frames += 1
+            print(f"{number:6d}  {_format_time(first)} .. {_format_time(last)}  {frames:6d} frames  "
+                  f"{os.path.getsize(path + SEGMENT_SUFFIX) / 1024 ** 2:8.1f} MB")
+    else:
+        start = time.perf_counter()
+        count = export(args.directory, args.output, args.fps, _parse_time(args.since), _parse_time(args.until))
+        print(f"{count} frames written to {args.output} in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,264 @@
+# trigger_policy.py
+#
+# Description:
+# The sustained-motion / cooldown rules, in one place. cam6.py to
+# cam13.py each carry their own copy of the polling version, and
+# pir_events.py and zones.py had their own timer versions, with
+# MOV_DETECT_THRESHOLD and MIN_DURATION_BETWEEN_PHOTOS picked by
+# hand (5 s in some scripts, 60 s in others).
+# - TriggerPolicy is the state machine on its own, with no clock,
+#   no timer and no GPIO: edge() is told about every PIR level
+#   change and says when a timer should fire, deadline() is told
+#   the timer fired and says whether to take a photo. The live
+#   detectors (PirEdgeDetector, zones.Zone) drive it from their
+#   timers; replay() drives it over a recorded trace.
+# - sweep() evaluates a whole grid of thresholds x cooldowns over a
+#   recorded trace at once: the trace is reduced to its high
+#   intervals and walked once, with every setting of the grid held
+#   in NumPy arrays, so days of traces take a fraction of a second
+#   for hundreds of settings. It gives the same triggers as replay().
+# For every setting it reports the triggers, the alert volume (per
+# day and worst hour), and the motion episodes (highs less than
+# `merge_gap` apart, lasting at least `min_event` seconds) that got
+# no alert at all, i.e. missed events (including the ones that fell
+# in the cooldown of an earlier alert), plus the mean delay from the
+# start of an episode to its first alert.
+# Traces are the CSV files of fake_gpio.py ("seconds,level"); the
+# "record" command writes one from the real PIR.
+#
+# Usage:
+#   python3 trigger_policy.py record --pin 4 pir_trace.csv
+#   python3 trigger_policy.py sweep pir_trace.csv --thresholds 0.5,1,2,3,5 --cooldowns 5,10,30,60
+#
+# j3 @ Oct, 2026
+
+import argparse
+import csv
+import time
+import numpy as np
+
+MOV_DETECT_THRESHOLD = 3.0  # Time threshold for sustained motion
+MIN_DURATION_BETWEEN_PHOTOS = 60.0  # Minimum time between two photos (in seconds)
+
+
+class TriggerPolicy:
+    def __init__(self, threshold=MOV_DETECT_THRESHOLD, cooldown=MIN_DURATION_BETWEEN_PHOTOS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.high = False
+        self.movement_timer = None  # Timestamp of the last rising edge
+        self.last_trigger = None
+        self.triggers = 0
+
+    def edge(self, timestamp, high):
+        # A level change. Returns when the timer should fire, or None
+        # for no timer (any pending timer is cancelled either way).
+        self.high = high
+        if not high:
+            return None
+        self.movement_timer = timestamp
+        return timestamp + self.threshold
+
+    def deadline(self, now):
+        # The timer fired at `now` with the motion still on.
+        # Returns (take a photo?, when the timer should fire next).
+        # Same sum as the deadline handed back below (now - last_trigger
+        # can round to just under the cooldown, and replay() would get
+        # that deadline back forever)
+        if self.last_trigger is not None and now < self.last_trigger + self.cooldown:
+            # Still cooling down: look again once the cooldown ends
+            return False, self.last_trigger + self.cooldown
+        self.last_trigger = now
+        self.triggers += 1
+        return True, now + self.cooldown
+
+    def replay(self, edges, end=None):
+        # Offline run over (timestamp, level) edges, timers firing on
+        # time; returns the trigger times. `end` is when the trace
+        # stops (default: the last edge).
+        times = []
+        deadline = None
+        last_level = None
+        end = edges[-1][0] if end is None and len(edges) else end
+        for timestamp, level in list(edges) + [(end, None)]:
+            while deadline is not None and deadline < timestamp:
+                fired, deadline = self.deadline(deadline)
+                if fired:
+                    times.append(self.last_trigger)
+            if level is None or level == last_level:
+                continue  # End of the trace, or a duplicate edge
+            last_level = level
+            deadline = self.edge(timestamp, bool(level))
+        return times
+
+
+def intervals(edges, end=None):
+    # (rises, falls) arrays of the high periods of a trace; a trace
+    # ending high is cut at `end`
+    rises, falls = [], []
+    level = 0
+    for timestamp, new in edges:
+        new = 1 if new else 0
+        if new == level:
+            continue
+        (rises if new else falls).append(timestamp)
+        level = new
+    if level:
+        falls.append(edges[-1][0] if end is None else end)
+    return np.array(rises, dtype=np.float64), np.array(falls, dtype=np.float64)
+
+
+def sweep(edges, thresholds, cooldowns, end=None, merge_gap=10.0, min_event=2.0):
+    # Every threshold x cooldown over one trace. Returns a dict of
+    # (len(thresholds), len(cooldowns)) arrays.
+    rises, falls = intervals(edges, end)
+    th, cd = np.meshgrid(np.asarray(thresholds, dtype=np.float64),
+                         np.asarray(cooldowns, dtype=np.float64), indexing="ij")
+    if np.any(cd <= 0):
+        raise ValueError("Cooldowns must be positive")
+    shape = th.shape
+    th, cd = th.ravel(), cd.ravel()
+
+    start = rises[0] if len(rises) else 0.0
+    stop = falls[-1] if len(falls) else start
+    hours = np.zeros((int((stop - start) // 3600) + 1, th.size), dtype=np.int64)
+    last = np.full(th.size, -np.inf)  # Time of the last trigger
+    triggers = np.zeros(th.size, dtype=np.int64)
+    missed = np.zeros(th.size, dtype=np.int64)
+    delay_sum = np.zeros(th.size)
+    delayed = np.zeros(th.size, dtype=np.int64)
+    first = np.full(th.size, np.inf)  # First trigger in the current episode
+    events = 0
+    episode_start = episode_end = None
+
+    def close_episode():
+        nonlocal events
+        if episode_end - episode_start < min_event:
+            return  # A blip, not an event
+        events += 1
+        hit = first < np.inf
+        missed[:] += ~hit
+        delay_sum[hit] += first[hit] - episode_start
+        delayed[:] += hit
+
+    columns = np.arange(th.size)
+    for rise, fall in zip(rises.tolist(), falls.tolist()):
+        if episode_start is None or rise - episode_end >= merge_gap:
+            if episode_start is not None:
+                close_episode()
+            episode_start = rise
+            first[:] = np.inf
+        episode_end = fall
+        # First timer firing in this high period, then one per cooldown
+        candidate = np.maximum(rise + th, last + cd)
+        n = np.where(candidate < fall, np.ceil((fall - candidate) / cd), 0).astype(np.int64)
+        fired = n > 0
+        last = np.where(fired, candidate + (n - 1) * cd, last)
+        first = np.where(fired & (first == np.inf), candidate, first)
+        triggers += n
+        # Each trigger in the hour it fired in: a long stay can run over
+        # the end of the hour its high period started in
+        first_hour = ((candidate - start) // 3600).astype(np.int64)
+        last_hour = ((np.where(fired, last, candidate) - start) // 3600).astype(np.int64)
+        same = fired & (first_hour == last_hour)
+        hours[first_hour[same], columns[same]] += n[same]
+        for j in np.flatnonzero(fired & ~same):
+            fire_times = candidate[j] + np.arange(n[j]) * cd[j]
+            np.add.at(hours[:, j], ((fire_times - start) // 3600).astype(np.int64), 1)
+    if episode_start is not None:
+        close_episode()
+
+    days = max((stop - start) / 86400, 1 / 24)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_delay = delay_sum / delayed
+    return {
+        "thresholds": np.asarray(thresholds), "cooldowns": np.asarray(cooldowns),
+        "triggers": triggers.reshape(shape),
+        "per_day": (triggers / days).reshape(shape),
+        "worst_hour": hours.max(axis=0).reshape(shape),
+        "events": events,
+        "missed": missed.reshape(shape),
+        "mean_delay": mean_delay.reshape(shape),
+        "days": days,
+        "highs": len(rises),
+    }
+
+
+def format_sweep(result):
+    lines = [f"{result['days']:.1f} days, {result['highs']} PIR highs, {result['events']} motion episodes",
+             f"{'threshold':>9} {'cooldown':>8} {'triggers':>8} {'per day':>8} {'worst h':>7} "
+             f"{'missed':>6} {'delay':>6}"]
+    for i, threshold in enumerate(result["thresholds"]):
+        for j, cooldown in enumerate(result["cooldowns"]):
+            lines.append(f"{threshold:>8.1f}s {cooldown:>7.0f}s {result['triggers'][i, j]:>8} "
+                         f"{result['per_day'][i, j]:>8.1f} {result['worst_hour'][i, j]:>7} "
+                         f"{result['missed'][i, j]:>6} {result['mean_delay'][i, j]:>5.1f}s")
+    return "\n".join(lines)
+
+
+def load_traces(file_names):
+    # Several trace files one after the other, as one trace
+    from fake_gpio import load_trace
+    edges, offset = [], 0.0
+    for file_name in file_names:
+        trace = load_trace(file_name)
+        edges += [(offset + t, level) for t, level in trace]
+        if trace:
+            offset += trace[-1][0]
+    return edges
+
+
+def record(pin, file_name):
+    # Append every PIR level change to `file_name` until Ctrl+C
+    import RPi.GPIO as GPIO
+    GPIO.setmode(GPIO.BCM)
+    GPIO.setup(pin, GPIO.IN)
+    start = time.monotonic()
+    with open(file_name, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["seconds", "level"])
+        writer.writerow(["0.000000", GPIO.input(pin)])
+
+        def on_edge(channel):
+            writer.writerow([f"{time.monotonic() - start:.6f}", GPIO.input(channel)])
+            f.flush()
+
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=on_edge)
+        print(f"Recording PIR pin {pin} to {file_name}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            writer.writerow([f"{time.monotonic() - start:.6f}", GPIO.input(pin)])
+        finally:
+            GPIO.cleanup()
+
+
+def _floats(text):
+    return [float(x) for x in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record PIR traces and tune the trigger policy on them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("record", help="record the PIR output to a trace file")
+    p.add_argument("--pin", type=int, default=4)
+    p.add_argument("trace")
+    p = commands.add_parser("sweep", help="evaluate thresholds x cooldowns over trace files")
+    p.add_argument("traces", nargs="+")
+    p.add_argument("--thresholds", type=_floats, default=[0.5, 1, 2, 3, 5])
+    p.add_argument("--cooldowns", type=_floats, default=[5, 10, 30, 60, 120])
+    p.add_argument("--merge-gap", type=float, default=10.0)
+    p.add_argument("--min-event", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.pin, args.trace)
+    else:
+        edges = load_traces(args.traces)
+        start = time.perf_counter()
+        result = sweep(edges, args.thresholds, args.cooldowns,
+                       merge_gap=args.merge_gap, min_event=args.min_event)
+        print(format_sweep(result))
+        print(f"Sweep of {len(args.thresholds) * len(args.cooldowns)} settings in "
+              f"{time.perf_counter() - start:.2f} s")
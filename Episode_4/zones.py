@@ -0,0 +1,321 @@
+# zones.py
+#
+# Description:
+# Runs several detection zones (PIR sensor + LED + camera) from one
+# process, driven by a JSON config such as zones.json, instead of
+# one copy of cam13.py per zone with its own camera handling, SMTP
+# login and polling loop.
+# - Every zone has its own PIR and LED pins, camera, sustained-motion
+#   threshold and cooldown. Its state machine (trigger_policy.py, as
+#   in pir_events.PirEdgeDetector) runs on a single asyncio loop: the
+#   GPIO library's event thread only timestamps an edge and hands it
+#   over with call_soon_threadsafe(), and the threshold/cooldown
+#   timers are loop.call_later() handles, so a zone costs no thread.
+# - Each camera is opened once and shared by the zones pointing at it.
+# - Captures, the photo store/event log and emails are handled by a
+#   fixed set of shared asyncio workers, with the blocking parts on
+#   one thread pool, so adding zones adds no workers.
+# A full capture queue drops the new trigger (counted per zone).
+#
+# Usage:
+#   python3 zones.py zones.json
+#   (PYTHONPATH=fakes python3 zones.py zones.json runs it off the Pi)
+#
+# j3 @ Oct, 2026
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from trigger_policy import TriggerPolicy
+
+DEFAULTS = {
+    "resolution": [800, 600],
+    "photo_dir": "/home/pi/Camera",
+    "photo_quota_bytes": None,
+    "event_log_dir": "/home/pi/Camera/log/events",
+    "capture_workers": 2,
+    "notify_workers": 2,
+    "capture_queue": 8,
+    "notify_queue": 16,
+}
+ZONE_DEFAULTS = {
+    "led_pin": None,
+    "camera": 0,
+    "threshold": 3.0,  # MOV_DETECT_THRESHOLD
+    "cooldown": 60.0,  # MIN_DURATION_BETWEEN_PHOTOS
+}
+
+
+def load_config(file_name):
+    with open(file_name, encoding="utf-8") as f:
+        config = dict(DEFAULTS, **json.load(f))
+    config["zones"] = [dict(ZONE_DEFAULTS, **zone) for zone in config["zones"]]
+    pins = [zone["pir_pin"] for zone in config["zones"]]
+    if len(set(pins)) != len(pins):
+        raise ValueError("Two zones use the same PIR pin")
+    return config
+
+
+class Zone:
+    # Sustained-motion and cooldown rules of one PIR, on the asyncio loop
+    def __init__(self, name, pir_pin, on_trigger, led_pin=None, camera=0,
+                 threshold=3.0, cooldown=60.0, history=64):
+        self.name = name
+        self.pir_pin = pir_pin
+        self.led_pin = led_pin
+        self.camera = camera
+        self.policy = TriggerPolicy(threshold, cooldown)
+        self.on_trigger = on_trigger  # on_trigger(zone, movement_timer), on the loop
+        self.edges = collections.deque(maxlen=history)
+        self.photos = 0
+        self.dropped = 0
+        self._timer = None
+        self._loop = None
+        self._gpio = None
+
+    @property
+    def triggers(self):
+        return self.policy.triggers
+
+    def attach(self, gpio, loop):
+        self._gpio = gpio
+        self._loop = loop
+        gpio.setup(self.pir_pin, gpio.IN)
+        if self.led_pin is not None:
+            gpio.setup(self.led_pin, gpio.OUT)
+            gpio.output(self.led_pin, gpio.LOW)
+        gpio.add_event_detect(self.pir_pin, gpio.BOTH, callback=self._gpio_edge)
+        if gpio.input(self.pir_pin) == gpio.HIGH:
+            self._on_edge(time.monotonic(), gpio.HIGH)
+
+    def detach(self):
+        self._gpio.remove_event_detect(self.pir_pin)
+        self._cancel()
+
+    def motion(self):
+        return bool(self.edges) and self.edges[-1][1] == self._gpio.HIGH
+
+    def _gpio_edge(self, channel):
+        # GPIO event thread: timestamp, read the level, hand over
+        timestamp = time.monotonic()
+        level = self._gpio.input(channel)
+        self._loop.call_soon_threadsafe(self._on_edge, timestamp, level)
+
+    def _on_edge(self, timestamp, level):
+        if self.edges and self.edges[-1][1] == level:
+            return  # Bounce or a duplicate event
+        self.edges.append((timestamp, level))
+        self._cancel()
+        deadline = self.policy.edge(timestamp, level == self._gpio.HIGH)
+        if deadline is not None:
+            self._schedule(deadline)
+        if self.led_pin is not None:
+            self._gpio.output(self.led_pin, level)
+
+    def _schedule(self, deadline):
+        # time.monotonic() and the default loop clock are the same clock
+        self._timer = self._loop.call_later(max(0.0, deadline - time.monotonic()), self._on_timer)
+
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self):
+        fired, deadline = self.policy.deadline(time.monotonic())
+        self._schedule(deadline)
+        if fired:
+            self.on_trigger(self, self.policy.movement_timer)
+
+
+class Orchestrator:
+    def __init__(self, config, gpio, open_camera, store=None, event_log=None, notify=None):
+        # open_camera(index, resolution) -> a started LiveCapture
+        # notify(zone_name, file_name) sends the alert; None disables emails
+        self.config = config
+        self.gpio = gpio
+        self.open_camera = open_camera
+        self.store = store
+        self.event_log = event_log
+        self.notify = notify
+        self.zones = [Zone(z["name"], z["pir_pin"], self._on_trigger, led_pin=z["led_pin"],
+                           camera=z["camera"], threshold=z["threshold"], cooldown=z["cooldown"])
+                      for z in config["zones"]]
+        self.cameras = {}
+        self.latencies = collections.deque(maxlen=1024)  # Trigger to file on disk
+        self.started = None
+        workers = config["capture_workers"] + config["notify_workers"] + 1
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="zones")
+        self._captures = None
+        self._notifications = None
+        self._tasks = []
+        self._loop = None
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._captures = asyncio.Queue(self.config["capture_queue"])
+        self._notifications = asyncio.Queue(self.config["notify_queue"])
+        # Open every camera once, in parallel
+        indexes = sorted({zone.camera for zone in self.zones})
+        resolution = tuple(self.config["resolution"])
+        opened = await asyncio.gather(*(self._loop.run_in_executor(self._pool, self.open_camera, i, resolution)
+                                        for i in indexes))
+        self.cameras = dict(zip(indexes, opened))
+        self.gpio.setmode(self.gpio.BCM)
+        for zone in self.zones:
+            zone.attach(self.gpio, self._loop)
+        self._tasks = [asyncio.create_task(self._capture_worker())
+                       for _ in range(self.config["capture_workers"])]
+        if self.notify is not None:
+            self._tasks += [asyncio.create_task(self._notify_worker())
+                            for _ in range(self.config["notify_workers"])]
+        self.started = time.monotonic()
+
+    async def close(self, timeout=30.0):
+        for zone in self.zones:
+            zone.detach()
+        # Let the queued work finish, then stop the workers
+        try:
+            await asyncio.wait_for(self._captures.join(), timeout)
+            await asyncio.wait_for(self._notifications.join(), timeout)
+        except asyncio.TimeoutError:
+            print("Some photos or emails were still pending.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.shutdown(wait=True)
+
+    def _on_trigger(self, zone, movement_timer):
+        try:
+            self._captures.put_nowait((zone, time.monotonic()))
+        except asyncio.QueueFull:
+            zone.dropped += 1
+            return
+        print(f"{zone.name}: take photo")
+        if self.event_log is not None:
+            self.event_log.append("trigger", source="pir", zone=zone.name)
+
+    async def _capture_worker(self):
+        while True:
+            zone, trigger_time = await self._captures.get()
+            try:
+                await self._capture(zone, trigger_time)
+            except Exception as e:
+                print(f"{zone.name}: capture failed: {e!r}")
+            finally:
+                self._captures.task_done()
+
+    async def _capture(self, zone, trigger_time):
+        live = self.cameras[zone.camera]
+        if self.store is not None:
+            file_name = self.store.path_for(time.time())
+        else:
+            file_name = os.path.join(self.config["photo_dir"], f"img_{time.time()}.jpg")
+        # grab() waits for the next frame: run it off the loop
+        array, _ = await self._loop.run_in_executor(self._pool, live.grab)
+        await self._loop.run_in_executor(self._pool, live.encode, array, file_name)
+        latency = time.monotonic() - trigger_time
+        self.latencies.append(latency)
+        zone.photos += 1
+        await self._loop.run_in_executor(self._pool, self._persist, zone, file_name, latency)
+        if self.notify is not None:
+            try:
+                self._notifications.put_nowait((zone, file_name))
+            except asyncio.QueueFull:
+                print(f"{zone.name}: email queue full, alert dropped")
+
+    def _persist(self, zone, file_name, latency):
+        if self.store is not None:
+            self.store.add(file_name, trigger="pir", zone=zone.name)
+        if self.event_log is not None:
+            self.event_log.append("capture", file=file_name, zone=zone.name,
+                                  latency_ms=round(latency * 1000, 1))
+
+    async def _notify_worker(self):
+        while True:
+            zone, file_name = await self._notifications.get()
+            start = time.monotonic()
+            try:
+                await self._loop.run_in_executor(self._pool, self.notify, zone.name, file_name)
+                if self.event_log is not None:
+                    self.event_log.append("email_sent", files=file_name, zone=zone.name,
+                                          duration_ms=round((time.monotonic() - start) * 1000, 1))
+            except Exception as e:
+                print(f"{zone.name}: email failed: {e!r}")
+                if self.event_log is not None:
+                    self.event_log.append("email_failed", files=file_name, zone=zone.name, error=repr(e))
+            finally:
+                self._notifications.task_done()
+
+    def stats(self):
+        # Per-zone counters and rates (per hour) since start()
+        hours = max(1e-9, (time.monotonic() - self.started) / 3600) if self.started else 1e-9
+        return {zone.name: {"triggers": zone.triggers, "photos": zone.photos, "dropped": zone.dropped,
+                            "per_hour": round(zone.triggers / hours, 1)}
+                for zone in self.zones}
+
+
+def open_picamera2(index, resolution):
+    # The camera setup of cam18.py/cam19.py, for one camera
+    from picamera2 import Picamera2
+    from libcamera import Transform
+    from live_capture import LiveCapture
+    from overlay import Overlay, timestamp_item
+    picam2 = Picamera2(index)
+    picam2.configure(picam2.create_preview_configuration({"size": resolution, "format": "RGB888"},
+                                                         transform=Transform(hflip=True, vflip=True)))
+    picam2.pre_callback = Overlay(resolution, [timestamp_item()]).apply
+    picam2.start()
+    return LiveCapture(picam2)
+
+
+async def main(config_file):
+    import RPi.GPIO as GPIO
+    from event_log import EventLog
+    from photo_store import PhotoStore
+    from smtp_pool import SmtpPool, build_alert
+
+    config = load_config(config_file)
+    email_token = os.getenv("EMAIL_TOKEN")
+    from_email = os.getenv("FROM_EMAIL")
+    to_email = os.getenv("TO_EMAIL")
+    if not (email_token and from_email and to_email):
+        raise ValueError("Set the EMAIL_TOKEN, FROM_EMAIL and TO_EMAIL environment variables.")
+    # One SMTP pool for every zone
+    smtp_pool = SmtpPool(from_email, email_token, size=config["notify_workers"])
+
+    def notify(zone_name, file_name):
+        smtp_pool.send(build_alert(from_email, to_email, file_name,
+                                   subject=f"Movement detected: {zone_name}"))
+
+    store = PhotoStore(config["photo_dir"], quota_bytes=config["photo_quota_bytes"])
+    event_log = EventLog(config["event_log_dir"])
+    orchestrator = Orchestrator(config, GPIO, open_picamera2, store, event_log, notify)
+    await orchestrator.start()
+    print(f"{len(orchestrator.zones)} zones on {len(orchestrator.cameras)} cameras, everything has been set up.")
+    try:
+        while True:
+            await asyncio.sleep(600)
+            print(orchestrator.stats())
+    finally:
+        print("Draining pending photos and emails...")
+        await orchestrator.close()
+        print(orchestrator.stats())
+        for live in orchestrator.cameras.values():
+            live.close()
+            live.picam2.stop()
+        smtp_pool.close()
+        store.close()
+        event_log.close()
+        GPIO.cleanup()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "zones.json"))
+    except KeyboardInterrupt:
+        pass